@@ -0,0 +1,155 @@
+"""Admission control: bounded concurrency and wait queues per upstream provider."""
+
+import asyncio
+import functools
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager
+
+from fastapi import HTTPException
+
+from app import metrics, tracing
+from app.config import settings
+
+# Hint for clients turned away by a full queue
+RETRY_AFTER_SECONDS = 2
+
+# How often a waiting caller re-checks its place in line
+_POSITION_POLL_SECONDS = 1.0
+
+
+class Reservation:
+    """A slot, or a place in line for one, taken before the call that will use it.
+
+    Lets a handler turn a request away with a 429 before its response starts;
+    the call then waits on it with ``ProviderLimiter.wait_turn``. A reservation
+    that is never waited on must be ``cancel()``-ed to give its place back;
+    once ``wait_turn`` has taken it over, that is a no-op.
+    """
+
+    def __init__(self, limiter: "ProviderLimiter", waiter: asyncio.Future[None] | None):
+        self.limiter = limiter
+        # None: a slot was free and is already held
+        self.waiter = waiter
+        self.started = time.perf_counter()
+        self.open = True
+
+    def cancel(self) -> None:
+        if self.open:
+            self.open = False
+            self.limiter._give_back(self.waiter)
+
+
+class ProviderLimiter:
+    """At most ``max_concurrency`` calls to one upstream at a time, the rest in a FIFO queue.
+
+    Once ``max_queue`` callers are waiting, new callers are turned away with a
+    429 instead of piling up (and then hitting the provider's own rate limit).
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new caller would be turned away."""
+        return self.active >= self.max_concurrency and self.queued >= self.max_queue
+
+    def check(self) -> None:
+        """Raise the 429 a new caller would get, so requests can be rejected before any work."""
+        if self.saturated:
+            metrics.ADMISSION_REJECTIONS.inc(upstream=self.name)
+            raise HTTPException(
+                status_code=429,
+                detail="Lots of people are asking right now. Please try again in a moment.",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+    def reserve(self) -> Reservation:
+        """Take a free slot, or a place in line, right now; raise the 429 if the line is full."""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return Reservation(self, None)
+        self.check()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return Reservation(self, waiter)
+
+    async def wait_turn(self, reservation: Reservation | None = None) -> AsyncIterator[int]:
+        """Take a slot, yielding the caller's place in line (1 = next) whenever it changes.
+
+        Waits on ``reservation`` if it is still open, otherwise reserves now
+        (raising the 429 if the line is full). Yields nothing when a slot is
+        free. The caller must ``release()`` the slot once its upstream call is done.
+        """
+        if reservation is None or not reservation.open:
+            reservation = self.reserve()
+        reservation.open = False
+        waiter = reservation.waiter
+        if waiter is None:
+            return
+
+        try:
+            position = 0
+            while not waiter.done():
+                if (current := self._waiters.index(waiter) + 1) != position:
+                    position = current
+                    yield position
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), _POSITION_POLL_SECONDS)
+                except TimeoutError:
+                    pass
+        except BaseException:
+            self._give_back(waiter)
+            raise
+        waited = time.perf_counter() - reservation.started
+        metrics.QUEUE_WAIT_SECONDS.observe(waited, upstream=self.name)
+        tracing.record("queue", waited)
+
+    def _give_back(self, waiter: asyncio.Future[None] | None) -> None:
+        """Return a slot, or leave the line, for a caller that won't make its call."""
+        if waiter is None or waiter.done():
+            # Holding a slot, or one was handed over just as the caller gave up
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the longest-waiting caller if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the ``with`` block, waiting in line if needed."""
+        async with aclosing(self.wait_turn()) as turn:
+            async for _ in turn:
+                pass
+        try:
+            yield
+        finally:
+            self.release()
+
+
+@functools.cache
+def get_limiter(name: str) -> ProviderLimiter:
+    """Return the shared limiter for an upstream: ``llm:<provider>``, ``whisper`` or ``tts``."""
+    if name.startswith("llm:"):
+        return ProviderLimiter(name, settings.llm_max_concurrency, settings.llm_max_queue)
+    if name == "whisper":
+        return ProviderLimiter(name, settings.stt_max_concurrency, settings.stt_max_queue)
+    return ProviderLimiter(name, settings.tts_max_concurrency, settings.tts_max_queue)
@@ -1,25 +1,55 @@
 """ELI Agent."""
 
+import functools
+
 from llama_index.core.agent.workflow import ReActAgent
+from llama_index.core.llms import ChatMessage
 from llama_index.core.prompts import PromptTemplate
+from llama_index.core.tools import BaseTool
 
+from app import metrics, tracing
 from app.config import Settings
-from app.llm import get_llm
+from app.llm import LLMConfig, load_llm, with_limits
 
+# No external tools for now, but can be added here
+ELI_TOOLS: list[BaseTool] = []
 
-def build_system_prompt(age: int, story_mode: bool) -> str:
-    """Build Eli's system prompt based on age and mode."""
+
+def age_bucket(age: int) -> str:
+    """Return the age bucket whose guidance build_system_prompt uses for this age."""
     if age <= 4:
+        return "toddler"
+    if age <= 7:
+        return "early"
+    if age <= 10:
+        return "middle"
+    return "older"
+
+
+@functools.lru_cache(maxsize=64)
+def build_system_prompt(age: int, story_mode: bool) -> str:
+    """Build Eli's system prompt based on age and mode.
+
+    Everything but the final line depends only on the age bucket and mode, so
+    prompts for nearby ages share a prefix the provider can serve from its
+    prompt cache.
+    """
+    return f"{_bucket_prompt(age_bucket(age), story_mode)}\n\nThe child you are helping is a {age}-year-old."
+
+
+@functools.lru_cache(maxsize=8)
+def _bucket_prompt(bucket: str, story_mode: bool) -> str:
+    if bucket == "toddler":
         age_guidance = """- Use VERY simple words (1-2 syllables)
 - Compare to things they know: toys, snacks, bedtime
 - Keep answers to 2-3 short sentences
 - Use playful language"""
-    elif age <= 7:
+    elif bucket == "early":
         age_guidance = """- Simple vocabulary with some new words
 - Basic cause-and-effect ("because...")
 - 3-5 sentences
 - Relatable daily life comparisons"""
-    elif age <= 10:
+    elif bucket == "middle":
         age_guidance = """- Can handle more complex ideas
 - Introduce simple science concepts
 - Multi-step explanations OK
@@ -36,24 +66,51 @@ def build_system_prompt(age: int, story_mode: bool) -> str:
         else ""
     )
 
-    return f"""You are Eli, a warm and friendly guide helping a {age}-year-old child understand the world. You speak through their parent.
+    return f"""You are Eli, a warm and friendly guide helping a child understand the world. You speak through their parent.
 
 Your personality:
 - Warm, encouraging, use "we" and "let's explore together"
 - Never condescending - curiosity is wonderful
 - Use everyday analogies the child knows
 
-For a {age}-year-old:
+For a child this age:
 {age_guidance}{story_instruction}
 
 Keep your response concise and engaging."""
 
 
+def llm_route(settings: Settings, age: int, story_mode: bool) -> str:
+    """Return the ``settings.llm_routes`` entry that picks the model for this request.
+
+    The most specific configured route wins: ``<bucket>:story``, then ``story``
+    (story mode only), then the age bucket, then ``default``.
+    """
+    bucket = age_bucket(age)
+    candidates = (f"{bucket}:story", "story", bucket) if story_mode else (bucket,)
+    return next((name for name in candidates if name in settings.llm_routes), "default")
+
+
 def create_eli_agent(settings: Settings, age: int, story_mode: bool) -> ReActAgent:
+    """Return the agent that powers ELI, shared by requests with the same LLM and prompt.
+
+    The agent only holds configuration. Per-request state lives in the Context
+    and memory passed to ``run``, so one instance can serve concurrent requests.
+    """
+    with metrics.AGENT_BUILD_SECONDS.time(), tracing.span("agent"):
+        llm_config = LLMConfig.from_settings(settings, llm_route(settings, age, story_mode))
+        return _build_eli_agent(llm_config, age, story_mode)
+
+
+@functools.lru_cache(maxsize=64)
+def _build_eli_agent(llm_config: LLMConfig, age: int, story_mode: bool) -> ReActAgent:
     """Create the agent that powers ELI."""
+    llm = load_llm(llm_config)
+    if llm_config.limits:
+        # The agent calls its LLM without per-call arguments, so it gets a copy with the limits
+        llm = with_limits(llm, llm_config.limits)
     agent = ReActAgent(
-        tools=[],  # No external tools for now, but can be added here
-        llm=get_llm(settings),
+        tools=ELI_TOOLS,
+        llm=llm,
         verbose=False,
     )
 
@@ -66,3 +123,28 @@ def create_eli_agent(settings: Settings, age: int, story_mode: bool) -> ReActAge
         agent.update_prompts({"react_header": PromptTemplate(f"{eli_personality}\n\n{original}")})
 
     return agent
+
+
+def use_direct_chat(settings: Settings) -> bool:
+    """Whether to call the LLM's chat API directly instead of running the ReAct agent.
+
+    The ReAct loop only pays for itself when there are tools to call; without
+    them it just adds prompt scaffolding and a thought/answer format to parse.
+    """
+    return settings.engine_mode != "agent" and not ELI_TOOLS
+
+
+def build_chat_messages(
+    age: int, story_mode: bool, chat_history: list[ChatMessage], question: str
+) -> list[ChatMessage]:
+    """Build the direct-chat input: Eli's system prompt, the history, then the question.
+
+    Most stable first: the prompt is shared across conversations and a
+    conversation grows at the end, so providers' prefix caches match as far
+    into the input as possible.
+    """
+    return [
+        ChatMessage(role="system", content=build_system_prompt(age, story_mode)),
+        *chat_history,
+        ChatMessage(role="user", content=question),
+    ]
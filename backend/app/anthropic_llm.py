@@ -0,0 +1,48 @@
+"""Anthropic LLM with prompt caching for Eli's system prompt."""
+
+from collections.abc import Sequence
+from typing import Any
+
+from llama_index.core.base.llms.types import ChatResponse, ChatResponseAsyncGen
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.llms.anthropic import Anthropic
+
+
+def _cached_system_prompt(
+    messages: Sequence[ChatMessage], kwargs: dict[str, Any]
+) -> dict[str, Any]:
+    """Add request-body overrides that send the system messages with the first one cacheable."""
+    blocks: list[dict[str, Any]] = [
+        {"type": "text", "text": message.content}
+        for message in messages
+        if message.role == MessageRole.SYSTEM and message.content
+    ]
+    if not blocks:
+        return kwargs
+    blocks[0]["cache_control"] = {"type": "ephemeral"}
+    return {**kwargs, "extra_body": {**kwargs.get("extra_body", {}), "system": blocks}}
+
+
+class PromptCachingAnthropic(Anthropic):
+    """Anthropic LLM that marks the leading system message as a prompt cache breakpoint.
+
+    That message is Eli's system prompt (or the agent header built on it), the
+    same for every request with the same age and mode. llama-index sends system
+    messages as one plain string, which can't carry ``cache_control``, so the
+    system blocks go in the request body instead. Later system messages (such as
+    a conversation summary) follow the breakpoint, so they don't split the cache.
+    Anthropic ignores the mark on prefixes shorter than the model's minimum
+    cacheable length.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PromptCachingAnthropic"
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await super().achat(messages, **_cached_system_prompt(messages, kwargs))
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        return await super().astream_chat(messages, **_cached_system_prompt(messages, kwargs))
@@ -0,0 +1,21 @@
+"""Caches for upstream results."""
+
+from app.cache.answers import AnswerCache, answer_cache_key, get_answer_cache
+from app.cache.audio import AudioCache, audio_cache_key, get_audio_cache
+from app.cache.summaries import SummaryCache, get_summary_cache, summary_prefix_keys
+from app.cache.tokens import TokenCountCache, count_tokens, get_token_count_cache
+
+__all__ = [
+    "AnswerCache",
+    "AudioCache",
+    "SummaryCache",
+    "TokenCountCache",
+    "answer_cache_key",
+    "audio_cache_key",
+    "count_tokens",
+    "get_answer_cache",
+    "get_audio_cache",
+    "get_summary_cache",
+    "get_token_count_cache",
+    "summary_prefix_keys",
+]
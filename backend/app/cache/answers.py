@@ -0,0 +1,199 @@
+"""Cache of finished /ask answers."""
+
+import functools
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from app.agents.eli import age_bucket
+from app.cache.stats import CacheStats
+from app.config import settings
+from app.llm import LLMConfig
+from app.messages import HistoryMessage
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Fold case, whitespace and trailing punctuation so trivial variants share a key."""
+    question = _WHITESPACE.sub(" ", question.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", question)
+
+
+def answer_cache_key(
+    question: str,
+    age: int,
+    story_mode: bool,
+    llm_config: LLMConfig,
+    history: list[HistoryMessage],
+    summary: str | None = None,
+) -> str:
+    """Return the cache key for an answer.
+
+    The key covers everything that shapes the answer: the normalized question,
+    the age bucket (not the exact age, since the guidance is per bucket), story
+    mode, the provider/model and its output limits, and a fingerprint of the
+    conversation so far (including the summary of its older turns, if any).
+    """
+    fields = [
+        normalize_question(question),
+        age_bucket(age),
+        story_mode,
+        llm_config.provider,
+        llm_config.model,
+        [[msg.role, msg.content] for msg in history],
+    ]
+    # Appended only when set, so keys from before these existed stay valid
+    if llm_config.max_tokens is not None or llm_config.temperature is not None:
+        fields.append([llm_config.max_tokens, llm_config.temperature])
+    if summary is not None:
+        fields.append(summary)
+    payload = json.dumps(fields, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SQLiteAnswerStore:
+    """On-disk answer tier backed by SQLite (requires the ``db`` dependency group)."""
+
+    def __init__(self, url: str, ttl_seconds: float):
+        # Imported lazily: sqlalchemy/aiosqlite are only needed when this tier is on
+        from sqlalchemy import Column, Float, MetaData, String, Table, Text
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        self._engine = create_async_engine(url)
+        self._ttl_seconds = ttl_seconds
+        self._metadata = MetaData()
+        self._table = Table(
+            "answers",
+            self._metadata,
+            Column("key", String(64), primary_key=True),
+            Column("answer", Text, nullable=False),
+            Column("created_at", Float, nullable=False),
+        )
+        self._schema_ready = False
+
+    async def _ensure_schema(self) -> None:
+        if not self._schema_ready:
+            async with self._engine.begin() as conn:
+                await conn.run_sync(self._metadata.create_all)
+            self._schema_ready = True
+
+    async def get(self, key: str) -> str | None:
+        from sqlalchemy import select
+
+        await self._ensure_schema()
+        cutoff = time.time() - self._ttl_seconds
+        async with self._engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(self._table.c.answer).where(
+                        self._table.c.key == key, self._table.c.created_at >= cutoff
+                    )
+                )
+            ).first()
+        return row[0] if row else None
+
+    async def set(self, key: str, answer: str) -> None:
+        from sqlalchemy.dialects.sqlite import insert
+
+        await self._ensure_schema()
+        stmt = insert(self._table).values(key=key, answer=answer, created_at=time.time())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self._table.c.key],
+            set_={"answer": stmt.excluded.answer, "created_at": stmt.excluded.created_at},
+        )
+        async with self._engine.begin() as conn:
+            await conn.execute(stmt)
+
+    async def close(self) -> None:
+        await self._engine.dispose()
+
+
+class AnswerCache:
+    """Two-tier answer cache: in-memory LRU with TTL, optionally backed by SQLite.
+
+    Disk hits are promoted into memory. A failing disk tier is logged and
+    treated as a miss so it can never break /ask.
+    """
+
+    def __init__(
+        self, max_entries: int, ttl_seconds: float, store: SQLiteAnswerStore | None = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> str | None:
+        """Return the cached answer for ``key``, or None on a miss."""
+        answer = self._get_memory(key)
+        if answer is None and self.store is not None:
+            try:
+                answer = await self.store.get(key)
+            except Exception:
+                logger.exception("Answer cache disk lookup failed")
+            if answer is not None:
+                self._set_memory(key, answer)
+
+        if answer is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return answer
+
+    def in_memory(self, key: str) -> bool:
+        """Whether ``key`` is in the memory tier, without counting a lookup."""
+        return self._get_memory(key) is not None
+
+    async def set(self, key: str, answer: str) -> None:
+        """Store ``answer`` under ``key`` in every tier."""
+        self._set_memory(key, answer)
+        if self.store is not None:
+            try:
+                await self.store.set(key, answer)
+            except Exception:
+                logger.exception("Answer cache disk write failed")
+
+    def _get_memory(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _set_memory(self, key: str, answer: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=1)
+def get_answer_cache() -> AnswerCache:
+    """Return the shared answer cache, constructed once per process."""
+    store = None
+    if settings.answer_cache_db_url:
+        store = SQLiteAnswerStore(settings.answer_cache_db_url, settings.answer_cache_ttl_seconds)
+    return AnswerCache(
+        max_entries=settings.answer_cache_size,
+        ttl_seconds=settings.answer_cache_ttl_seconds,
+        store=store,
+    )
@@ -0,0 +1,117 @@
+"""Content-addressed on-disk cache of synthesized speech."""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+from app.cache.stats import CacheStats
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def audio_cache_key(text: str, model: str, voice: str, response_format: str) -> str:
+    """Return the content address for a clip: a hash of everything that determines its bytes."""
+    payload = json.dumps([text, model, voice, response_format], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class AudioCache:
+    """Directory of audio clips named by content hash, bounded in total size.
+
+    Eviction is least-recently-used: every hit bumps the file's mtime and the
+    oldest files are deleted once the directory grows past ``max_bytes``.
+    Files are written to a temp name and renamed into place, so readers never
+    see a partial clip.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Path | None:
+        """Return the path of the cached clip, or None on a miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        """Store ``data`` under ``key`` and return its path."""
+        tmp, tmp_path = self.open_temp()
+        with tmp:
+            tmp.write(data)
+        return self.commit(key, tmp_path)
+
+    def open_temp(self) -> tuple[BinaryIO, Path]:
+        """Open a temp file in the cache directory for a clip that is still arriving."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        return os.fdopen(fd, "wb"), Path(tmp_name)
+
+    def commit(self, key: str, tmp_path: Path) -> Path:
+        """Move a finished temp file into place under ``key`` and enforce the size bound."""
+        path = self.path_for(key)
+        size = tmp_path.stat().st_size
+        with self._lock:
+            total = self._current_total()
+            replaced = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._total_bytes = total - replaced + size
+            self._evict(keep=path)
+        return path
+
+    def _current_total(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(f.stat().st_size for f in self._clips())
+        return self._total_bytes
+
+    def _clips(self) -> list[Path]:
+        return list(self.directory.glob(f"*{self.suffix}"))
+
+    def _evict(self, keep: Path) -> None:
+        if self._current_total() <= self.max_bytes:
+            return
+        clips = sorted(self._clips(), key=lambda f: f.stat().st_mtime)
+        for clip in clips:
+            if self._total_bytes <= self.max_bytes:
+                break
+            if clip == keep:
+                continue
+            try:
+                size = clip.stat().st_size
+                clip.unlink()
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
+            logger.debug("Evicted cached audio %s", clip.name)
+
+    def __len__(self) -> int:
+        return len(self._clips()) if self.directory.exists() else 0
+
+
+@functools.lru_cache(maxsize=1)
+def get_audio_cache() -> AudioCache:
+    """Return the shared audio cache, constructed once per process."""
+    return AudioCache(Path(settings.tts_cache_dir), settings.tts_cache_max_bytes)
@@ -0,0 +1,67 @@
+"""Cached rolling summaries of long conversations."""
+
+import functools
+import hashlib
+import json
+from collections import OrderedDict
+
+from app.cache.stats import CacheStats
+from app.config import settings
+from app.messages import HistoryMessage
+
+
+def summary_prefix_keys(
+    history: list[HistoryMessage], model: str, summary: str | None = None
+) -> list[str]:
+    """Return one cache key per prefix of ``history``: ``keys[k]`` covers ``history[:k]``.
+
+    Keys chain from the model and the summary the history continues from (if
+    any), so the whole list costs one pass over the messages.
+    """
+    digest = hashlib.blake2b(json.dumps([model, summary]).encode(), digest_size=16)
+    keys = [digest.hexdigest()]
+    for msg in history:
+        digest.update(json.dumps([msg.role, msg.content]).encode())
+        keys.append(digest.hexdigest())
+    return keys
+
+
+class SummaryCache:
+    """Bounded LRU of conversation summaries keyed by the history prefix they cover.
+
+    A conversation only grows at the end, so the summary of its older turns
+    stays valid for every later turn until more of it has to be folded in.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def longest(self, keys: list[str]) -> tuple[int, str | None]:
+        """Return the longest prefix (index into ``keys``) with a cached summary, or ``(0, None)``."""
+        for index in range(len(keys) - 1, 0, -1):
+            summary = self._summaries.get(keys[index])
+            if summary is not None:
+                self.stats.hits += 1
+                self._summaries.move_to_end(keys[index])
+                return index, summary
+        self.stats.misses += 1
+        return 0, None
+
+    def set(self, key: str, summary: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_entries:
+            self._summaries.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=1)
+def get_summary_cache() -> SummaryCache:
+    """Return the shared summary cache, constructed once per process."""
+    return SummaryCache(settings.summary_cache_size)
@@ -0,0 +1,71 @@
+"""Memoized token counts for conversation messages."""
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from llama_index.core.utils import get_tokenizer
+
+from app.cache.stats import CacheStats
+from app.config import settings
+
+
+def tokenizer_name(tokenizer: Callable[[str], list]) -> str:
+    """Identify a tokenizer for cache keys (e.g. the tiktoken encoding name)."""
+    func = getattr(tokenizer, "func", tokenizer)
+    encoding = getattr(func, "__self__", None)
+    return getattr(encoding, "name", None) or getattr(func, "__qualname__", repr(func))
+
+
+class TokenCountCache:
+    """Bounded LRU of token counts keyed by tokenizer and a hash of the text.
+
+    Conversation history is re-sent (or re-loaded) on every turn, so the same
+    messages would otherwise be re-tokenized each time. Keys hold a 16-byte
+    digest rather than the text, so long messages don't stay in memory.
+    Thread-safe: ChatMemoryBuffer.aget counts tokens in a worker thread.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], list], max_entries: int):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._name = tokenizer_name(tokenizer)
+        self._counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def count(self, text: str) -> int:
+        if self.max_entries <= 0:
+            return len(self.tokenizer(text))
+        key = (self._name, hashlib.blake2b(text.encode(), digest_size=16).digest())
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self.stats.hits += 1
+                self._counts.move_to_end(key)
+                return count
+            self.stats.misses += 1
+
+        # Tokenize outside the lock; a concurrent miss on the same text just counts it twice
+        count = len(self.tokenizer(text))
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+
+@functools.lru_cache(maxsize=1)
+def get_token_count_cache() -> TokenCountCache:
+    """Return the shared token count cache for llama-index's default tokenizer."""
+    return TokenCountCache(get_tokenizer(), settings.token_count_cache_size)
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with llama-index's default tokenizer (as ChatMemoryBuffer does), memoized."""
+    return get_token_count_cache().count(text)
@@ -1,9 +1,28 @@
 """Application configuration."""
 
-from pydantic import field_validator
+from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class LLMRoute(BaseModel):
+    """Model and generation limits for one kind of request (see ``Settings.llm_routes``)."""
+
+    model: str | None = None
+    max_tokens: int | None = None
+    temperature: float | None = None
+
+
+def _default_llm_routes() -> dict[str, LLMRoute]:
+    # Output caps in line with the answer lengths build_system_prompt asks for
+    return {
+        "toddler": LLMRoute(max_tokens=200),
+        "early": LLMRoute(max_tokens=350),
+        "middle": LLMRoute(max_tokens=600),
+        "older": LLMRoute(max_tokens=800),
+        "story": LLMRoute(max_tokens=1000),
+    }
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -19,6 +38,29 @@ class Settings(BaseSettings):
     # LLM settings
     llm_api_key: str = ""
     llm_model: str = "gpt-4o"
+    # Override the provider's API base URL (a proxy, or a local stand-in for benchmarks)
+    llm_api_base: str | None = None
+
+    # Secondary provider for the direct chat engine, used when the primary fails before
+    # its first token. Model names are provider-specific, so it has its own model and key.
+    llm_fallback_provider: str | None = None
+    llm_fallback_model: str = ""
+    llm_fallback_api_key: str = ""
+    llm_fallback_api_base: str | None = None
+    # Hedging: also start the fallback when the primary's first token takes longer than its
+    # recent llm_hedge_quantile, kept within these bounds, and stream whichever starts first
+    llm_hedge: bool = False
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay_seconds: float = 0.5
+    llm_hedge_max_delay_seconds: float = 3.0
+
+    # Model, response max_tokens and temperature per kind of request, by route name: an
+    # age bucket (toddler, early, middle, older), "<bucket>:story", "story", "summary"
+    # (history summaries) or "default". Unset fields use llm_model and provider defaults.
+    llm_routes: dict[str, LLMRoute] = Field(default_factory=_default_llm_routes)
+
+    # Engine: "auto" (direct LLM chat unless tools are registered) or "agent" (always ReAct)
+    engine_mode: str = "auto"
 
     # Max tokens for response (adjust as needed)
     max_tokens: int = 2048
@@ -27,6 +69,71 @@ class Settings(BaseSettings):
     response_token_buffer: int = 1500
 
     stt_api_key: str | None = None
+    # Override the OpenAI API base URL used for Whisper and TTS
+    stt_api_base: str | None = None
+
+    # Answer cache for /ask (0 entries disables it)
+    answer_cache_size: int = 1024
+    answer_cache_ttl_seconds: int = 24 * 60 * 60
+    # Optional on-disk tier, e.g. "sqlite+aiosqlite:///./answers.db" (needs the db group)
+    answer_cache_db_url: str | None = None
+
+    # Server-side /ask sessions (clients send a session_id instead of the whole history):
+    # how many to keep in memory and how long an idle one lives
+    session_max_count: int = 10_000
+    session_ttl_seconds: int = 60 * 60
+
+    # Memoized token counts of conversation messages (0 disables)
+    token_count_cache_size: int = 50_000
+
+    # How /ask fits a long conversation into max_tokens - response_token_buffer:
+    # "truncate" drops the oldest turns, "summarize" folds them into a rolling summary
+    memory_mode: str = "truncate"
+    # Rolling summaries cached by the history prefix they cover
+    summary_cache_size: int = 4096
+
+    # Upload bytes being received across all /transcribe requests at once; uploads
+    # that don't fit wait up to upload_budget_wait_seconds, then get a 503
+    upload_budget_bytes: int = 100 * 1024 * 1024
+    upload_budget_wait_seconds: float = 5.0
+
+    # On-disk cache of synthesized speech (0 bytes disables it)
+    tts_cache_dir: str = ".cache/tts"
+    tts_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Concurrent upstream calls per provider, and how many more may wait in line
+    # before new requests are turned away with a 429
+    llm_max_concurrency: int = 16
+    llm_max_queue: int = 64
+    stt_max_concurrency: int = 8
+    stt_max_queue: int = 32
+    tts_max_concurrency: int = 8
+    tts_max_queue: int = 32
+
+    # Upstream work shared by requests (a TTS clip) is cancelled once every client waiting
+    # on it has disconnected for this long (answers use answer_reconnect_grace_seconds)
+    abandoned_work_grace_seconds: float = 1.0
+
+    # Dropped /ask streams can be resumed (GET /ask/{answer_id}/events with Last-Event-ID):
+    # how many answers' events to keep, for how long after each finishes, and how long an
+    # answer nobody is streaming keeps generating for a client to reconnect
+    answer_resume_max_count: int = 1000
+    answer_resume_ttl_seconds: int = 5 * 60
+    answer_reconnect_grace_seconds: float = 10.0
+
+    # Before serving, build the LLM, speech and tokenizer state the first requests would
+    # otherwise pay for, and open a connection to each upstream (a model list request,
+    # within warm_up_timeout_seconds) so they skip the TCP and TLS handshakes
+    warm_up_on_startup: bool = True
+    warm_up_connections: bool = True
+    warm_up_timeout_seconds: float = 5.0
+
+    # Answer text deltas arriving within this many seconds of the last one sent are merged
+    # into one SSE frame (0 sends every delta as it comes)
+    sse_delta_flush_seconds: float = 0.05
+
+    # Requests slower than this are logged at WARNING with their stage timings
+    slow_request_seconds: float = 10.0
 
     @field_validator("response_token_buffer")
     @classmethod
@@ -0,0 +1,64 @@
+"""Stop waiting on upstream calls for clients that have gone away."""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Non-standard (nginx) status for a request the client abandoned; it is only logged
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect[T](request: Request, awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable``, cancelling it if the client disconnects first.
+
+    Starlette only notices a disconnect while streaming a response body, so a
+    handler awaiting a slow upstream call would otherwise run it to the end for
+    nobody. Call this after the request body has been read. Raises a 499
+    ``HTTPException`` if the client went away.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
+            # Let the call unwind (closing its upstream connection) before returning
+            await asyncio.wait({work})
+    if work.cancelled():
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request.")
+    return work.result()
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """A streamed response that runs ``on_close`` however it ends.
+
+    Cleanup can't live in the body generator: if the client disconnects before
+    the body starts, the generator never runs. Use it for resources a handler
+    took before responding, such as an open upstream stream or a limiter slot.
+    """
+
+    def __init__(
+        self,
+        content: AsyncIterator[bytes],
+        on_close: Callable[[], Awaitable[Any]],
+        **kwargs: Any,
+    ):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._on_close()
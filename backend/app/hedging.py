@@ -0,0 +1,152 @@
+"""Hedged LLM streams: fail over to a secondary provider, or race it against a slow primary."""
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from contextlib import aclosing
+from typing import Any, NamedTuple
+
+from llama_index.core.base.llms.types import ChatResponse
+from llama_index.core.llms import LLM, ChatMessage
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# First-token samples needed before the observed quantile replaces the maximum delay
+_MIN_SAMPLES = 20
+
+
+class Upstream(NamedTuple):
+    """An LLM, the provider name it reports metrics under, and the limits to call it with."""
+
+    provider: str
+    llm: LLM
+    limits: dict[str, Any] = {}
+
+
+class LatencyWindow:
+    """The most recent ``size`` samples of a latency, so quantiles follow current conditions."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@functools.cache
+def first_token_window(provider: str) -> LatencyWindow:
+    """Return the recent time-to-first-token samples of a provider."""
+    return LatencyWindow()
+
+
+def hedge_delay(provider: str) -> float:
+    """Seconds to wait for ``provider``'s first token before hedging.
+
+    That is its recent ``llm_hedge_quantile`` (p95 by default), within the
+    configured bounds; the upper bound until there are enough samples.
+    """
+    window = first_token_window(provider)
+    if len(window) < _MIN_SAMPLES:
+        return settings.llm_hedge_max_delay_seconds
+    return min(
+        max(window.quantile(settings.llm_hedge_quantile), settings.llm_hedge_min_delay_seconds),
+        settings.llm_hedge_max_delay_seconds,
+    )
+
+
+async def _open(
+    upstream: Upstream, messages: Sequence[ChatMessage]
+) -> tuple[list[ChatResponse], AsyncGenerator[ChatResponse, None]]:
+    """Start a stream and read it up to its first token, returning the chunks read so far."""
+    stream = await upstream.llm.astream_chat(messages, **upstream.limits)
+    chunks = []
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            if chunk.delta:
+                break
+    except BaseException:
+        await stream.aclose()
+        raise
+    return chunks, stream
+
+
+async def hedged_chat(
+    messages: Sequence[ChatMessage],
+    primary: Upstream,
+    secondary: Upstream | None = None,
+    hedge_after: float | None = None,
+) -> AsyncIterator[tuple[str, ChatResponse]]:
+    """Stream a chat response as ``(provider, chunk)`` pairs, from whichever upstream starts first.
+
+    ``secondary`` takes over if ``primary`` fails before its first token and,
+    with ``hedge_after``, is also started if ``primary`` has no first token by
+    then; the slower of the two is cancelled. Once a stream has produced a
+    token it is the answer, so later errors are raised, not failed over.
+    """
+    started = time.perf_counter()
+    pending = {asyncio.create_task(_open(primary, messages)): primary}
+    errors: list[BaseException] = []
+    reason = None
+    try:
+        timeout = hedge_after if secondary is not None else None
+        while True:
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            timeout = None
+            if not done:
+                # The primary is slower than usual: ask the secondary too
+                reason = "slow"
+                pending[asyncio.create_task(_open(secondary, messages))] = secondary
+                continue
+            task = done.pop()
+            upstream = pending.pop(task)
+            if (error := task.exception()) is None:
+                chunks, stream = task.result()
+                break
+            errors.append(error)
+            if secondary is not None and secondary not in pending.values() and reason is None:
+                reason = "error"
+                logger.warning("LLM provider %s failed, failing over: %r", upstream.provider, error)
+                pending[asyncio.create_task(_open(secondary, messages))] = secondary
+            elif not pending:
+                raise errors[0]
+    finally:
+        for loser in pending:
+            if not loser.done():
+                loser.cancel()
+                metrics.CANCELLED_UPSTREAM_CALLS.inc(upstream="llm")
+        # Let losers unwind and close any stream that started anyway
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, tuple):
+                await result[1].aclose()
+
+    # Errors that another upstream recovered from; a raised one is counted by the caller
+    for error in errors:
+        metrics.UPSTREAM_ERRORS.inc(upstream="llm", error=type(error).__name__)
+    if upstream is primary or reason == "slow":
+        # A lower bound when the secondary won, which still counts toward the quantile
+        first_token_window(primary.provider).observe(time.perf_counter() - started)
+    if reason is not None:
+        winner = "primary" if upstream is primary else "secondary"
+        metrics.LLM_HEDGES.inc(reason=reason, winner=winner)
+
+    async with aclosing(stream):
+        for chunk in chunks:
+            yield upstream.provider, chunk
+        async for chunk in stream:
+            yield upstream.provider, chunk
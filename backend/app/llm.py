@@ -1,22 +1,158 @@
 """LLM factory for provider switching."""
 
+import functools
+from typing import Any, NamedTuple
+
 from llama_index.core.llms import LLM
-from llama_index.llms.anthropic import Anthropic
-from llama_index.llms.openai import OpenAI
 
-from app.config import Settings
+from app import metrics
+from app.config import LLMRoute, Settings
+
+
+class LLMConfig(NamedTuple):
+    """Everything that identifies an LLM client, and the output limits requests are sent with."""
 
+    provider: str
+    model: str
+    api_key: str
+    api_base: str | None = None
+    # Response length cap and sampling temperature (None: the provider's default)
+    max_tokens: int | None = None
+    temperature: float | None = None
 
-def get_llm(settings: Settings) -> LLM:
-    """Create an LLM instance based on configuration."""
-    if settings.llm_provider == "anthropic":
-        return Anthropic(
-            model=settings.llm_model,
+    @classmethod
+    def from_settings(cls, settings: Settings, route: str = "default") -> "LLMConfig":
+        """Return the config for ``route`` in ``settings.llm_routes``, or the base settings."""
+        route_config = settings.llm_routes.get(route) or LLMRoute()
+        return cls(
+            provider=settings.llm_provider,
+            model=route_config.model or settings.llm_model,
             api_key=settings.llm_api_key,
+            api_base=settings.llm_api_base,
+            max_tokens=route_config.max_tokens,
+            temperature=route_config.temperature,
         )
 
-    # Default to OpenAI
+    @property
+    def limits(self) -> dict[str, Any]:
+        """Keyword arguments for each chat call (unset limits keep the provider's defaults)."""
+        return {
+            name: value
+            for name, value in (("max_tokens", self.max_tokens), ("temperature", self.temperature))
+            if value is not None
+        }
+
+
+def get_llm(settings: Settings, route: str = "default") -> LLM:
+    """Return the shared LLM instance for the configured provider and ``route``'s model.
+
+    Routes with the same model share it: pass ``LLMConfig.limits`` with each call.
+    """
+    return load_llm(LLMConfig.from_settings(settings, route))
+
+
+def get_fallback_llm(settings: Settings, route: str = "default") -> LLM | None:
+    """Return the shared LLM instance of the secondary provider, if one is configured.
+
+    Calls take ``route``'s output limits, but not its model, which belongs to
+    the primary provider.
+    """
+    if not settings.llm_fallback_provider:
+        return None
+    config = LLMConfig.from_settings(settings, route)._replace(
+        provider=settings.llm_fallback_provider,
+        model=settings.llm_fallback_model or settings.llm_model,
+        api_key=settings.llm_fallback_api_key,
+        api_base=settings.llm_fallback_api_base,
+    )
+    return load_llm(config)
+
+
+def _field(obj: Any, name: str) -> Any:
+    # Raw chunks arrive as SDK objects or (through the agent) as dumped dicts
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def _int_field(obj: Any, name: str) -> int:
+    value = _field(obj, name)
+    return value if isinstance(value, int) else 0
+
+
+def record_prompt_usage(provider: str, raw: Any) -> None:
+    """Count the prompt tokens a streamed chunk reports, by how the provider's prompt cache served them.
+
+    OpenAI reports usage on the last chunk of a stream (with ``include_usage``),
+    Anthropic on its ``message_delta`` event; other chunks report nothing.
+    """
+    usage = _field(raw, "usage")
+    if usage is None:
+        return
+    if (prompt_tokens := _int_field(usage, "prompt_tokens")) > 0:
+        cached = _int_field(_field(usage, "prompt_tokens_details"), "cached_tokens")
+        counts = {"read": cached, "none": prompt_tokens - cached}
+    else:
+        counts = {
+            "read": _int_field(usage, "cache_read_input_tokens"),
+            "write": _int_field(usage, "cache_creation_input_tokens"),
+            "none": _int_field(usage, "input_tokens"),
+        }
+    for cache, tokens in counts.items():
+        if tokens:
+            metrics.LLM_PROMPT_TOKENS.inc(tokens, provider=provider, cache=cache)
+
+
+def load_llm(config: LLMConfig) -> LLM:
+    """Return the shared LLM instance for ``config``'s provider, model, key and endpoint.
+
+    Output limits are not part of it; they are sent with each call.
+    """
+    return _load_llm(config._replace(max_tokens=None, temperature=None))
+
+
+def sdk_client(llm: LLM) -> Any | None:
+    """Return the provider SDK client (and so the connection pool) an LLM sends requests with.
+
+    None for an LLM that doesn't keep one, such as a custom or stand-in LLM.
+    """
+    # llama-index's OpenAI builds its client on first use, Anthropic's when constructed
+    get_client = getattr(llm, "_get_aclient", None)
+    return get_client() if get_client is not None else getattr(llm, "_aclient", None)
+
+
+def with_limits(llm: LLM, limits: dict[str, Any]) -> LLM:
+    """Return a copy of ``llm`` that applies ``limits`` to every call, sharing its SDK client.
+
+    For callers that can't pass limits per call, such as the ReAct agent.
+    """
+    sdk_client(llm)  # built first (if it has one), so the copy holds the same one
+    return llm.model_copy(update=limits)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_llm(config: LLMConfig) -> LLM:
+    """Create an LLM instance, constructed once per process for each config.
+
+    The instance owns the provider SDK client and its HTTP connection pool, so
+    sharing it lets requests reuse warm TLS connections.
+    """
+    # Provider integrations are imported on first use: each pulls in its SDK, which
+    # takes a second or more, and a deployment only needs the ones it's configured for
+    if config.provider == "anthropic":
+        from app.anthropic_llm import PromptCachingAnthropic
+
+        return PromptCachingAnthropic(
+            model=config.model,
+            api_key=config.api_key,
+            base_url=config.api_base,
+        )
+
+    from llama_index.llms.openai import OpenAI
+
+    # Default to OpenAI. Its prompt caching is automatic for a repeated prefix; asking
+    # for usage on streams reports how much of each prompt it served from the cache.
     return OpenAI(
-        model=settings.llm_model,
-        api_key=settings.llm_api_key,
+        model=config.model,
+        api_key=config.api_key,
+        api_base=config.api_base,
+        additional_kwargs={"stream_options": {"include_usage": True}},
     )
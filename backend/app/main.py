@@ -1,16 +1,35 @@
 """FastAPI application for ELI5 Now!"""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
+from app import metrics
+from app.cache import get_answer_cache, get_audio_cache, get_token_count_cache
+from app.config import settings
 from app.routes.ask import router as ask_router
 from app.routes.transcribe import router as transcribe_router
 from app.routes.tts import router as tts_router
+from app.routes.voice import router as voice_router
+from app.tracing import RequestTraceMiddleware
+from app.warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up before accepting requests, so the first ones after a start aren't slow."""
+    if settings.warm_up_on_startup:
+        await warm_up()
+    yield
+
 
 app = FastAPI(
     title="ELI5 Now!",
     description="AI-powered explanations for curious children",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS: Allow frontend to call backend from browser
@@ -23,11 +42,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+app.add_middleware(RequestTraceMiddleware)
 
 app.include_router(ask_router)
 app.include_router(transcribe_router)
 app.include_router(tts_router)
+app.include_router(voice_router)
 
 
 @app.get("/")
@@ -40,3 +62,22 @@ async def root():
 async def health():
     """Health check endpoint for monitoring."""
     return {"status": "healthy"}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the response caches."""
+    answers = get_answer_cache()
+    audio = get_audio_cache()
+    tokens = get_token_count_cache()
+    return {
+        "answers": {**answers.stats.as_dict(), "entries": len(answers)},
+        "audio": {**audio.stats.as_dict(), "entries": len(audio)},
+        "token_counts": {**tokens.stats.as_dict(), "entries": len(tokens)},
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Counters and latency histograms in the Prometheus text exposition format."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,171 @@
+"""Chat memory for /ask: token-counted history, trimmed or folded into a rolling summary."""
+
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+
+from app import metrics, tracing
+from app.admission import get_limiter
+from app.cache.summaries import get_summary_cache, summary_prefix_keys
+from app.cache.tokens import count_tokens
+from app.config import settings
+from app.llm import LLMConfig, get_llm
+from app.messages import HistoryMessage
+
+logger = logging.getLogger(__name__)
+
+# Share of the token limit the turns kept word for word may take after a fold; the
+# rest leaves room for the summary and for new turns before the next fold
+_RECENT_SHARE = 0.5
+
+SUMMARY_PROMPT = """You keep notes on a conversation between a curious child and Eli, \
+who explains things simply, so that Eli can carry on the conversation later.
+
+Notes so far:
+{summary}
+
+Conversation since then:
+{transcript}
+
+Write updated notes in at most {words} words: what the child asked about, what Eli \
+explained, and anything the child said about themselves. Plain sentences, no preamble."""
+
+
+@dataclass
+class FoldedHistory:
+    """History for the prompt: a summary of the older turns and the recent ones verbatim."""
+
+    summary: str | None
+    recent: list[HistoryMessage]
+    # Leading messages of the folded history that the summary now stands in for
+    covered: int = 0
+
+
+class MemoizedChatMemoryBuffer(ChatMemoryBuffer):
+    """ChatMemoryBuffer that counts tokens per message through the shared count cache.
+
+    The stock buffer tokenizes the joined text of the remaining messages each
+    time it drops one while trimming to ``token_limit``, so one turn costs
+    O(n²) tokenizer work, repeated every turn. Here each message is tokenized
+    once across turns and requests, and trimming keeps a running total.
+    Summing per message differs from tokenizing the joined text by at most a
+    token per message boundary.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MemoizedChatMemoryBuffer"
+
+    def get(
+        self, input: str | None = None, initial_token_count: int = 0, **kwargs: Any
+    ) -> list[ChatMessage]:
+        """Return the most recent history that fits ``token_limit`` (same rules as the base)."""
+        chat_history = self.get_all()
+        if initial_token_count > self.token_limit:
+            raise ValueError("Initial token count exceeds token limit")
+
+        counts = [count_tokens(str(message.content)) for message in chat_history]
+        message_count = len(chat_history)
+        token_count = sum(counts) + initial_token_count
+        while token_count > self.token_limit and message_count > 1:
+            token_count -= counts[-message_count]
+            message_count -= 1
+            # History can't start with an assistant reply or a tool result
+            while message_count > 1 and chat_history[-message_count].role in (
+                MessageRole.TOOL,
+                MessageRole.ASSISTANT,
+            ):
+                token_count -= counts[-message_count]
+                message_count -= 1
+
+        if token_count > self.token_limit or message_count <= 0:
+            return chat_history[-1:]
+        return chat_history[-message_count:]
+
+    def _token_count_for_messages(self, messages: list[ChatMessage]) -> int:
+        return sum(count_tokens(str(message.content)) for message in messages)
+
+
+def build_memory(
+    history: list[HistoryMessage], token_limit: int, summary: str | None = None
+) -> ChatMemoryBuffer:
+    """Load conversation history (after its ``summary``, if any) into a memory that trims it to ``token_limit``."""
+    chat_history = [ChatMessage(role=msg.role, content=msg.content) for msg in history]
+    if summary:
+        chat_history.insert(
+            0, ChatMessage(role="system", content=f"Summary of the conversation so far: {summary}")
+        )
+    return MemoizedChatMemoryBuffer.from_defaults(
+        chat_history=chat_history,
+        token_limit=token_limit,
+    )
+
+
+async def _summarize(summary: str | None, messages: list[HistoryMessage], words: int) -> str:
+    transcript = "\n".join(
+        f"{'Child' if msg.role == 'user' else 'Eli'}: {msg.content}" for msg in messages
+    )
+    prompt = SUMMARY_PROMPT.format(
+        summary=summary or "(none yet)", transcript=transcript, words=words
+    )
+    async with get_limiter(f"llm:{settings.llm_provider}").slot():
+        with metrics.UPSTREAM_SECONDS.time(upstream="summary"), tracing.span("summary"):
+            response = await get_llm(settings, "summary").achat(
+                [ChatMessage(role="user", content=prompt)],
+                **LLMConfig.from_settings(settings, "summary").limits,
+            )
+    return (response.message.content or "").strip()
+
+
+async def fold_history(
+    history: list[HistoryMessage], token_limit: int, summary: str | None = None
+) -> FoldedHistory:
+    """Fit ``history`` (continuing from ``summary``) into ``token_limit`` by summarizing older turns.
+
+    Summaries are cached by the history prefix they cover, so a long
+    conversation is only re-summarized once its recent turns outgrow the
+    limit again, not on every turn. If summarizing fails, the history is
+    returned as is and the memory falls back to dropping the oldest turns.
+    """
+    counts = [count_tokens(msg.content) for msg in history]
+    summary_tokens = count_tokens(summary) if summary else 0
+    if summary_tokens + sum(counts) <= token_limit:
+        return FoldedHistory(summary, history)
+
+    # remaining[k]: tokens from history[k] to the end
+    remaining = list(itertools.accumulate(reversed(counts), initial=0))[::-1]
+    cache = get_summary_cache()
+    keys = summary_prefix_keys(history, settings.llm_model, summary)
+    covered, cached = cache.longest(keys)
+    if cached is not None and count_tokens(cached) + remaining[covered] <= token_limit:
+        metrics.HISTORY_SUMMARIES.inc(result="reused")
+        return FoldedHistory(cached, history[covered:], covered)
+
+    # Fold everything before the most recent turns that fit their share, starting on a question
+    boundary = next(
+        k
+        for k in range(1, len(history) + 1)
+        if remaining[k] <= token_limit * _RECENT_SHARE
+        and (k == len(history) or history[k].role == "user")
+    )
+    if covered >= boundary:
+        # The cached summary itself has grown too long; start over from the original
+        covered, cached = 0, None
+    summary_words = int(token_limit * (1 - _RECENT_SHARE) / 2 * 0.75)
+    try:
+        folded = await _summarize(
+            cached if cached is not None else summary, history[covered:boundary], summary_words
+        )
+    except Exception as exc:
+        logger.exception("Summarizing conversation history failed: %s", exc)
+        metrics.UPSTREAM_ERRORS.inc(upstream="llm", error=type(exc).__name__)
+        metrics.HISTORY_SUMMARIES.inc(result="failed")
+        return FoldedHistory(summary, history)
+
+    cache.set(keys[boundary], folded)
+    metrics.HISTORY_SUMMARIES.inc(result="created")
+    return FoldedHistory(folded, history[boundary:], boundary)
@@ -0,0 +1,240 @@
+"""In-process metrics, exposed at /metrics in the Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label values: recording a
+sample is a dict lookup and an addition, with no locks or background threads.
+Everything runs on the event loop thread, so no synchronization is needed.
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: covers cached lookups (ms) through slow LLM generations (tens of s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes: short voice notes through the 25 MB upload limit
+SIZE_BUCKETS = tuple(float(1024 * 2**n) for n in range(4, 15))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the ``with`` block, if it completes."""
+        start = time.perf_counter()
+        yield
+        self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels: str) -> float:
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return entry[1][0] if entry else 0.0
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                labels = _format_labels(self.labelnames, key, le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+M = TypeVar("M", Counter, Histogram)
+
+
+class Registry:
+    """Named collection of metrics that renders them for a scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+AGENT_BUILD_SECONDS = REGISTRY.histogram(
+    "eli5_agent_build_seconds", "Time to get an ELI agent (near zero when cached)."
+)
+MEMORY_FILL_SECONDS = REGISTRY.histogram(
+    "eli5_memory_fill_seconds", "Time to load the conversation history into chat memory."
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "eli5_llm_first_token_seconds",
+    "Time from starting generation to the first answer token.",
+    ("engine",),
+)
+LLM_GENERATION_SECONDS = REGISTRY.histogram(
+    "eli5_llm_generation_seconds", "Total time to generate an answer.", ("engine",)
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "eli5_upstream_seconds",
+    "Duration of successful Whisper, TTS and history summary calls, until the last byte.",
+    ("upstream",),
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "eli5_upstream_errors_total",
+    "Failed upstream calls, by upstream (llm, whisper, tts) and error type.",
+    ("upstream", "error"),
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    "eli5_upload_bytes", "Size of audio uploads accepted by /transcribe.", buckets=SIZE_BUCKETS
+)
+SSE_EVENTS = REGISTRY.counter(
+    "eli5_sse_events_total", "Server-sent events produced, by event type.", ("event_type",)
+)
+ANSWER_TOKENS = REGISTRY.histogram(
+    "eli5_answer_tokens",
+    "Estimated tokens per completed answer.",
+    buckets=(16.0, 32.0, 64.0, 128.0, 256.0, 512.0, 1024.0, 2048.0),
+)
+CANCELLED_UPSTREAM_CALLS = REGISTRY.counter(
+    "eli5_cancelled_upstream_calls_total",
+    "Upstream calls cancelled because every client waiting on them disconnected.",
+    ("upstream",),
+)
+TOKENS_SAVED = REGISTRY.counter(
+    "eli5_tokens_saved_estimate_total",
+    "Estimated LLM output tokens not generated thanks to cancelled answers.",
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "eli5_queue_wait_seconds",
+    "Time spent waiting for an upstream concurrency slot.",
+    ("upstream",),
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "eli5_admission_rejections_total",
+    "Requests turned away with a 429 because an upstream's wait queue was full.",
+    ("upstream",),
+)
+COALESCED_REQUESTS = REGISTRY.counter(
+    "eli5_coalesced_requests_total",
+    "Requests that joined an identical in-flight call instead of starting their own.",
+    ("flight",),
+)
+HISTORY_SUMMARIES = REGISTRY.counter(
+    "eli5_history_summaries_total",
+    "Long conversations fitted into the prompt by summary, by result (reused, created, failed).",
+    ("result",),
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "eli5_llm_prompt_tokens_total",
+    "Prompt tokens sent to the LLM, by provider and prompt cache use (read, write, none).",
+    ("provider", "cache"),
+)
+LLM_ROUTES = REGISTRY.counter(
+    "eli5_llm_routes_total",
+    "Answers generated, by LLM routing table entry and the model it chose.",
+    ("route", "model"),
+)
+LLM_HEDGES = REGISTRY.counter(
+    "eli5_llm_hedges_total",
+    "LLM requests also sent to the secondary provider, by reason (slow, error) and winner.",
+    ("reason", "winner"),
+)
+VOICE_SESSIONS = REGISTRY.counter(
+    "eli5_voice_sessions_total", "WebSocket voice sessions opened (/ws/voice)."
+)
+ANSWER_RESUMES = REGISTRY.counter(
+    "eli5_answer_resumes_total",
+    "Dropped /ask streams resumed from the answer's event log instead of asking again.",
+)
@@ -1,19 +1,48 @@
 """Ask endpoint for streaming Q&A."""
 
-from fastapi import APIRouter
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import StreamingResponse
-from llama_index.core.llms import ChatMessage
+from llama_index.core.agent.workflow import AgentStream
 from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.core.workflow import Context
 from pydantic import BaseModel, Field
 
-from app.agents.eli import create_eli_agent
+from app import metrics, tracing
+from app.admission import Reservation, get_limiter
+from app.agents.eli import build_chat_messages, create_eli_agent, llm_route, use_direct_chat
+from app.cache import answer_cache_key, get_answer_cache
 from app.config import settings
+from app.disconnect import ClosingStreamingResponse
+from app.hedging import Upstream, hedge_delay, hedged_chat
+from app.llm import LLMConfig, get_fallback_llm, get_llm, record_prompt_usage
+from app.memory import build_memory, fold_history
 from app.messages import HistoryMessage
-from app.streaming import StreamEvent
+from app.routes.tts import synthesize_clip_url
+from app.sessions import Session, get_session_store
+from app.singleflight import Flight, FlightLog, SingleFlight
+from app.streaming import (
+    DONE,
+    AnswerExtractor,
+    SpeechPipeline,
+    StreamEvent,
+    coalesce_deltas,
+    preencode,
+    with_event_id,
+)
 
 router = APIRouter()
 
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_-]{8,64}$"
+
+_THINKING = preencode(StreamEvent(event_type="thinking", content="Let me think about that..."))
+
 
 class AskRequest(BaseModel):
     """Request body for /ask endpoint."""
@@ -22,45 +51,422 @@ class AskRequest(BaseModel):
     age: int = 5
     story_mode: bool = False
     history: list[HistoryMessage] = Field(default_factory=list)
+    # Interleave "audio" events (one playable URL per sentence) with the text
+    speak: bool = False
+    # Keep the conversation on the server: with a session_id only the new question needs
+    # sending. A history sent with a new (or expired) session seeds it.
+    session_id: str | None = Field(default=None, pattern=SESSION_ID_PATTERN)
 
 
-async def generate_response(
-    question: str, history: list[HistoryMessage], age: int, story_mode: bool
-):
-    """Generate streaming response using LLM."""
-    # Thinking event
-    yield StreamEvent(
-        event_type="thinking",
-        content="Let me think about that...",
-    ).to_sse()
-
-    # Create agent and generate response
+async def _agent_events(
+    question: str, memory: ChatMemoryBuffer, age: int, story_mode: bool
+) -> AsyncIterator[StreamEvent]:
+    """Run the ReAct agent, yielding answer deltas and then the final answer."""
     agent = create_eli_agent(settings, age, story_mode)
+    handler = agent.run(question, ctx=Context(agent), memory=memory)
+
+    extractor = AnswerExtractor()
+    try:
+        async for event in handler.stream_events():
+            if not isinstance(event, AgentStream):
+                continue
+            record_prompt_usage(settings.llm_provider, event.raw)
+            delta = extractor.feed(event.response)
+            if delta:
+                yield StreamEvent(event_type="text", content=delta, metadata={"delta": True})
+
+        response = await handler
+    except asyncio.CancelledError:
+        # The workflow runs in its own tasks: stop them too, not just this consumer
+        await handler.cancel_run()
+        raise
+    yield StreamEvent(event_type="text", content=str(response) or "")
+
+
+async def _direct_events(
+    question: str, memory: ChatMemoryBuffer, age: int, story_mode: bool
+) -> AsyncIterator[StreamEvent]:
+    """Stream straight from the LLM's chat API, yielding deltas and then the final answer.
+
+    With a fallback provider configured, it takes over if the primary fails (or,
+    when hedging, is slow) before the first token.
+    """
+    messages = build_chat_messages(age, story_mode, await memory.aget(), question)
+
+    route = llm_route(settings, age, story_mode)
+    limits = LLMConfig.from_settings(settings, route).limits
+    primary = Upstream(settings.llm_provider, get_llm(settings, route), limits)
+    secondary = None
+    if (fallback := get_fallback_llm(settings, route)) is not None:
+        secondary = Upstream(settings.llm_fallback_provider, fallback, limits)
+    hedge_after = hedge_delay(primary.provider) if settings.llm_hedge else None
+
+    answer = ""
+    # aclosing: a cancelled answer closes the provider stream now, not whenever it is collected
+    async with aclosing(hedged_chat(messages, primary, secondary, hedge_after)) as chunks:
+        async for provider, chunk in chunks:
+            record_prompt_usage(provider, chunk.raw)
+            if chunk.delta:
+                answer += chunk.delta
+                yield StreamEvent(event_type="text", content=chunk.delta, metadata={"delta": True})
+
+    yield StreamEvent(event_type="text", content=answer.strip())
+
+
+def _estimate_tokens(chars: int) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return chars // 4
+
+
+def _tokens_saved(generated_tokens: int) -> float:
+    """Estimate the output tokens a cancelled answer would still have produced."""
+    completed = metrics.ANSWER_TOKENS.count()
+    if not completed:
+        return 0.0
+    return max(0.0, metrics.ANSWER_TOKENS.sum() / completed - generated_tokens)
+
+
+def _queue_message(position: int) -> str:
+    if position == 1:
+        return "So many curious questions right now! Yours is next..."
+    return f"So many curious questions right now! Yours is number {position} in line..."
+
+
+async def _answer_frames(
+    question: str,
+    history: list[HistoryMessage],
+    age: int,
+    story_mode: bool,
+    speak: bool,
+    cache_key: str,
+    session: Session | None = None,
+    reservation: Reservation | None = None,
+) -> AsyncIterator[bytes]:
+    """Produce the SSE frames of one answer, from the cache or the LLM.
+
+    Runs once per single-flight key; every request waiting on the same answer
+    receives these frames. A finished answer is appended to ``session``, whose
+    older turns are folded into its summary in the "summarize" memory mode.
+    The LLM call waits on ``reservation``, the place in line its request took
+    when it was admitted.
+    """
+    # Speech is synthesized per sentence while the rest of the answer streams
+    speech = SpeechPipeline(synthesize_clip_url) if speak and settings.stt_api_key else None
+
+    try:
+        cache = get_answer_cache()
+        if cache.enabled and (cached := await cache.get(cache_key)) is not None:
+            yield StreamEvent(event_type="text", content=cached, metadata={"cached": True}).to_sse()
+            if speech:
+                speech.feed(cached)
+                async for audio in speech.drain():
+                    yield audio.to_sse()
+            if session is not None:
+                session.append("user", question)
+                session.append("assistant", cached)
+            yield DONE.to_sse()
+            return
+
+        token_limit = settings.max_tokens - settings.response_token_buffer
+        summary = session.summary if session is not None else None
+        if settings.memory_mode == "summarize":
+            folded = await fold_history(history, token_limit, summary)
+            # Unless a concurrent turn of this session already compacted it
+            if session is not None and folded.covered and session.summary == summary:
+                session.compact(folded.covered, folded.summary)
+            history, summary = folded.recent, folded.summary
+
+        with metrics.MEMORY_FILL_SECONDS.time(), tracing.span("memory"):
+            memory = build_memory(history, token_limit, summary)
+
+        # Wait for an LLM slot, telling everyone waiting on this answer their place in line
+        limiter = get_limiter(f"llm:{settings.llm_provider}")
+        try:
+            async with aclosing(limiter.wait_turn(reservation)) as turn:
+                async for position in turn:
+                    yield StreamEvent(
+                        event_type="thinking",
+                        content=_queue_message(position),
+                        metadata={"queue_position": position},
+                    ).to_sse()
+        except HTTPException as exc:
+            # The reservation was given back before its turn and the line has since filled up.
+            # The response already started, so the 429 can only be reported in the stream.
+            yield StreamEvent(
+                event_type="error", content=exc.detail, metadata={"status": exc.status_code}
+            ).to_sse()
+            return
+
+        # Text deltas as the answer streams in, then the final assembled answer
+        answer = ""
+        engine_name = "direct" if use_direct_chat(settings) else "agent"
+        engine = _direct_events if engine_name == "direct" else _agent_events
+        route = llm_route(settings, age, story_mode)
+        metrics.LLM_ROUTES.inc(route=route, model=LLMConfig.from_settings(settings, route).model)
+        started = time.perf_counter()
+        first_token = True
+        generated_chars = 0
+        # Tokens can arrive faster than a client needs them: send them in fewer, larger frames
+        deltas = coalesce_deltas(
+            engine(question, memory, age, story_mode), settings.sse_delta_flush_seconds
+        )
+        try:
+            async with aclosing(deltas) as events:
+                async for event in events:
+                    if not event.metadata.get("delta"):
+                        answer = event.content
+                    else:
+                        generated_chars += len(event.content)
+                        if first_token:
+                            first_token = False
+                            metrics.LLM_FIRST_TOKEN_SECONDS.observe(
+                                time.perf_counter() - started, engine=engine_name
+                            )
+                        if speech:
+                            speech.feed(event.content)
+                    yield event.to_sse()
+                    if speech:
+                        for audio in speech.ready():
+                            yield audio.to_sse()
+        except asyncio.CancelledError:
+            metrics.CANCELLED_UPSTREAM_CALLS.inc(upstream="llm")
+            metrics.TOKENS_SAVED.inc(_tokens_saved(_estimate_tokens(generated_chars)))
+            raise
+        except Exception as exc:
+            metrics.UPSTREAM_ERRORS.inc(upstream="llm", error=type(exc).__name__)
+            raise
+        finally:
+            limiter.release()
+        generation_seconds = time.perf_counter() - started
+        metrics.LLM_GENERATION_SECONDS.observe(generation_seconds, engine=engine_name)
+        metrics.ANSWER_TOKENS.observe(_estimate_tokens(generated_chars))
+        tracing.record("llm", generation_seconds)
+
+        if speech:
+            async for audio in speech.drain():
+                yield audio.to_sse()
+
+        if cache.enabled and answer:
+            await cache.set(cache_key, answer)
+
+        if session is not None and answer:
+            session.append("user", question)
+            session.append("assistant", answer)
 
-    memory = ChatMemoryBuffer.from_defaults(
-        token_limit=settings.max_tokens - settings.response_token_buffer
+        # Done event
+        yield DONE.to_sse()
+    finally:
+        if speech:
+            speech.cancel()
+
+
+# Identical questions asked at the same time share one generation. One whose clients all
+# dropped keeps going for a while, so a reconnecting client can resume it.
+_answer_flights: SingleFlight[bytes] = SingleFlight(
+    "answers", cancel_abandoned_after=settings.answer_reconnect_grace_seconds
+)
+# Each answer's frames, kept for clients resuming a dropped stream
+_answer_log: FlightLog[bytes] = FlightLog(
+    settings.answer_resume_max_count, settings.answer_resume_ttl_seconds
+)
+
+
+async def _numbered_frames(flight: Flight[bytes], start: int = 0) -> AsyncIterator[bytes]:
+    """Follow an answer's frames from ``start``, each with the event ID ``<answer_id>:<index>``."""
+    index = start
+    # aclosing: a disconnected client stops counting as a subscriber right away
+    async with aclosing(flight.subscribe(start)) as frames:
+        async for frame in frames:
+            yield with_event_id(frame, f"{flight.id}:{index}")
+            index += 1
+
+
+@dataclass(slots=True)
+class PendingAnswer:
+    """An answer about to be streamed: its conversation and the keys it is cached and shared by."""
+
+    question: str
+    history: list[HistoryMessage]
+    age: int
+    story_mode: bool
+    speak: bool
+    session: Session | None
+    cache_key: str
+    flight_key: str
+    # Set once joined, so the caller can cancel the generation
+    flight: Flight[bytes] | None = None
+    # The LLM slot, or place in line for one, taken by admit()
+    reservation: Reservation | None = None
+
+    def admit(self) -> None:
+        """Reserve an LLM slot or a place in line for one, raising a 429 if the line is full.
+
+        Called before the response starts, so a burst is turned away with a real
+        429 rather than a stream that breaks. A cached answer, or one already
+        being generated, needs no slot. Only the memory tier of the cache is
+        checked, so this never waits on disk. Pair with ``aclose()``.
+        """
+        if self.flight_key in _answer_flights or get_answer_cache().in_memory(self.cache_key):
+            return
+        self.reservation = get_limiter(f"llm:{settings.llm_provider}").reserve()
+
+    async def aclose(self) -> None:
+        """Give back the reservation if the generation never took it over.
+
+        That happens when the answer came from the disk cache, another request
+        started the same answer first, or the client left before its turn.
+        """
+        if self.reservation is not None:
+            self.reservation.cancel()
+
+    def join(self) -> Flight[bytes]:
+        """Join the generation of this answer, starting it if nobody else is waiting on it."""
+        flight = _answer_flights.join(
+            self.flight_key,
+            lambda: _answer_frames(
+                self.question,
+                self.history,
+                self.age,
+                self.story_mode,
+                self.speak,
+                self.cache_key,
+                self.session,
+                self.reservation,
+            ),
+        )
+        _answer_log.add(flight)
+        self.flight = flight
+        return flight
+
+
+def prepare_answer(
+    question: str,
+    history: list[HistoryMessage],
+    age: int,
+    story_mode: bool,
+    speak: bool = False,
+    session_id: str | None = None,
+) -> PendingAnswer:
+    """Resolve the conversation an answer continues, and the keys it is cached and shared by."""
+    session = None
+    flight_key_suffix = ""
+    if session_id is not None:
+        session = get_session_store().get(session_id)
+        if not session:
+            session.extend(history)
+        history = session.history()
+        # The answer is appended to one session, so sessions don't share a flight
+        flight_key_suffix = f":session={session_id}"
+
+    cache_key = answer_cache_key(
+        question,
+        age,
+        story_mode,
+        LLMConfig.from_settings(settings, llm_route(settings, age, story_mode)),
+        history,
+        session.summary if session is not None else None,
     )
+    return PendingAnswer(
+        question,
+        history,
+        age,
+        story_mode,
+        speak,
+        session,
+        cache_key,
+        f"{cache_key}:speak={speak}{flight_key_suffix}",
+    )
+
+
+async def stream_answer(answer: PendingAnswer) -> AsyncIterator[bytes]:
+    """Stream a prepared answer's SSE frames, then the request's stage timings."""
+    # Thinking event
+    yield _THINKING.to_sse()
 
-    for msg in history:
-        memory.put(ChatMessage(role=msg.role, content=msg.content))
+    async with aclosing(_numbered_frames(answer.join())) as frames:
+        async for frame in frames:
+            yield frame
 
-    response = await agent.run(question, ctx=Context(agent), memory=memory)
+    # Headers went out before generation, so the stage breakdown trails the answer
+    if (trace := tracing.current_trace()) is not None:
+        yield StreamEvent(event_type="timing", metadata=trace.as_dict()).to_sse()
+
+
+async def generate_response(
+    question: str,
+    history: list[HistoryMessage],
+    age: int,
+    story_mode: bool,
+    speak: bool = False,
+    session_id: str | None = None,
+):
+    """Generate streaming response using LLM."""
+    answer = prepare_answer(question, history, age, story_mode, speak, session_id)
+    async with aclosing(stream_answer(answer)) as frames:
+        async for frame in frames:
+            yield frame
 
-    # Text response
-    yield StreamEvent(event_type="text", content=str(response) or "").to_sse()
 
-    # Done event
-    yield StreamEvent(event_type="done").to_sse()
+def sse_response(
+    frames: AsyncIterator[bytes], on_close: Callable[[], Awaitable[Any]] | None = None
+) -> StreamingResponse:
+    """Stream SSE frames to the client, running ``on_close`` however the response ends."""
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+    }
+    if on_close is not None:
+        return ClosingStreamingResponse(
+            frames, on_close, media_type="text/event-stream", headers=headers
+        )
+    return StreamingResponse(frames, media_type="text/event-stream", headers=headers)
 
 
 @router.post("/ask")
 async def ask(request: AskRequest):
     """Stream a response to the user's question."""
-    return StreamingResponse(
-        generate_response(request.question, request.history, request.age, request.story_mode),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        },
+    tracing.mark_validated()
+    answer = prepare_answer(
+        request.question,
+        request.history,
+        request.age,
+        request.story_mode,
+        speak=request.speak,
+        session_id=request.session_id,
     )
+    # Turn a burst away up front; queued answers report their place in line as they wait
+    answer.admit()
+    return sse_response(stream_answer(answer), on_close=answer.aclose)
+
+
+def _resume_start(answer_id: str, last_event_id: str | None) -> int:
+    """Return the index of the first frame a client with ``last_event_id`` hasn't seen."""
+    if last_event_id is None:
+        return 0
+    event_answer_id, _, index = last_event_id.rpartition(":")
+    if event_answer_id != answer_id or not index.isdigit():
+        raise HTTPException(status_code=400, detail="Last-Event-ID is not from this answer.")
+    return int(index) + 1
+
+
+@router.get("/ask/{answer_id}/events")
+async def resume_answer(answer_id: str, last_event_id: str | None = Header(default=None)):
+    """Resume a dropped /ask stream: replay the events after ``Last-Event-ID``, then follow live.
+
+    Works while the answer is generating and for ``answer_resume_ttl_seconds``
+    after; the answer is never generated again.
+    """
+    flight = _answer_log.get(answer_id)
+    if flight is None:
+        raise HTTPException(
+            status_code=404, detail="That answer isn't available any more. Please ask again."
+        )
+    start = _resume_start(answer_id, last_event_id)
+    metrics.ANSWER_RESUMES.inc()
+    return sse_response(_numbered_frames(flight, start))
+
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def end_session(session_id: str) -> None:
+    """Forget a conversation kept on the server."""
+    get_session_store().delete(session_id)
@@ -1,29 +1,53 @@
 """Transcribe audio files using OpenAI Whisper."""
 
+import asyncio
 import functools
 import logging
+import time
+
 import openai
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, HTTPException, Request, UploadFile
 from openai import AsyncOpenAI
 
+from app import metrics, tracing
+from app.admission import get_limiter
 from app.config import settings
+from app.disconnect import cancel_on_disconnect
+from app.uploads import MAX_AUDIO_BYTES, AudioUploadRoute, too_large
 
-router = APIRouter()
+router = APIRouter(route_class=AudioUploadRoute)
 logger = logging.getLogger(__name__)
 
-# 25 MB — matches OpenAI Whisper's own file size limit
-_MAX_AUDIO_BYTES = 25 * 1024 * 1024
-
 
 @functools.lru_cache(maxsize=1)
 def _get_whisper_client() -> AsyncOpenAI:
     """Return the shared AsyncOpenAI client, constructed once per process."""
-    return AsyncOpenAI(api_key=settings.stt_api_key)
+    return AsyncOpenAI(api_key=settings.stt_api_key, base_url=settings.stt_api_base)
 
 
-@router.post("/transcribe")
-async def transcribe(audio: UploadFile) -> dict[str, str]:
-    """Transcribe an audio file using OpenAI Whisper."""
+async def _call_whisper(audio: UploadFile) -> str:
+    """Send the spooled upload to Whisper, recording its latency or cancellation."""
+    try:
+        async with get_limiter("whisper").slot():
+            started = time.perf_counter()
+            with tracing.span("whisper"):
+                transcript = await _get_whisper_client().audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(audio.filename or "recording", audio.file, audio.content_type),
+                )
+    except asyncio.CancelledError:
+        metrics.CANCELLED_UPSTREAM_CALLS.inc(upstream="whisper")
+        raise
+    metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream="whisper")
+    return transcript.text
+
+
+async def transcribe_upload(audio: UploadFile, request: Request | None = None) -> str:
+    """Check an uploaded recording and transcribe it, raising the HTTP error for any failure.
+
+    Shared by /transcribe and the voice routes. With ``request``, Whisper is
+    cancelled if its client disconnects.
+    """
     if not settings.stt_api_key:
         raise HTTPException(
             status_code=503,
@@ -36,26 +60,34 @@ async def transcribe(audio: UploadFile) -> dict[str, str]:
             detail=f"Unsupported media type '{audio.content_type}'. Expected an audio/* file.",
         )
 
-    data = await audio.read()
-
-    if len(data) == 0:
+    # The route has already enforced the size limit while the upload arrived;
+    # this catches a file that fits only thanks to the multipart overhead slack
+    if not audio.size:
         raise HTTPException(status_code=400, detail="Audio file is empty.")
 
-    if len(data) > _MAX_AUDIO_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Audio file exceeds the {_MAX_AUDIO_BYTES // (1024 * 1024)} MB limit.",
-        )
+    if audio.size > MAX_AUDIO_BYTES:
+        raise too_large()
+
+    get_limiter("whisper").check()
+
+    metrics.UPLOAD_BYTES.observe(audio.size)
 
+    # Hand Whisper the spooled file itself so the upload is streamed, not copied
+    await audio.seek(0)
     try:
-        transcript = await _get_whisper_client().audio.transcriptions.create(
-            model="whisper-1",
-            file=(audio.filename or "recording", data, audio.content_type),
-        )
+        if request is None:
+            return await _call_whisper(audio)
+        return await cancel_on_disconnect(request, _call_whisper(audio))
     except openai.OpenAIError as exc:
+        metrics.UPSTREAM_ERRORS.inc(upstream="whisper", error=type(exc).__name__)
         logger.exception("OpenAI Whisper transcription failed: %s", exc)
         raise HTTPException(
             status_code=502, detail="Transcription service unavailable. Please try again."
         ) from exc
 
-    return {"transcript": transcript.text}
+
+@router.post("/transcribe")
+async def transcribe(audio: UploadFile, request: Request) -> dict[str, str]:
+    """Transcribe an audio file using OpenAI Whisper."""
+    tracing.mark_validated()
+    return {"transcript": await transcribe_upload(audio, request)}
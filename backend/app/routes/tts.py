@@ -1,19 +1,42 @@
 """Synthesize speech using OpenAI TTS."""
 
+import asyncio
+import base64
 import functools
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Any, BinaryIO
 
+import httpx
 import openai
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
+from app import metrics, tracing
+from app.admission import get_limiter
+from app.cache import audio_cache_key, get_audio_cache
 from app.config import settings
+from app.disconnect import ClosingStreamingResponse, cancel_on_disconnect
+from app.singleflight import Flight, SingleFlight
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+_TTS_MODEL = "tts-1"
+_TTS_VOICE = "nova"
+_TTS_FORMAT = "mp3"
+_MEDIA_TYPE = "audio/mpeg"
+
+# Read size when following a cached clip: per-request memory stays at roughly one chunk.
+# Upstream audio is forwarded as it arrives instead (bounded by the transport's reads):
+# waiting to fill a chunk would delay the first byte, and hold back clips shorter than one.
+_CHUNK_BYTES = 16 * 1024
+
 
 class TTSRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=4096)
@@ -22,24 +45,175 @@ class TTSRequest(BaseModel):
 @functools.lru_cache(maxsize=1)
 def _get_tts_client() -> AsyncOpenAI:
     """Return the shared AsyncOpenAI client, constructed once per process."""
-    return AsyncOpenAI(api_key=settings.stt_api_key)
+    return AsyncOpenAI(api_key=settings.stt_api_key, base_url=settings.stt_api_base)
+
+
+def _audio_response(key: str) -> FileResponse:
+    """Serve a cached clip from disk; FileResponse handles Range requests."""
+    return FileResponse(
+        get_audio_cache().path_for(key),
+        media_type=_MEDIA_TYPE,
+        headers={
+            "ETag": f'"{key}"',
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Content-Location": f"/tts/audio/{key}",
+        },
+    )
+
+
+@asynccontextmanager
+async def _open_speech_stream(text: str) -> AsyncIterator[Any]:
+    """Open a streamed OpenAI speech response, recording its latency, failure or cancellation."""
+    try:
+        async with get_limiter("tts").slot():
+            started = time.perf_counter()
+            async with _get_tts_client().audio.speech.with_streaming_response.create(
+                model=_TTS_MODEL,
+                voice=_TTS_VOICE,
+                input=text,
+                response_format=_TTS_FORMAT,
+            ) as upstream:
+                yield upstream
+    except (openai.OpenAIError, httpx.HTTPError) as exc:
+        metrics.UPSTREAM_ERRORS.inc(upstream="tts", error=type(exc).__name__)
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # Abandoned by every client; leaving the context closes the upstream stream
+        metrics.CANCELLED_UPSTREAM_CALLS.inc(upstream="tts")
+        raise
+    metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream="tts")
+
+
+async def _synthesize_into_cache(text: str, key: str) -> AsyncIterator[tuple[Path, int]]:
+    """Stream one clip from OpenAI into the audio cache, reporting progress.
+
+    Yields ``(path, bytes_written)``: the temp file as soon as the upstream
+    stream is open, again after every chunk, and finally the committed cache
+    path. Readers follow the file instead of holding chunks in memory. The clip
+    is only committed once the upstream stream finishes; a failure part-way
+    through discards the partial file.
+    """
+    cache = get_audio_cache()
+    async with _open_speech_stream(text) as upstream:
+        tmp, tmp_path = cache.open_temp()
+        try:
+            written = 0
+            with tmp:
+                yield tmp_path, written
+                async for chunk in upstream.iter_bytes():
+                    tmp.write(chunk)
+                    tmp.flush()
+                    written += len(chunk)
+                    yield tmp_path, written
+            yield cache.commit(key, tmp_path), written
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+# Identical clips requested at the same time share one synthesis
+_speech_flights: SingleFlight[tuple[Path, int]] = SingleFlight(
+    "speech", cancel_abandoned_after=settings.abandoned_work_grace_seconds
+)
+
+
+def _join_speech_flight(text: str, key: str) -> Flight[tuple[Path, int]]:
+    return _speech_flights.join(key, lambda: _synthesize_into_cache(text, key))
+
+
+async def _open_flight_file(flight: Flight[tuple[Path, int]], path: Path, key: str) -> BinaryIO:
+    """Open the file a flight is writing, wherever it is by the time this client gets to it."""
+    for candidate in (path, get_audio_cache().path_for(key)):
+        try:
+            return open(candidate, "rb")
+        except FileNotFoundError:
+            # The temp file is renamed on commit and deleted on failure
+            continue
+    await flight.wait()  # raises the upstream error if the synthesis failed
+    raise FileNotFoundError(path)
+
+
+async def _follow_clip(flight: Flight[tuple[Path, int]], key: str) -> AsyncIterator[bytes]:
+    """Stream a clip to one client by following the file its flight is writing."""
+    clip: BinaryIO | None = None
+    sent = 0
+    try:
+        async for path, written in flight.subscribe():
+            if clip is None:
+                clip = await _open_flight_file(flight, path, key)
+            while sent < written:
+                chunk = clip.read(min(_CHUNK_BYTES, written - sent))
+                if not chunk:
+                    break
+                sent += len(chunk)
+                yield chunk
+    except (openai.OpenAIError, httpx.HTTPError) as exc:
+        # Too late for a 502: abort the response so the client sees it as incomplete
+        logger.exception("OpenAI TTS stream failed: %s", exc)
+        raise
+    finally:
+        if clip is not None:
+            clip.close()
+
+
+async def _relay_audio(upstream: Any) -> AsyncIterator[bytes]:
+    """Forward audio chunks to the client as they arrive (audio cache disabled)."""
+    try:
+        async for chunk in upstream.iter_bytes():
+            yield chunk
+    except (openai.OpenAIError, httpx.HTTPError) as exc:
+        logger.exception("OpenAI TTS stream failed: %s", exc)
+        raise
+
+
+async def synthesize_clip_url(text: str) -> str:
+    """Synthesize ``text`` in full and return a URL the client can play it from.
+
+    Clips land in the audio cache and are addressed as ``/tts/audio/{key}``.
+    With the cache disabled the clip is inlined as a ``data:`` URL instead.
+    Raises ``openai.OpenAIError`` or ``httpx.HTTPError`` if synthesis fails.
+    """
+    cache = get_audio_cache()
+    key = audio_cache_key(text, _TTS_MODEL, _TTS_VOICE, _TTS_FORMAT)
+    if cache.enabled:
+        if cache.get(key) is None:
+            with tracing.span("tts"):
+                await _join_speech_flight(text, key).wait()
+        return f"/tts/audio/{key}"
+
+    with tracing.span("tts"):
+        async with _open_speech_stream(text) as upstream:
+            audio = b"".join([chunk async for chunk in upstream.iter_bytes()])
+    return f"data:{_MEDIA_TYPE};base64,{base64.b64encode(audio).decode()}"
 
 
 @router.post("/tts")
-async def synthesize(request: TTSRequest) -> Response:
-    """Synthesize speech from text using OpenAI TTS."""
+async def synthesize(request: TTSRequest, http_request: Request) -> Response:
+    """Synthesize speech from text using OpenAI TTS, streaming audio as it is generated."""
+    tracing.mark_validated()
     if not settings.stt_api_key:
         raise HTTPException(
             status_code=503,
             detail="TTS is not configured. Set STT_API_KEY on the server.",
         )
 
+    cache = get_audio_cache()
+    key = audio_cache_key(request.text, _TTS_MODEL, _TTS_VOICE, _TTS_FORMAT)
+    if cache.enabled and cache.get(key) is not None:
+        return _audio_response(key)
+
+    get_limiter("tts").check()
+
+    # Open the upstream stream before responding so failures can still be a 502
     try:
-        response = await _get_tts_client().audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=request.text,
-        )
+        with tracing.span("tts"):
+            if cache.enabled:
+                flight = _join_speech_flight(request.text, key)
+                await cancel_on_disconnect(http_request, flight.ready())
+            else:
+                stack = AsyncExitStack()
+                upstream = await cancel_on_disconnect(
+                    http_request, stack.enter_async_context(_open_speech_stream(request.text))
+                )
     except openai.OpenAIError as exc:
         logger.exception("OpenAI TTS failed: %s", exc)
         raise HTTPException(
@@ -47,4 +221,28 @@ async def synthesize(request: TTSRequest) -> Response:
             detail="TTS service unavailable. Please try again.",
         ) from exc
 
-    return Response(content=response.content, media_type="audio/mpeg")
+    if not cache.enabled:
+        # Closes the upstream stream and frees its limiter slot, even if the body never starts
+        return ClosingStreamingResponse(
+            _relay_audio(upstream), stack.aclose, media_type=_MEDIA_TYPE
+        )
+
+    return StreamingResponse(
+        _follow_clip(flight, key),
+        media_type=_MEDIA_TYPE,
+        headers={"Content-Location": f"/tts/audio/{key}"},
+    )
+
+
+@router.get("/tts/audio/{key}")
+async def cached_audio(key: str, request: Request) -> Response:
+    """Serve a previously synthesized clip by its content hash, with ETag and Range support."""
+    cache = get_audio_cache()
+    if not cache.enabled or len(key) != 64 or not key.isalnum() or cache.get(key) is None:
+        raise HTTPException(status_code=404, detail="Audio not found.")
+
+    # Content-addressed, so a matching ETag means the client already has these bytes
+    if request.headers.get("if-none-match") == f'"{key}"':
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+    return _audio_response(key)
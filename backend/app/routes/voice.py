@@ -0,0 +1,242 @@
+"""Voice conversations: recorded questions in, transcripts and Eli's streamed answers out."""
+
+import asyncio
+import logging
+import tempfile
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from starlette.datastructures import Headers
+
+from app import metrics, tracing
+from app.messages import HistoryMessage
+from app.routes.ask import (
+    SESSION_ID_PATTERN,
+    PendingAnswer,
+    prepare_answer,
+    sse_response,
+    stream_answer,
+)
+from app.routes.transcribe import transcribe_upload
+from app.sessions import get_session_store
+from app.streaming import StreamEvent, sse_data
+from app.uploads import MAX_AUDIO_BYTES, AudioUploadRoute, too_large
+
+router = APIRouter(route_class=AudioUploadRoute)
+logger = logging.getLogger(__name__)
+
+_history_adapter = TypeAdapter(list[HistoryMessage])
+
+
+async def _voice_frames(answer: PendingAnswer) -> AsyncIterator[bytes]:
+    """The transcript, so the client can show what it heard, then the /ask stream."""
+    yield StreamEvent(event_type="transcript", content=answer.question).to_sse()
+    async with aclosing(stream_answer(answer)) as frames:
+        async for frame in frames:
+            yield frame
+
+
+@router.post("/ask/voice")
+async def ask_voice(
+    audio: UploadFile,
+    request: Request,
+    age: int = Form(5),
+    story_mode: bool = Form(False),
+    speak: bool = Form(False),
+    session_id: str | None = Form(default=None, pattern=SESSION_ID_PATTERN),
+    history: str = Form("[]", description="Earlier turns, as the JSON list /ask takes"),
+):
+    """Answer a spoken question in one request: /transcribe, /ask and (with ``speak``) /tts.
+
+    Streams the same events as /ask, preceded by a ``transcript`` event.
+    """
+    tracing.mark_validated()
+    try:
+        turns = _history_adapter.validate_json(history)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=422, detail="history must be a JSON list of messages."
+        ) from exc
+
+    transcript = (await transcribe_upload(audio, request)).strip()
+    if not transcript:
+        raise HTTPException(
+            status_code=422, detail="No question was heard in that recording. Please try again."
+        )
+    answer = prepare_answer(transcript, turns, age, story_mode, speak, session_id)
+    # Only now is the answer's cache key known: a cached or in-flight one needs no LLM slot
+    answer.admit()
+    return sse_response(_voice_frames(answer), on_close=answer.aclose)
+
+
+class VoiceMessage(BaseModel):
+    """A text message from a voice session client (audio chunks arrive as binary messages)."""
+
+    # "question": ask ``content``; "audio_end": ask the audio sent since the last one;
+    # "cancel": stop the answer in progress. A new question also stops it.
+    type: Literal["question", "audio_end", "cancel"]
+    content: str = ""
+    content_type: str = "audio/webm"
+
+
+class _Recording:
+    """Audio chunks of the next spoken question, spooled to disk past 1 MB like an upload."""
+
+    def __init__(self) -> None:
+        self._file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self.size = 0
+        # Past the size limit the rest of the recording is dropped, and it isn't answered
+        self.rejected = False
+
+    def write(self, chunk: bytes) -> None:
+        if self.rejected:
+            return
+        if self.size + len(chunk) > MAX_AUDIO_BYTES:
+            self.rejected = True
+            self._file.truncate(0)
+            raise too_large()
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def upload(self, content_type: str) -> UploadFile:
+        self._file.seek(0)
+        return UploadFile(
+            self._file,
+            size=self.size,
+            filename="recording",
+            headers=Headers({"content-type": content_type}),
+        )
+
+
+async def _send_error(websocket: WebSocket, status_code: int, detail: str) -> None:
+    error = StreamEvent(event_type="error", content=detail, metadata={"status": status_code})
+    await websocket.send_text(sse_data(error.to_sse()))
+
+
+async def _answer_turn(
+    websocket: WebSocket,
+    question: str,
+    recording: UploadFile | None,
+    age: int,
+    story_mode: bool,
+    speak: bool,
+    session_id: str,
+) -> None:
+    """Answer one question of a voice session, sending its events (or an error event)."""
+    answer = None
+    try:
+        if recording is not None:
+            question = await transcribe_upload(recording)
+        question = question.strip()
+        if not question:
+            raise HTTPException(status_code=422, detail="No question was heard. Please try again.")
+        # Only the new question is needed: the session holds the conversation so far
+        answer = prepare_answer(question, [], age, story_mode, speak, session_id)
+        answer.admit()
+        stream = stream_answer(answer) if recording is None else _voice_frames(answer)
+        async with aclosing(stream) as frames:
+            async for frame in frames:
+                await websocket.send_text(sse_data(frame))
+    except asyncio.CancelledError:
+        # Interrupted: stop generating now (not after the reconnect grace period), so the
+        # old answer costs no more tokens and is never added to the session
+        if answer is not None and answer.flight is not None:
+            answer.flight.cancel()
+        raise
+    except HTTPException as exc:
+        await _send_error(websocket, exc.status_code, exc.detail)
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Voice session turn failed")
+        await _send_error(websocket, 502, "Eli couldn't answer that one. Please try again.")
+    finally:
+        if answer is not None:
+            await answer.aclose()
+        if recording is not None:
+            await recording.close()
+
+
+async def _stop(turn: asyncio.Task | None) -> None:
+    if turn is not None and not turn.done():
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+
+
+@router.websocket("/ws/voice")
+async def voice_session(
+    websocket: WebSocket,
+    age: int = 5,
+    story_mode: bool = False,
+    speak: bool = False,
+    session_id: str | None = Query(default=None, pattern=SESSION_ID_PATTERN),
+):
+    """A whole conversation over one connection, spoken or typed.
+
+    Send audio chunks as binary messages followed by ``{"type": "audio_end"}``,
+    or ``{"type": "question", "content": ...}``. Each answer comes back as the
+    /ask events (JSON text messages, a ``transcript`` first for audio), or an
+    ``error`` event. The conversation is kept in a server-side session, under
+    ``session_id`` if given (so a reconnect continues it), otherwise for as long
+    as the connection is open.
+    """
+    await websocket.accept()
+    metrics.VOICE_SESSIONS.inc()
+    owns_session = session_id is None
+    session_id = session_id or uuid.uuid4().hex
+    recording = _Recording()
+    turn: asyncio.Task | None = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                try:
+                    recording.write(message["bytes"])
+                except HTTPException as exc:
+                    await _send_error(websocket, exc.status_code, exc.detail)
+                continue
+
+            try:
+                request = VoiceMessage.model_validate_json(message.get("text") or "")
+            except ValidationError:
+                await _send_error(
+                    websocket, 400, "Expected a question, audio_end or cancel message."
+                )
+                continue
+            await _stop(turn)
+            turn = None
+            if request.type == "cancel":
+                continue
+            upload = None
+            if request.type == "audio_end":
+                finished, recording = recording, _Recording()
+                if finished.rejected:
+                    finished.close()
+                    continue
+                upload = finished.upload(request.content_type)
+            turn = asyncio.create_task(
+                _answer_turn(websocket, request.content, upload, age, story_mode, speak, session_id)
+            )
+    finally:
+        await _stop(turn)
+        recording.close()
+        if owns_session:
+            get_session_store().delete(session_id)
@@ -0,0 +1,104 @@
+"""Server-side conversation sessions for /ask."""
+
+import functools
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+
+from app.cache.tokens import count_tokens
+from app.config import settings
+from app.messages import HistoryMessage
+
+
+class Session:
+    """One conversation's history, kept within a token budget.
+
+    Each message is tokenized once, when it is added. The running total lets
+    the oldest messages be dropped as new turns arrive without re-counting the
+    rest of the conversation.
+    """
+
+    def __init__(self, token_budget: int, count: Callable[[str], int] = count_tokens):
+        self.token_budget = token_budget
+        self.tokens = 0
+        # Summary of the turns folded out of the history (memory_mode "summarize")
+        self.summary: str | None = None
+        self._count = count
+        self._messages: deque[tuple[HistoryMessage, int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def history(self) -> list[HistoryMessage]:
+        return [message for message, _ in self._messages]
+
+    def append(self, role: str, content: str) -> None:
+        """Add a message and drop the oldest ones that no longer fit the budget."""
+        tokens = self._count(content)
+        self._messages.append((HistoryMessage(role=role, content=content), tokens))
+        self.tokens += tokens
+        self._trim()
+
+    def extend(self, messages: list[HistoryMessage]) -> None:
+        for message in messages:
+            self.append(message.role, message.content)
+
+    def compact(self, covered: int, summary: str) -> None:
+        """Replace the oldest ``covered`` messages with ``summary``, which stands in for them."""
+        for _ in range(min(covered, len(self._messages))):
+            _, tokens = self._messages.popleft()
+            self.tokens -= tokens
+        self.summary = summary
+
+    def _trim(self) -> None:
+        # Like ChatMemoryBuffer, never start the history on an assistant message
+        while self._messages and (
+            self.tokens > self.token_budget or self._messages[0][0].role != "user"
+        ):
+            _, tokens = self._messages.popleft()
+            self.tokens -= tokens
+
+
+class SessionStore:
+    """In-memory sessions by ID, least-recently-used first out, expiring after ``ttl_seconds`` idle."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, token_budget: int):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.token_budget = token_budget
+        self._sessions: OrderedDict[str, tuple[float, Session]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        """Return the session for ``session_id``, starting an empty one if it is new or expired."""
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry is None or entry[0] < now:
+            session = Session(self.token_budget)
+        else:
+            session = entry[1]
+        self._sessions[session_id] = (now + self.ttl_seconds, session)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+@functools.lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    """Return the shared session store, constructed once per process."""
+    token_budget = settings.max_tokens - settings.response_token_buffer
+    if settings.memory_mode == "summarize":
+        # Keep turns past the prompt budget until they are folded into the summary
+        # (compaction keeps sessions well under this; the cap is a backstop)
+        token_budget *= 4
+    return SessionStore(
+        max_sessions=settings.session_max_count,
+        ttl_seconds=settings.session_ttl_seconds,
+        token_budget=token_budget,
+    )
@@ -0,0 +1,197 @@
+"""Coalesce concurrent identical requests onto one upstream call."""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+
+from app import metrics
+
+
+class Flight[T]:
+    """One running upstream call, shared by everyone who asks for the same thing.
+
+    The source iterator runs in its own task. Every item it produces is
+    recorded, so a subscriber that joins late first replays what it missed and
+    then follows along live. If the source fails, each subscriber re-raises the
+    error once it has seen the items produced before the failure.
+
+    With ``cancel_abandoned_after`` set, the source is cancelled once nobody
+    has been subscribed to or waiting on it for that many seconds, so work
+    whose clients all went away stops consuming upstream capacity.
+    """
+
+    def __init__(self, source: AsyncIterator[T], cancel_abandoned_after: float | None = None):
+        self.id = uuid.uuid4().hex
+        self.items: list[T] = []
+        self.done = False
+        self.finished_at: float | None = None
+        self.cancelled = False
+        self.error: BaseException | None = None
+        self._source = source
+        self._changed = asyncio.Condition()
+        self._task: asyncio.Task[None] | None = None
+        self._cancel_abandoned_after = cancel_abandoned_after
+        self._interested = 0
+
+    def start(self, on_done: Callable[[], None] | None = None) -> None:
+        self._task = asyncio.create_task(self._pump(on_done))
+
+    async def _pump(self, on_done: Callable[[], None] | None) -> None:
+        try:
+            async for item in self._source:
+                async with self._changed:
+                    self.items.append(item)
+                    self._changed.notify_all()
+        except BaseException as exc:
+            self.error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            if on_done is not None:
+                on_done()
+            async with self._changed:
+                self.done = True
+                self.finished_at = time.monotonic()
+                self._changed.notify_all()
+
+    async def ready(self) -> None:
+        """Wait for the first item; raise the source's error if it failed before producing one."""
+        with self._interest():
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.items or self.done)
+        if not self.items and self.error is not None:
+            raise self.error
+
+    async def wait(self) -> None:
+        """Wait for the source to finish; raise its error if it failed."""
+        with self._interest():
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done)
+        if self.error is not None:
+            raise self.error
+
+    async def subscribe(self, start: int = 0) -> AsyncIterator[T]:
+        """Yield every item from ``start`` onwards, live, until the source finishes."""
+        index = start
+        with self._interest():
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: len(self.items) > index or self.done)
+                    available = self.items[index:]
+                    finished = self.done
+                for item in available:
+                    yield item
+                index += len(available)
+                if finished and index >= len(self.items):
+                    if self.error is not None:
+                        raise self.error
+                    return
+
+    @contextmanager
+    def _interest(self) -> Iterator[None]:
+        """Count a subscriber or waiter; schedule cancellation when the last one leaves."""
+        self._interested += 1
+        try:
+            yield
+        finally:
+            self._interested -= 1
+            if self._interested == 0 and self._cancel_abandoned_after is not None and not self.done:
+                asyncio.get_running_loop().call_later(
+                    self._cancel_abandoned_after, self._cancel_if_abandoned
+                )
+
+    def cancel(self) -> None:
+        """Stop the source now, for every subscriber; a cancelled call is never joined."""
+        if not self.done and self._task is not None:
+            self.cancelled = True
+            self._task.cancel()
+
+    def _cancel_if_abandoned(self) -> None:
+        if self._interested == 0:
+            self.cancel()
+
+
+class SingleFlight[T]:
+    """Registry of in-flight calls by key: the first caller starts one, the rest join it.
+
+    A key is released as soon as its call finishes, so later requests start
+    fresh (and normally hit a cache the finished call populated). A call being
+    cancelled as abandoned is never joined.
+    """
+
+    def __init__(self, name: str = "default", cancel_abandoned_after: float | None = None):
+        self.name = name
+        self.cancel_abandoned_after = cancel_abandoned_after
+        self.coalesced = 0
+        self._flights: dict[str, Flight[T]] = {}
+
+    def join(self, key: str, source: Callable[[], AsyncIterator[T]]) -> Flight[T]:
+        """Return the in-flight call for ``key``, starting ``source()`` if there is none."""
+        flight = self._flights.get(key)
+        if flight is not None and not flight.cancelled:
+            self.coalesced += 1
+            metrics.COALESCED_REQUESTS.inc(flight=self.name)
+            return flight
+
+        flight = Flight(source(), self.cancel_abandoned_after)
+        self._flights[key] = flight
+
+        def release() -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight.start(on_done=release)
+        return flight
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a call for ``key`` is in flight and can be joined."""
+        flight = self._flights.get(key)
+        return flight is not None and not flight.cancelled
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+
+class FlightLog[T]:
+    """Recent flights by ID, kept ``ttl_seconds`` after they finish so clients can resume them.
+
+    Holds at most ``max_flights``, dropping the oldest first. A flight's
+    recorded items are its log: ``subscribe(start)`` replays from any point.
+    """
+
+    def __init__(self, max_flights: int, ttl_seconds: float):
+        self.max_flights = max_flights
+        self.ttl_seconds = ttl_seconds
+        self._flights: OrderedDict[str, Flight[T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def add(self, flight: Flight[T]) -> None:
+        if self.max_flights <= 0 or flight.id in self._flights:
+            return
+        self._flights[flight.id] = flight
+        while len(self._flights) > self.max_flights:
+            self._flights.popitem(last=False)
+        # Entries are in start order, so this only clears the oldest expired ones; get() checks too
+        while self._flights and self._expired(next(iter(self._flights.values()))):
+            self._flights.popitem(last=False)
+
+    def get(self, flight_id: str) -> Flight[T] | None:
+        """Return the flight, unless it is unknown, expired, failed or was cancelled."""
+        flight = self._flights.get(flight_id)
+        if flight is None or flight.cancelled or flight.error is not None:
+            return None
+        if self._expired(flight):
+            del self._flights[flight_id]
+            return None
+        return flight
+
+    def _expired(self, flight: Flight[T]) -> bool:
+        return (
+            flight.finished_at is not None
+            and time.monotonic() - flight.finished_at > self.ttl_seconds
+        )
@@ -1,5 +1,24 @@
 """Streaming module for SSE events."""
 
-from app.streaming.events import StreamEvent
+from app.streaming.events import (
+    DONE,
+    StreamEvent,
+    coalesce_deltas,
+    preencode,
+    sse_data,
+    with_event_id,
+)
+from app.streaming.react import AnswerExtractor
+from app.streaming.speech import SentenceSplitter, SpeechPipeline
 
-__all__ = ["StreamEvent"]
+__all__ = [
+    "DONE",
+    "AnswerExtractor",
+    "SentenceSplitter",
+    "SpeechPipeline",
+    "StreamEvent",
+    "coalesce_deltas",
+    "preencode",
+    "sse_data",
+    "with_event_id",
+]
@@ -1,26 +1,142 @@
 """SSE event definitions."""
 
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Callable
 from dataclasses import dataclass, field
 from typing import Any, Literal
 
+from app import metrics, tracing
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # optional: a faster JSON encoder, the standard library's otherwise
+    orjson = None
+
+
+# The same compact UTF-8 output as orjson; built once, as json.dumps with options builds one per call
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _stdlib_dumps(data: Any) -> bytes:
+    return _json_encoder.encode(data).encode()
+
+
+dumps: Callable[[Any], bytes] = orjson.dumps if orjson is not None else _stdlib_dumps
+
+
+def _encode(event_type: str, content: str, metadata: dict) -> bytes:
+    data: dict[str, Any] = {"type": event_type, "content": content}
+    if metadata:
+        data["metadata"] = metadata
+    return b"data: " + dumps(data) + b"\n\n"
+
+
+# Frames of events sent unchanged on every stream, by (event type, content)
+_constant_frames: dict[tuple[str, str], bytes] = {}
+
+
+@dataclass(slots=True)
 class StreamEvent:
     """A server-sent event for streaming responses."""
 
-    event_type: Literal["thinking", "text", "image", "done"]
+    event_type: Literal[
+        "transcript", "thinking", "text", "image", "audio", "timing", "done", "error"
+    ]
     content: str = ""
     metadata: dict = field(default_factory=dict)
 
-    def to_sse(self) -> str:
-        """Format as SSE message."""
-        import json
+    def to_sse(self) -> bytes:
+        """Encode as an SSE message."""
+        metrics.SSE_EVENTS.inc(event_type=self.event_type)
+        if not self.metadata and (frame := _constant_frames.get((self.event_type, self.content))):
+            return frame
+        # Timed inline: this runs for every token, and tracing.span costs more than encoding
+        start = time.perf_counter()
+        frame = _encode(self.event_type, self.content, self.metadata)
+        tracing.record("serialize", time.perf_counter() - start)
+        return frame
+
+
+def preencode(event: StreamEvent) -> StreamEvent:
+    """Encode an event without metadata once, so every ``to_sse()`` of an equal event reuses it."""
+    _constant_frames[(event.event_type, event.content)] = _encode(
+        event.event_type, event.content, event.metadata
+    )
+    return event
+
+
+DONE = preencode(StreamEvent(event_type="done"))
+
+
+def with_event_id(frame: bytes, event_id: str) -> bytes:
+    """Tag a serialized SSE message with an ID, which clients send back as ``Last-Event-ID``."""
+    return b"id: " + event_id.encode() + b"\n" + frame
+
+
+def sse_data(frame: bytes) -> str:
+    """Return the JSON payload of an encoded SSE message, to send it over another transport."""
+    return frame[frame.index(b"data: ") + len(b"data: ") : -2].decode()
+
+
+def _is_delta(event: StreamEvent) -> bool:
+    return event.event_type == "text" and event.metadata == {"delta": True}
+
+
+def _merged(held: list[str]) -> StreamEvent:
+    event = StreamEvent(event_type="text", content="".join(held), metadata={"delta": True})
+    held.clear()
+    return event
+
+
+async def coalesce_deltas(
+    events: AsyncIterator[StreamEvent], interval: float
+) -> AsyncIterator[StreamEvent]:
+    """Merge text deltas so at most one is sent per ``interval`` seconds.
+
+    A delta after a quiet spell goes out at once (the first token isn't
+    delayed); ones arriving sooner are held and sent together when the
+    interval is up, or before any other event. Other events pass through.
+    """
+    if interval <= 0:
+        async for event in events:
+            yield event
+        return
 
-        data: dict[str, Any] = {
-            "type": self.event_type,
-            "content": self.content,
-        }
-        if self.metadata:
-            data["metadata"] = self.metadata
+    loop = asyncio.get_running_loop()
+    held: list[str] = []
+    send_after = 0.0
+    # Only while text is held is the next event awaited in a task, to flush on time
+    upcoming: asyncio.Future[StreamEvent] | None = None
+    try:
+        while True:
+            if held:
+                if upcoming is None:
+                    upcoming = asyncio.ensure_future(anext(events))
+                done, _ = await asyncio.wait({upcoming}, timeout=send_after - loop.time())
+                if not done:
+                    yield _merged(held)
+                    send_after = loop.time() + interval
+                    continue
+            try:
+                event = await (upcoming if upcoming is not None else anext(events))
+            except StopAsyncIteration:
+                break
+            upcoming = None
 
-        return f"data: {json.dumps(data)}\n\n"
+            if not _is_delta(event):
+                if held:
+                    yield _merged(held)
+                yield event
+            elif held or loop.time() < send_after:
+                held.append(event.content)
+            else:
+                yield event
+                send_after = loop.time() + interval
+        if held:
+            yield _merged(held)
+    finally:
+        if upcoming is not None:
+            upcoming.cancel()
+            await asyncio.gather(upcoming, return_exceptions=True)
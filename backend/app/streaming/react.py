@@ -0,0 +1,57 @@
+"""Extract the user-facing answer from a streamed ReAct reply."""
+
+_THOUGHT = "Thought:"
+_ACTION = "Action:"
+_ANSWER = "Answer:"
+
+
+class AnswerExtractor:
+    """Incrementally pull the answer text out of a ReAct-formatted LLM stream.
+
+    The ReAct agent streams the raw model output ("Thought: ...\\nAnswer: ...").
+    Only the part after ``Answer:`` is meant for the child, so everything before
+    it is held back. Replies that skip the format entirely are passed through
+    as-is, mirroring ``ReActOutputParser``.
+    """
+
+    def __init__(self) -> None:
+        self._response = ""
+        self._emitted = 0
+
+    def feed(self, response: str) -> str:
+        """Accept the cumulative response so far and return the new answer delta."""
+        if not response.startswith(self._response):
+            # The agent started a new LLM call (e.g. a format retry)
+            self.reset()
+        self._response = response
+
+        start = self._answer_start(response)
+        if start is None:
+            return ""
+
+        answer = response[start:].lstrip()
+        delta = answer[self._emitted :]
+        self._emitted = len(answer)
+        return delta
+
+    def reset(self) -> None:
+        """Forget everything seen so far."""
+        self._response = ""
+        self._emitted = 0
+
+    @staticmethod
+    def _answer_start(response: str) -> int | None:
+        """Return the index where the answer text begins, if known yet."""
+        answer_idx = response.find(_ANSWER)
+        action_idx = response.find(_ACTION)
+        if action_idx != -1 and (answer_idx == -1 or action_idx < answer_idx):
+            # Tool call: nothing here is for the user
+            return None
+        if answer_idx != -1:
+            return answer_idx + len(_ANSWER)
+
+        # No marker yet: hold back while the text could still become "Thought:"
+        head = response.lstrip()
+        if _THOUGHT.startswith(head[: len(_THOUGHT)]) or head.startswith(_THOUGHT):
+            return None
+        return 0
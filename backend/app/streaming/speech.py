@@ -0,0 +1,114 @@
+"""Sentence-pipelined speech synthesis for streamed answers."""
+
+import asyncio
+import logging
+import re
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from app.streaming.events import StreamEvent
+
+logger = logging.getLogger(__name__)
+
+# End of sentence: terminal punctuation (plus closing quotes/brackets) then whitespace,
+# or a paragraph break
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"'”’)\]]*\s+|\n{2,}")
+
+
+class SentenceSplitter:
+    """Cut streamed text into sentences as soon as each one is complete.
+
+    Very short sentences ("Wow!") are merged into the next one so each clip is
+    worth a TTS round trip.
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> list[str]:
+        """Add streamed text and return any sentences it completed."""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start : match.end()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> str | None:
+        """Return whatever text is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+class SpeechPipeline:
+    """Synthesize an answer sentence by sentence while it is still being generated.
+
+    Sentences are synthesized concurrently, up to ``max_concurrency`` at a
+    time, and their ``audio`` events are released strictly in sentence order.
+    A sentence whose synthesis fails is logged and skipped.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Awaitable[str]], max_concurrency: int = 3):
+        self._synthesize = synthesize
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._splitter = SentenceSplitter()
+        self._pending: deque[tuple[int, str, asyncio.Task[str]]] = deque()
+        self._next_index = 0
+
+    def feed(self, delta: str) -> None:
+        """Add streamed answer text, starting synthesis for each completed sentence."""
+        for sentence in self._splitter.feed(delta):
+            self._start(sentence)
+
+    def ready(self) -> list[StreamEvent]:
+        """Return audio events whose clips (and all earlier clips) are done, without waiting."""
+        events = []
+        while self._pending and self._pending[0][2].done():
+            event = self._event(*self._pending.popleft())
+            if event is not None:
+                events.append(event)
+        return events
+
+    async def drain(self) -> AsyncIterator[StreamEvent]:
+        """Synthesize any trailing text and yield the remaining audio events in order."""
+        if (rest := self._splitter.flush()) is not None:
+            self._start(rest)
+        while self._pending:
+            index, sentence, task = self._pending.popleft()
+            await asyncio.wait([task])
+            event = self._event(index, sentence, task)
+            if event is not None:
+                yield event
+
+    def cancel(self) -> None:
+        """Abandon all in-flight synthesis (e.g. the client went away)."""
+        for _, _, task in self._pending:
+            task.cancel()
+        self._pending.clear()
+
+    def _start(self, sentence: str) -> None:
+        task = asyncio.create_task(self._run(sentence))
+        self._pending.append((self._next_index, sentence, task))
+        self._next_index += 1
+
+    async def _run(self, sentence: str) -> str:
+        async with self._semaphore:
+            return await self._synthesize(sentence)
+
+    @staticmethod
+    def _event(index: int, sentence: str, task: asyncio.Task[str]) -> StreamEvent | None:
+        if task.cancelled():
+            return None
+        if (exc := task.exception()) is not None:
+            logger.warning("Speech synthesis failed for sentence %d: %s", index, exc)
+            return None
+        return StreamEvent(
+            event_type="audio",
+            content=task.result(),
+            metadata={"index": index, "text": sentence},
+        )
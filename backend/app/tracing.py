@@ -0,0 +1,135 @@
+"""Per-request stage timings, reported as Server-Timing and tagged with a request ID.
+
+``RequestTraceMiddleware`` gives each HTTP request a ``RequestTrace`` and
+makes it current for everything running on that request's behalf, including
+streamed bodies and tasks they start. Code anywhere below the route wraps its
+stages in ``span(...)``; outside a request that is a no-op.
+"""
+
+import logging
+import re
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar["RequestTrace | None"] = ContextVar("request_trace", default=None)
+
+# Accept a caller's request ID only if it is safe to echo in headers and logs
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestTrace:
+    """Time spent per stage of one request.
+
+    Stages that run more than once (e.g. serializing each SSE event) add up.
+    Stages can overlap, such as TTS for one sentence while the LLM writes the
+    next, so they need not sum to the total.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Format the stages so far, plus the running total, as a Server-Timing header."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "stages_ms": {stage: round(s * 1000, 1) for stage, s in self.stages.items()},
+            "total_ms": round(self.elapsed() * 1000, 1),
+        }
+
+
+def current_trace() -> RequestTrace | None:
+    """Return the trace of the request being handled, if any."""
+    return _current.get()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add ``seconds`` to ``stage`` of the current request, if there is one."""
+    if (trace := _current.get()) is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Add the duration of the ``with`` block to ``stage`` of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def mark_validated() -> None:
+    """Record everything up to the route handler (body parsing and validation)."""
+    if (trace := _current.get()) is not None:
+        trace.add("validation", trace.elapsed())
+
+
+class RequestTraceMiddleware:
+    """Trace every HTTP request and report its timings.
+
+    Adds ``X-Request-ID`` and ``Server-Timing`` to the response headers, and
+    logs the full breakdown once the response body is done: at WARNING when
+    the request took longer than ``settings.slow_request_seconds``, otherwise
+    at DEBUG. Streamed responses send headers before most of the work, so
+    their header only covers the stages that ran before the first byte.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        trace = RequestTrace(request_id)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = trace.elapsed()
+            level = logging.WARNING if elapsed > settings.slow_request_seconds else logging.DEBUG
+            logger.log(
+                level,
+                "request %s %s %s took %.0f ms: %s",
+                request_id,
+                scope["method"],
+                scope["path"],
+                elapsed * 1000,
+                trace.server_timing(),
+            )
@@ -0,0 +1,119 @@
+"""Bounded-memory handling for audio uploads."""
+
+import asyncio
+import functools
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from starlette.types import Message, Receive
+
+from app.config import settings
+
+# 25 MB — matches OpenAI Whisper's own file size limit
+MAX_AUDIO_BYTES = 25 * 1024 * 1024
+
+# Slack on top of the file itself for multipart boundaries and part headers
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Audio file exceeds the {MAX_AUDIO_BYTES // (1024 * 1024)} MB limit.",
+    )
+
+
+class UploadBudget:
+    """Process-wide cap on upload bytes being received at once.
+
+    Each upload reserves its declared size (or the maximum, if undeclared)
+    before its body is read. Uploads that don't fit wait in line for up to
+    ``wait_seconds`` and are then rejected with 503.
+    """
+
+    def __init__(self, max_bytes: int, wait_seconds: float):
+        self.max_bytes = max_bytes
+        self.wait_seconds = wait_seconds
+        self.in_flight = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, nbytes: int) -> None:
+        nbytes = min(nbytes, self.max_bytes)
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.in_flight + nbytes <= self.max_bytes),
+                    timeout=self.wait_seconds,
+                )
+            except TimeoutError:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many uploads in progress. Please try again shortly.",
+                    headers={"Retry-After": str(max(1, round(self.wait_seconds)))},
+                ) from None
+            self.in_flight += nbytes
+
+    async def release(self, nbytes: int) -> None:
+        nbytes = min(nbytes, self.max_bytes)
+        async with self._changed:
+            self.in_flight -= nbytes
+            self._changed.notify_all()
+
+
+@functools.lru_cache(maxsize=1)
+def get_upload_budget() -> UploadBudget:
+    """Return the shared upload budget, constructed once per process."""
+    return UploadBudget(settings.upload_budget_bytes, settings.upload_budget_wait_seconds)
+
+
+def _limited_receive(receive: Receive, max_body_bytes: int) -> Receive:
+    """Wrap ``receive`` so the request body is aborted with 413 once it grows too large."""
+    received = 0
+
+    async def receive_with_limit() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_body_bytes:
+                raise too_large()
+        return message
+
+    return receive_with_limit
+
+
+class AudioUploadRoute(APIRoute):
+    """Route that bounds the cost of an audio upload while it is still arriving.
+
+    Before FastAPI parses the multipart body this route:
+
+    - rejects a declared Content-Length over the limit without reading the body;
+    - counts body bytes as they are received and aborts with 413 past the limit;
+    - reserves the upload's size in the process-wide ``UploadBudget``.
+
+    The multipart parser spools file parts to a temp file past 1 MB, so the
+    handler receives an ``UploadFile`` backed by disk rather than a ``bytes``
+    copy of the whole recording.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        max_body_bytes = MAX_AUDIO_BYTES + _MULTIPART_OVERHEAD_BYTES
+
+        async def upload_handler(request: Request) -> Response:
+            declared = request.headers.get("content-length")
+            if declared is not None and declared.isdigit() and int(declared) > max_body_bytes:
+                raise too_large()
+
+            reserved = int(declared) if declared and declared.isdigit() else max_body_bytes
+            budget = get_upload_budget()
+            await budget.acquire(reserved)
+            try:
+                limited = Request(request.scope, _limited_receive(request.receive, max_body_bytes))
+                return await handler(limited)
+            finally:
+                await budget.release(reserved)
+
+        return upload_handler
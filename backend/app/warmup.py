@@ -0,0 +1,76 @@
+"""Startup warm-up, so the first requests after a deploy or scale-up aren't the slow ones."""
+
+import asyncio
+import functools
+import logging
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from llama_index.core.llms import LLM
+
+from app.cache import get_answer_cache, get_summary_cache, get_token_count_cache
+from app.config import settings
+from app.llm import get_fallback_llm, get_llm, sdk_client
+from app.routes.transcribe import _get_whisper_client
+from app.routes.tts import _get_tts_client
+from app.sessions import get_session_store
+
+logger = logging.getLogger(__name__)
+
+
+def _upstreams() -> Iterator[tuple[str, Callable[[], Any]]]:
+    """Name and build every upstream client the app sends requests with."""
+    # Routes may pick different models; those with the same one share its client
+    for route in dict.fromkeys(("default", *settings.llm_routes)):
+        yield f"{settings.llm_provider} ({route})", functools.partial(get_llm, settings, route)
+        if settings.llm_fallback_provider:
+            yield (
+                f"{settings.llm_fallback_provider} ({route}, fallback)",
+                functools.partial(get_fallback_llm, settings, route),
+            )
+    if settings.stt_api_key:
+        yield "whisper", _get_whisper_client
+        yield "tts", _get_tts_client
+
+
+async def _preconnect(name: str, client: Any) -> None:
+    """Open a pooled connection to an upstream with a cheap authenticated request."""
+    try:
+        async with asyncio.timeout(settings.warm_up_timeout_seconds):
+            await client.models.list()
+    except Exception as exc:
+        logger.warning("Could not open a connection to %s during warm-up: %r", name, exc)
+
+
+async def warm_up() -> None:
+    """Build the shared clients, caches and tokenizer tables, then open upstream connections.
+
+    Nothing here is required: a step that fails is logged and left for the
+    first request to retry.
+    """
+    started = time.perf_counter()
+    # The first tokenization loads the encoding's tables
+    get_token_count_cache().tokenizer("warm up")
+    get_answer_cache()
+    get_summary_cache()
+    get_session_store()
+
+    clients: dict[int, tuple[str, Any]] = {}
+    for name, build in _upstreams():
+        try:
+            client = build()
+            if isinstance(client, LLM):
+                client = sdk_client(client)
+        except Exception as exc:
+            logger.warning("Could not build the %s client during warm-up: %r", name, exc)
+            continue
+        if client is None:
+            continue
+        clients.setdefault(id(client), (name, client))
+
+    if settings.warm_up_connections:
+        await asyncio.gather(*(_preconnect(name, client) for name, client in clients.values()))
+    logger.info(
+        "Warmed up %d upstream clients in %.2fs", len(clients), time.perf_counter() - started
+    )
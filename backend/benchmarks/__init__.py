@@ -0,0 +1 @@
+"""Benchmarks for the ELI5 Now! backend (run with ``uv run python -m benchmarks.<name>``)."""
@@ -0,0 +1,139 @@
+"""Compare the ReAct agent engine with the direct chat engine.
+
+Both engines run through the real ``generate_response`` pipeline against a
+scripted stand-in LLM, so no API key is needed. The stand-in charges a fixed
+cost per prompt token (prefill) and per output token (decode), which is how
+hosted models behave; the numbers show what the ReAct scaffolding costs
+relative to a plain chat call, not absolute provider latency.
+
+    uv run python -m benchmarks.engine_modes --runs 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Sequence
+from typing import Any
+from unittest.mock import patch
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    LLMMetadata,
+)
+from llama_index.core.llms import CustomLLM
+from llama_index.core.utils import get_tokenizer
+
+from app.agents.eli import _build_eli_agent
+from app.cache import get_answer_cache
+from app.config import settings
+from app.messages import HistoryMessage
+from app.routes.ask import generate_response
+
+ANSWER = (
+    "The sky looks blue because sunlight is made of many colours, and the air "
+    "bounces the blue light around the most, so blue comes at us from everywhere!"
+)
+THOUGHT = (
+    "Thought: I can answer without using any more tools. I'll use the user's language to answer\n"
+)
+
+HISTORY = [
+    HistoryMessage(role="user", content="What makes rain?"),
+    HistoryMessage(
+        role="assistant",
+        content="Clouds are full of tiny water drops. When they bump together they get "
+        "heavy and fall down as rain!",
+    ),
+]
+
+
+class ScriptedLLM(CustomLLM):
+    """Stand-in LLM that streams a fixed answer with token-proportional latency."""
+
+    prefill_seconds_per_token: float = 0.00002
+    decode_seconds_per_token: float = 0.01
+    prompt_tokens: list[int] = []
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_chat_model=True)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        raise NotImplementedError
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        raise NotImplementedError
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        tokenizer = get_tokenizer()
+        prompt = "\n".join(str(m.content) for m in messages)
+        n_prompt = len(tokenizer(prompt))
+        self.prompt_tokens.append(n_prompt)
+
+        # ReAct prompts demand a "Thought: ... Answer:" preamble before the answer
+        is_react = "Answer:" in prompt
+        output = f"{THOUGHT}Answer: {ANSWER}" if is_react else ANSWER
+        words = output.split(" ")
+
+        async def gen():
+            await asyncio.sleep(n_prompt * self.prefill_seconds_per_token)
+            text = ""
+            for i, word in enumerate(words):
+                delta = word if i == 0 else f" {word}"
+                await asyncio.sleep(len(tokenizer(delta)) * self.decode_seconds_per_token)
+                text += delta
+                yield ChatResponse(message=ChatMessage(role="assistant", content=text), delta=delta)
+
+        return gen()
+
+
+async def _run_once(llm: ScriptedLLM) -> tuple[float, float]:
+    """Return (seconds to first answer delta, total seconds) for one /ask."""
+    start = time.perf_counter()
+    first = None
+    async for chunk in generate_response("Why is the sky blue?", HISTORY, age=6, story_mode=False):
+        if first is None and b'"delta":true' in chunk:
+            first = time.perf_counter() - start
+    return first or 0.0, time.perf_counter() - start
+
+
+async def _bench(mode: str, runs: int) -> dict[str, float]:
+    llm = ScriptedLLM(prompt_tokens=[])
+    settings.engine_mode = mode
+    _build_eli_agent.cache_clear()
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        patch("app.agents.eli.load_llm", return_value=llm),
+    ):
+        results = [await _run_once(llm) for _ in range(runs)]
+    _build_eli_agent.cache_clear()
+
+    ttfd, total = zip(*results, strict=True)
+    return {
+        "prompt_tokens": statistics.mean(llm.prompt_tokens),
+        "ttfd_ms": statistics.median(ttfd) * 1000,
+        "total_ms": statistics.median(total) * 1000,
+    }
+
+
+async def main(runs: int) -> None:
+    # Measure the engines, not the answer cache
+    settings.answer_cache_size = 0
+    get_answer_cache.cache_clear()
+
+    print(f"{'mode':<8} {'prompt tokens':>14} {'first delta (ms)':>17} {'total (ms)':>11}")
+    for mode in ("agent", "auto"):
+        r = await _bench(mode, runs)
+        label = "direct" if mode == "auto" else mode
+        print(
+            f"{label:<8} {r['prompt_tokens']:>14.0f} {r['ttfd_ms']:>17.1f} {r['total_ms']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="requests per engine mode")
+    asyncio.run(main(parser.parse_args().runs))
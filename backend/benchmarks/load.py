@@ -0,0 +1,263 @@
+"""Load and latency benchmark for /ask, /tts and /transcribe.
+
+Starts the stand-in providers from ``benchmarks.providers`` and the real
+backend (``uvicorn app.main:app`` in a subprocess, pointed at the stand-ins
+through ``LLM_API_BASE``/``STT_API_BASE``), then drives all three endpoints
+concurrently over HTTP. No API keys are needed.
+
+Reports, per endpoint: time to the first useful byte (the first answer
+delta for /ask, the first audio byte for /tts), end-to-end latency
+percentiles, throughput and errors, plus the backend's peak RSS.
+
+    uv run python -m benchmarks.load --concurrency 20 --requests 200
+
+Inputs are unique per request so every call reaches the provider; pass
+``--repeat`` to send identical inputs and measure the caches and request
+coalescing instead.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from benchmarks.providers import ProviderProfile, create_provider_app
+
+ENDPOINTS = ("ask", "tts", "transcribe")
+
+
+@dataclass
+class Sample:
+    first: float
+    total: float
+
+
+@dataclass
+class Results:
+    samples: list[Sample] = field(default_factory=list)
+    errors: int = 0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_providers(profile: ProviderProfile) -> tuple[uvicorn.Server, int]:
+    """Serve the stand-in providers from a background thread."""
+    port = _free_port()
+    config = uvicorn.Config(
+        create_provider_app(profile), host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, port
+
+
+def _start_backend(provider_port: int, cache: bool, cache_dir: str) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{provider_port}/v1"
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "openai",
+        "LLM_MODEL": "gpt-4o",
+        "LLM_API_KEY": "bench",
+        "LLM_API_BASE": base,
+        "STT_API_KEY": "bench",
+        "STT_API_BASE": base,
+        "ANSWER_CACHE_SIZE": "1024" if cache else "0",
+        "TTS_CACHE_DIR": cache_dir,
+        "TTS_CACHE_MAX_BYTES": str(256 * 1024 * 1024) if cache else "0",
+    }
+    env.pop("ANSWER_CACHE_DB_URL", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )  # fmt: skip
+    return proc, port
+
+
+async def _wait_healthy(client: httpx.AsyncClient, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("backend exited during startup")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("backend did not become healthy")
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    """Peak resident set size of ``pid`` (Linux only)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+async def _ask(client: httpx.AsyncClient, i: int, args: argparse.Namespace) -> Sample:
+    question = "Why is the sky blue?" if args.repeat else f"Why is the sky blue? (#{i})"
+    start = time.perf_counter()
+    first = None
+    body = {"question": question, "age": 6, "speak": args.speak}
+    async with client.stream("POST", "/ask", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first is None and '"delta":true' in line:
+                first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return Sample(first if first is not None else total, total)
+
+
+async def _tts(client: httpx.AsyncClient, i: int, args: argparse.Namespace) -> Sample:
+    text = "The sky looks blue because the air scatters blue light the most."
+    if not args.repeat:
+        text = f"{text} ({i})"
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/tts", json={"text": text}) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_bytes():
+            if first is None:
+                first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return Sample(first if first is not None else total, total)
+
+
+async def _transcribe(client: httpx.AsyncClient, i: int, args: argparse.Namespace) -> Sample:
+    audio = os.urandom(args.audio_kb * 1024)
+    start = time.perf_counter()
+    response = await client.post(
+        "/transcribe", files={"audio": (f"clip-{i}.webm", audio, "audio/webm")}
+    )
+    response.raise_for_status()
+    total = time.perf_counter() - start
+    return Sample(total, total)
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    call: Callable[[httpx.AsyncClient, int, argparse.Namespace], Awaitable[Sample]],
+    args: argparse.Namespace,
+) -> Results:
+    """Run ``args.requests`` calls with ``args.concurrency`` workers."""
+    results = Results()
+    counter = iter(range(args.requests))
+
+    async def worker() -> None:
+        for i in counter:
+            try:
+                results.samples.append(await call(client, i, args))
+            except httpx.HTTPError:
+                results.errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return results
+
+
+def _percentile(values: list[float], pct: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def _report(results: dict[str, Results], elapsed: float, peak_rss: float | None) -> None:
+    header = (
+        f"{'endpoint':<11} {'ok':>5} {'err':>4} {'first p50':>10} {'first p95':>10} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        if not r.samples:
+            print(f"{name:<11} {0:>5} {r.errors:>4}")
+            continue
+        first = [s.first * 1000 for s in r.samples]
+        total = [s.total * 1000 for s in r.samples]
+        print(
+            f"{name:<11} {len(r.samples):>5} {r.errors:>4} "
+            f"{_percentile(first, 50):>10.0f} {_percentile(first, 95):>10.0f} "
+            f"{_percentile(total, 50):>8.0f} {_percentile(total, 95):>8.0f} "
+            f"{_percentile(total, 99):>8.0f} {len(r.samples) / elapsed:>7.1f}"
+        )
+    print("\nlatencies in ms; first = first answer delta (/ask), first audio byte (/tts)")
+    rss = f"{peak_rss:.0f} MB" if peak_rss is not None else "n/a"
+    print(f"wall time {elapsed:.1f}s, backend peak RSS {rss}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    profile = ProviderProfile(
+        llm_first_token_seconds=args.llm_first_token_ms / 1000,
+        llm_tokens_per_second=args.llm_tokens_per_second,
+        stt_seconds=args.stt_ms / 1000,
+        tts_first_byte_seconds=args.tts_first_byte_ms / 1000,
+    )
+    providers, provider_port = _start_providers(profile)
+    calls = {"ask": _ask, "tts": _tts, "transcribe": _transcribe}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        proc, port = _start_backend(provider_port, args.repeat, cache_dir)
+        try:
+            limits = httpx.Limits(max_connections=None)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits
+            ) as client:
+                await _wait_healthy(client, proc)
+                start = time.perf_counter()
+                outcomes = await asyncio.gather(
+                    *(_drive(client, calls[name], args) for name in args.endpoints)
+                )
+                elapsed = time.perf_counter() - start
+            _report(
+                dict(zip(args.endpoints, outcomes, strict=True)), elapsed, _peak_rss_mb(proc.pid)
+            )
+        finally:
+            proc.terminate()
+            proc.wait()
+            providers.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10, help="workers per endpoint")
+    parser.add_argument(
+        "--endpoints",
+        type=lambda s: s.split(","),
+        default=list(ENDPOINTS),
+        help="comma-separated subset of ask,tts,transcribe",
+    )
+    parser.add_argument("--speak", action="store_true", help="request speech on /ask")
+    parser.add_argument(
+        "--repeat", action="store_true", help="identical inputs, with caches enabled"
+    )
+    parser.add_argument("--audio-kb", type=int, default=256, help="upload size for /transcribe")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60)
+    parser.add_argument("--stt-ms", type=float, default=400)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Cost of preparing chat memory for one /ask turn, by history length.
+
+Compares the stock ChatMemoryBuffer (tokenizes the joined remaining history
+on every trim step) with MemoizedChatMemoryBuffer (per-message counts from
+the shared token count cache). "warm" is the steady state of a conversation:
+every message but the newest turn was counted on an earlier turn.
+
+    uv run python -m benchmarks.memory_prep --runs 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from llama_index.core.llms import ChatMessage
+from llama_index.core.memory import ChatMemoryBuffer
+
+from app.cache import get_token_count_cache
+from app.config import settings
+from app.memory import build_memory
+from app.messages import HistoryMessage
+
+LENGTHS = (10, 50, 100, 200, 400)
+
+
+def _history(turns: int, salt: str = "") -> list[HistoryMessage]:
+    messages = []
+    for i in range(turns):
+        messages.append(HistoryMessage(role="user", content=f"Why do cats purr, part {i}?{salt}"))
+        messages.append(
+            HistoryMessage(
+                role="assistant",
+                content=f"Cats purr when they're happy and cosy, like a tiny engine! ({i}){salt}",
+            )
+        )
+    return messages
+
+
+async def _stock(history: list[HistoryMessage], token_limit: int) -> None:
+    memory = ChatMemoryBuffer.from_defaults(token_limit=token_limit)
+    for msg in history:
+        memory.put(ChatMessage(role=msg.role, content=msg.content))
+    await memory.aget()
+
+
+async def _memoized(history: list[HistoryMessage], token_limit: int) -> None:
+    await build_memory(history, token_limit).aget()
+
+
+async def _time(fn, history: list[HistoryMessage], token_limit: int, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn(history, token_limit)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def main(runs: int) -> None:
+    token_limit = settings.max_tokens - settings.response_token_buffer
+    cache = get_token_count_cache()
+
+    print(f"token limit {token_limit}")
+    print(f"{'messages':>8} {'stock (ms)':>11} {'memo cold (ms)':>15} {'memo warm (ms)':>15}")
+    for turns in LENGTHS:
+        history = _history(turns // 2)
+        stock = await _time(_stock, history, token_limit, runs)
+
+        cold = []
+        for run in range(runs):
+            fresh = _history(turns // 2, salt=f" #{run}")  # never seen before
+            cold.append(await _time(_memoized, fresh, token_limit, 1))
+
+        await _memoized(history, token_limit)  # earlier turns already counted
+        warm = await _time(_memoized, history, token_limit, runs)
+        print(f"{turns:>8} {stock:>11.2f} {statistics.median(cold):>15.2f} {warm:>15.2f}")
+
+    print(f"\ntoken count cache: {cache.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per history length")
+    asyncio.run(main(parser.parse_args().runs))
@@ -0,0 +1,121 @@
+"""Local stand-ins for the OpenAI endpoints the backend calls.
+
+Serves just enough of the OpenAI HTTP API for the real clients to work
+unchanged: streamed chat completions, Whisper transcriptions, streamed
+speech and the model list the startup warm-up connects with. Latency is
+configurable so load runs reflect provider behaviour (time to first token,
+decode rate, audio bitrate) without network or cost.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+ANSWER = (
+    "The sky looks blue because sunlight is made of many colours. "
+    "The air bounces the blue light around the most, so blue comes at us from everywhere! "
+    "At sunset the light travels through more air, so the reds and oranges win instead."
+)
+TRANSCRIPT = "Why is the sky blue?"
+
+
+@dataclass
+class ProviderProfile:
+    """Latency knobs for the stand-in providers."""
+
+    # Chat: delay before the first token, then tokens per second
+    llm_first_token_seconds: float = 0.3
+    llm_tokens_per_second: float = 60.0
+    # Whisper: fixed delay plus time proportional to the upload size
+    stt_seconds: float = 0.4
+    stt_seconds_per_mb: float = 0.5
+    # TTS: delay before the first audio byte, then bytes per second (~mp3 at 48 kbps)
+    tts_first_byte_seconds: float = 0.2
+    tts_bytes_per_second: int = 6_000
+    tts_seconds_per_char: float = 0.005
+
+
+def _chunk(model: str, delta: dict, finish_reason: str | None = None) -> str:
+    payload = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_provider_app(profile: ProviderProfile) -> Starlette:
+    """Build the stand-in provider ASGI app."""
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4o")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        # ReAct prompts demand a "Thought: ... Answer:" preamble
+        text = ANSWER
+        if "Answer:" in prompt:
+            text = f"Thought: I can answer without tools.\nAnswer: {ANSWER}"
+        tokens = [word + " " for word in text.split(" ")]
+
+        async def stream():
+            await asyncio.sleep(profile.llm_first_token_seconds)
+            yield _chunk(model, {"role": "assistant", "content": ""})
+            for token in tokens:
+                await asyncio.sleep(1 / profile.llm_tokens_per_second)
+                yield _chunk(model, {"content": token})
+            yield _chunk(model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def models(request: Request):
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": [
+                    {"id": model, "object": "model", "created": 0, "owned_by": "stand-in"}
+                    for model in ("gpt-4o", "gpt-4o-mini", "whisper-1", "tts-1")
+                ],
+            }
+        )
+
+    async def transcriptions(request: Request):
+        form = await request.form()
+        upload = form["file"]
+        size = len(await upload.read())
+        await asyncio.sleep(profile.stt_seconds + profile.stt_seconds_per_mb * size / 1_000_000)
+        return JSONResponse({"text": TRANSCRIPT})
+
+    async def speech(request: Request):
+        body = await request.json()
+        text = body.get("input", "")
+        total = max(1, int(len(text) * profile.tts_seconds_per_char * profile.tts_bytes_per_second))
+        chunk_size = 4096
+
+        async def stream():
+            await asyncio.sleep(profile.tts_first_byte_seconds)
+            sent = 0
+            while sent < total:
+                n = min(chunk_size, total - sent)
+                await asyncio.sleep(n / profile.tts_bytes_per_second)
+                yield b"\xff" * n
+                sent += n
+
+        return StreamingResponse(stream(), media_type="audio/mpeg")
+
+    return Starlette(
+        routes=[
+            Route("/v1/models", models, methods=["GET"]),
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/audio/transcriptions", transcriptions, methods=["POST"]),
+            Route("/v1/audio/speech", speech, methods=["POST"]),
+        ]
+    )
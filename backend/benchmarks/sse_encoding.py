@@ -0,0 +1,85 @@
+"""Throughput of /ask SSE event encoding, and how many frames delta coalescing sends.
+
+"before" is the previous ``to_sse`` (a dict, ``json.dumps`` and a formatted
+``str``, which Starlette then encoded); "to_sse" is the current one, with
+whichever JSON backend is installed (orjson if available). Both include the
+metrics and tracing bookkeeping. "constant" is a pre-encoded event such
+as ``done``. The coalescing table streams ``--tokens`` deltas, one every
+``--token-ms``, through ``coalesce_deltas`` at several flush intervals.
+
+    uv run python -m benchmarks.sse_encoding --events 200000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from app import metrics, tracing
+from app.streaming import DONE, StreamEvent, coalesce_deltas
+from app.streaming.events import orjson
+
+DELTA = "sky looks "
+INTERVALS = (0.0, 0.02, 0.05, 0.1)
+
+
+def _before(event: StreamEvent) -> bytes:
+    metrics.SSE_EVENTS.inc(event_type=event.event_type)
+    with tracing.span("serialize"):
+        data: dict[str, Any] = {"type": event.event_type, "content": event.content}
+        if event.metadata:
+            data["metadata"] = event.metadata
+        return f"data: {json.dumps(data)}\n\n".encode()
+
+
+def _rate(encode, events: int) -> float:
+    start = time.perf_counter()
+    for _ in range(events):
+        encode()
+    return events / (time.perf_counter() - start)
+
+
+async def _frames(tokens: int, token_seconds: float, interval: float) -> tuple[int, float]:
+    """Frames sent for one streamed answer, and the longest a delta waited to be sent."""
+
+    async def _deltas():
+        for _ in range(tokens):
+            await asyncio.sleep(token_seconds)
+            yield StreamEvent(event_type="text", content=DELTA, metadata={"delta": True})
+
+    frames = 0
+    worst = 0.0
+    last_sent = time.perf_counter()
+    async for _ in coalesce_deltas(_deltas(), interval):
+        now = time.perf_counter()
+        frames += 1
+        worst = max(worst, now - last_sent)
+        last_sent = now
+    return frames, worst
+
+
+async def main(events: int, tokens: int, token_ms: float) -> None:
+    print(f"JSON backend: {'orjson' if orjson is not None else 'json (standard library)'}")
+    print(f"{'encoder':>10} {'events/s':>12}")
+    for name, encode in (
+        ("before", lambda: _before(StreamEvent("text", DELTA, {"delta": True}))),
+        ("to_sse", lambda: StreamEvent("text", DELTA, {"delta": True}).to_sse()),
+        ("constant", DONE.to_sse),
+    ):
+        print(f"{name:>10} {_rate(encode, events):>12,.0f}")
+
+    print(f"\n{tokens} deltas, one every {token_ms}ms")
+    print(f"{'flush (ms)':>10} {'frames':>8} {'max gap (ms)':>13}")
+    for interval in INTERVALS:
+        frames, worst = await _frames(tokens, token_ms / 1000, interval)
+        print(f"{interval * 1000:>10.0f} {frames:>8} {worst * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000, help="events encoded per encoder")
+    parser.add_argument("--tokens", type=int, default=200, help="deltas in the coalescing run")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="milliseconds between deltas")
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.tokens, args.token_ms))
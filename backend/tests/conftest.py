@@ -3,7 +3,17 @@
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+from app.admission import get_limiter
+from app.cache import (
+    get_answer_cache,
+    get_audio_cache,
+    get_summary_cache,
+    get_token_count_cache,
+)
+from app.config import settings as app_settings
 from app.main import app
+from app.sessions import get_session_store
+from app.uploads import get_upload_budget
 
 
 @pytest.fixture
@@ -14,3 +24,57 @@ async def client():
         base_url="http://test",
     ) as client:
         yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_answer_cache():
+    """Give every test an empty answer cache so answers never leak between tests."""
+    get_answer_cache.cache_clear()
+    yield
+    get_answer_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_audio_cache(tmp_path, monkeypatch):
+    """Point the audio cache at a per-test directory."""
+    monkeypatch.setattr(app_settings, "tts_cache_dir", str(tmp_path / "tts"))
+    get_audio_cache.cache_clear()
+    yield
+    get_audio_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_upload_budget():
+    """Each test's event loop gets its own upload budget (asyncio primitives bind to a loop)."""
+    get_upload_budget.cache_clear()
+    yield
+    get_upload_budget.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters():
+    """Each test gets empty provider queues (their futures bind to the test's event loop)."""
+    get_limiter.cache_clear()
+    yield
+    get_limiter.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    get_session_store.cache_clear()
+    yield
+    get_session_store.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_token_counts():
+    get_token_count_cache.cache_clear()
+    yield
+    get_token_count_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_summaries():
+    get_summary_cache.cache_clear()
+    yield
+    get_summary_cache.cache_clear()
@@ -0,0 +1,207 @@
+"""Tests for per-provider admission control."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.admission import ProviderLimiter, get_limiter
+from app.config import settings as app_settings
+
+
+async def _positions(limiter: ProviderLimiter) -> list[int]:
+    return [position async for position in limiter.wait_turn()]
+
+
+async def test_free_slots_are_taken_without_waiting():
+    limiter = ProviderLimiter("llm:openai", max_concurrency=2, max_queue=1)
+
+    assert await _positions(limiter) == []
+    assert await _positions(limiter) == []
+    assert limiter.active == 2
+
+
+async def test_waiters_report_position_and_are_served_in_order():
+    """Queued callers see their place in line and get slots first come, first served."""
+    limiter = ProviderLimiter("tts", max_concurrency=1, max_queue=2)
+    await _positions(limiter)
+
+    first = asyncio.create_task(_positions(limiter))
+    second = asyncio.create_task(_positions(limiter))
+    await asyncio.sleep(0)
+
+    limiter.release()
+    assert await first == [1]
+    assert not second.done()
+
+    limiter.release()
+    assert await second == [2]
+    assert limiter.active == 1
+
+
+async def test_full_queue_is_rejected_with_retry_after():
+    limiter = ProviderLimiter("whisper", max_concurrency=1, max_queue=1)
+    await _positions(limiter)
+    waiter = asyncio.create_task(_positions(limiter))
+    await asyncio.sleep(0)
+
+    assert limiter.saturated
+    with pytest.raises(HTTPException) as exc_info:
+        await _positions(limiter)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"]
+    waiter.cancel()
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    """A caller that gives up (e.g. client disconnected) frees its place in line."""
+    limiter = ProviderLimiter("tts", max_concurrency=1, max_queue=1)
+    await _positions(limiter)
+    waiter = asyncio.create_task(_positions(limiter))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    limiter.release()
+
+    assert limiter.queued == 0
+    assert limiter.active == 0
+
+
+async def test_reservation_holds_its_place_until_waited_on_or_cancelled():
+    """A reservation counts against the limit at once; cancelling it gives its place back."""
+    limiter = ProviderLimiter("llm:openai", max_concurrency=1, max_queue=1)
+    holding = limiter.reserve()
+    queued = limiter.reserve()
+
+    assert limiter.active == 1
+    assert limiter.queued == 1
+    with pytest.raises(HTTPException):
+        limiter.reserve()
+
+    queued.cancel()
+    assert limiter.queued == 0
+    assert await _positions_for(limiter, holding) == []
+    holding.cancel()  # taken over by wait_turn, so this is a no-op
+    assert limiter.active == 1
+
+
+async def _positions_for(limiter: ProviderLimiter, reservation) -> list[int]:
+    return [position async for position in limiter.wait_turn(reservation)]
+
+
+async def test_slot_is_released_after_the_block():
+    limiter = ProviderLimiter("tts", max_concurrency=1, max_queue=0)
+
+    async with limiter.slot():
+        assert limiter.active == 1
+
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_ask_is_rejected_when_llm_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "llm_max_concurrency", 0)
+    monkeypatch.setattr(app_settings, "llm_max_queue", 0)
+
+    response = await client.post("/ask", json={"question": "Why is the sky blue?"})
+
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_cached_answer_is_served_when_llm_queue_is_full(client, monkeypatch):
+    """Only answers that need an LLM slot are turned away."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+
+    async def _stream():
+        yield MagicMock(delta="Because of sunlight!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        await client.post("/ask", json={"question": "Why is the sky blue?"})
+
+    monkeypatch.setattr(app_settings, "llm_max_concurrency", 0)
+    monkeypatch.setattr(app_settings, "llm_max_queue", 0)
+    get_limiter.cache_clear()
+
+    cached = await client.post("/ask", json={"question": "Why is the sky blue?"})
+    uncached = await client.post("/ask", json={"question": "Why is grass green?"})
+
+    assert cached.status_code == 200
+    assert "Because of sunlight!" in cached.text
+    assert uncached.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_ask_reports_queue_position_while_waiting(client, monkeypatch):
+    """A queued /ask streams its place in line, then the answer once a slot frees up."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(app_settings, "llm_max_concurrency", 1)
+    limiter = get_limiter(f"llm:{app_settings.llm_provider}")
+    await _positions(limiter)  # another answer holds the only slot
+
+    async def _stream():
+        yield MagicMock(delta="The sky is blue.")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+
+    async def _free_slot_soon():
+        await asyncio.sleep(0.05)
+        limiter.release()
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        _, response = await asyncio.gather(
+            _free_slot_soon(), client.post("/ask", json={"question": "Why?"})
+        )
+
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    queued = [e for e in events if e.get("metadata", {}).get("queue_position")]
+    assert [e["metadata"]["queue_position"] for e in queued] == [1]
+    assert queued[0]["type"] == "thinking"
+    assert any(e["type"] == "text" and e["content"] == "The sky is blue." for e in events)
+
+
+@pytest.mark.asyncio
+async def test_ask_burst_over_the_queue_is_rejected_before_streaming(client, monkeypatch):
+    """Requests beyond the free slots and queue places get a 429, not a stream that breaks."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(app_settings, "llm_max_concurrency", 1)
+    monkeypatch.setattr(app_settings, "llm_max_queue", 1)
+
+    async def _stream():
+        await asyncio.sleep(0.05)
+        yield MagicMock(delta="Because!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(side_effect=lambda *args, **kwargs: _stream())
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        responses = await asyncio.gather(
+            *[client.post("/ask", json={"question": f"Why {i}?"}) for i in range(3)]
+        )
+
+    assert sorted(r.status_code for r in responses) == [200, 200, 429]
+    assert all("Because!" in r.text for r in responses if r.status_code == 200)
+    limiter = get_limiter(f"llm:{app_settings.llm_provider}")
+    assert (limiter.active, limiter.queued) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_tts_is_rejected_when_tts_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
+    monkeypatch.setattr(app_settings, "tts_max_concurrency", 0)
+    monkeypatch.setattr(app_settings, "tts_max_queue", 0)
+
+    response = await client.post("/tts", json={"text": "Hello"})
+
+    assert response.status_code == 429
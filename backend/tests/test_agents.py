@@ -2,7 +2,17 @@
 
 from unittest.mock import MagicMock
 
-from app.agents.eli import build_system_prompt, create_eli_agent
+from llama_index.core.llms import ChatMessage
+
+from app.agents.eli import (
+    build_chat_messages,
+    build_system_prompt,
+    create_eli_agent,
+    llm_route,
+    use_direct_chat,
+)
+from app.config import LLMRoute
+from app.llm import sdk_client
 
 
 def test_build_system_prompt_young_child():
@@ -66,11 +76,22 @@ def test_build_system_prompt_contains_eli_personality():
     assert "encouraging" in prompt
 
 
+def test_build_system_prompt_shares_prefix_within_age_bucket():
+    """Test prompts for ages in one bucket differ only in the last line (a cacheable prefix)."""
+    six = build_system_prompt(age=6, story_mode=False)
+    seven = build_system_prompt(age=7, story_mode=False)
+
+    assert six.rsplit("\n", 1)[0] == seven.rsplit("\n", 1)[0]
+    assert six != seven
+
+
 def test_create_eli_agent_prepends_personality_to_react_prompt():
     """Test that create_eli_agent injects Eli's personality into the ReAct header prompt."""
     settings = MagicMock()
     settings.llm_provider = "openai"
     settings.llm_api_key = "test-key"
+    settings.llm_api_base = None
+    settings.llm_routes = {}
     settings.llm_model = "gpt-4o"
 
     agent = create_eli_agent(settings, age=5, story_mode=False)
@@ -80,3 +101,95 @@ def test_create_eli_agent_prepends_personality_to_react_prompt():
     react_header = prompts["react_header"].get_template()
     assert "Eli" in react_header
     assert "5-year-old" in react_header
+
+
+def test_llm_route_prefers_the_most_specific_route():
+    """Test story mode and age buckets pick their routes, falling back to default."""
+    settings = MagicMock()
+    settings.llm_routes = {"toddler": LLMRoute(), "story": LLMRoute(), "older:story": LLMRoute()}
+
+    assert llm_route(settings, age=3, story_mode=False) == "toddler"
+    assert llm_route(settings, age=3, story_mode=True) == "story"
+    assert llm_route(settings, age=12, story_mode=True) == "older:story"
+    assert llm_route(settings, age=9, story_mode=False) == "default"
+
+
+def test_create_eli_agent_uses_routed_model():
+    settings = _llm_settings()
+    settings.llm_routes = {"toddler": LLMRoute(model="gpt-4o-mini", max_tokens=200)}
+
+    agent = create_eli_agent(settings, age=3, story_mode=False)
+
+    assert agent.llm.model == "gpt-4o-mini"
+    assert agent.llm.max_tokens == 200
+
+
+def test_use_direct_chat_without_tools():
+    """Test auto mode bypasses the ReAct agent when no tools are registered."""
+    settings = MagicMock()
+    settings.engine_mode = "auto"
+
+    assert use_direct_chat(settings) is True
+
+
+def test_use_direct_chat_agent_mode():
+    """Test agent mode always runs the ReAct agent."""
+    settings = MagicMock()
+    settings.engine_mode = "agent"
+
+    assert use_direct_chat(settings) is False
+
+
+def test_use_direct_chat_falls_back_to_agent_with_tools(monkeypatch):
+    """Test auto mode falls back to the agent once tools exist."""
+    import app.agents.eli as eli
+
+    monkeypatch.setattr(eli, "ELI_TOOLS", [MagicMock()])
+    settings = MagicMock()
+    settings.engine_mode = "auto"
+
+    assert use_direct_chat(settings) is False
+
+
+def test_build_chat_messages_orders_system_history_question():
+    """Test direct chat input is system prompt, then history, then the question."""
+    history = [
+        ChatMessage(role="user", content="Hi"),
+        ChatMessage(role="assistant", content="Hey!"),
+    ]
+
+    messages = build_chat_messages(age=7, story_mode=True, chat_history=history, question="Why?")
+
+    assert [m.role for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[0].content == build_system_prompt(7, True)
+    assert messages[-1].content == "Why?"
+
+
+def _llm_settings(provider: str = "openai", model: str = "gpt-4o") -> MagicMock:
+    settings = MagicMock()
+    settings.llm_provider = provider
+    settings.llm_api_key = "test-key"
+    settings.llm_api_base = None
+    settings.llm_routes = {}
+    settings.llm_model = model
+    return settings
+
+
+def test_create_eli_agent_reuses_agent_for_same_prompt():
+    """Test agents are pooled per LLM config, age and story mode."""
+    first = create_eli_agent(_llm_settings(), age=6, story_mode=False)
+
+    assert create_eli_agent(_llm_settings(), age=6, story_mode=False) is first
+    assert create_eli_agent(_llm_settings(), age=6, story_mode=True) is not first
+    assert create_eli_agent(_llm_settings(), age=9, story_mode=False) is not first
+    assert (
+        create_eli_agent(_llm_settings(model="gpt-4o-mini"), age=6, story_mode=False) is not first
+    )
+
+
+def test_pooled_agents_share_one_llm_client():
+    """Test every pooled agent for a provider/model sends requests through the same client."""
+    young = create_eli_agent(_llm_settings(), age=3, story_mode=False)
+    older = create_eli_agent(_llm_settings(), age=11, story_mode=True)
+
+    assert sdk_client(young.llm) is sdk_client(older.llm)
@@ -0,0 +1,30 @@
+"""Smoke tests: every benchmark still runs end to end, with tiny inputs."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["benchmarks.engine_modes", "--runs", "1"],
+        ["benchmarks.memory_prep", "--runs", "1"],
+        ["benchmarks.sse_encoding", "--events", "100", "--tokens", "5", "--token-ms", "1"],
+        ["benchmarks.load", "--requests", "2", "--concurrency", "1"],
+    ],
+    ids=lambda args: args[0],
+)
+def test_benchmark_runs(args):
+    result = subprocess.run(
+        [sys.executable, "-m", *args],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip()
@@ -0,0 +1,195 @@
+"""Tests for the response caches."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.cache import AnswerCache, AudioCache, answer_cache_key, audio_cache_key, get_answer_cache
+from app.cache.answers import SQLiteAnswerStore, normalize_question
+from app.llm import LLMConfig
+from app.messages import HistoryMessage
+from app.routes.ask import generate_response
+
+_OPENAI = LLMConfig(provider="openai", model="gpt-4o", api_key="k")
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+
+def test_normalize_question_folds_trivial_variants():
+    """Case, spacing and trailing punctuation must not split the cache."""
+    assert normalize_question("  Why is the   SKY blue?? ") == "why is the sky blue"
+    assert normalize_question("why is the sky blue") == "why is the sky blue"
+
+
+def test_answer_cache_key_shares_age_bucket():
+    """Ages with the same prompt guidance share answers; other buckets don't."""
+    key = answer_cache_key("Why?", 5, False, _OPENAI, [])
+
+    assert answer_cache_key("why", 6, False, _OPENAI, []) == key
+    assert answer_cache_key("Why?", 9, False, _OPENAI, []) != key
+
+
+def test_answer_cache_key_varies_with_mode_model_and_history():
+    """Story mode, model and conversation history are all part of the key."""
+    key = answer_cache_key("Why?", 5, False, _OPENAI, [])
+    history = [HistoryMessage(role="user", content="What is rain?")]
+
+    assert answer_cache_key("Why?", 5, True, _OPENAI, []) != key
+    assert answer_cache_key("Why?", 5, False, _OPENAI._replace(model="gpt-4o-mini"), []) != key
+    assert answer_cache_key("Why?", 5, False, _OPENAI, history) != key
+
+
+# ---------------------------------------------------------------------------
+# Memory tier
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_counts_hits_and_misses():
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+
+    assert await cache.get("k") is None
+    await cache.set("k", "Because!")
+    assert await cache.get("k") == "Because!"
+
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.stats.hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_evicts_least_recently_used():
+    cache = AnswerCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", "A")
+    await cache.set("b", "B")
+    await cache.get("a")  # "b" is now least recently used
+    await cache.set("c", "C")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "A"
+    assert await cache.get("c") == "C"
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_expires_entries():
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+    with patch("app.cache.answers.time.monotonic", return_value=1000.0):
+        await cache.set("k", "Because!")
+    with patch("app.cache.answers.time.monotonic", return_value=1061.0):
+        assert await cache.get("k") is None
+    assert len(cache) == 0
+
+
+# ---------------------------------------------------------------------------
+# Disk tier
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_round_trip_and_promotion(tmp_path):
+    """Answers survive a fresh memory tier and are promoted back into memory."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'answers.db'}"
+    store = SQLiteAnswerStore(url, ttl_seconds=60)
+    await AnswerCache(max_entries=10, ttl_seconds=60, store=store).set("k", "Because!")
+
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, store=store)
+    assert await cache.get("k") == "Because!"
+    assert len(cache) == 1
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_failure_is_a_miss():
+    """A broken disk tier must never break /ask."""
+    store = MagicMock()
+    store.get = AsyncMock(side_effect=OSError("disk gone"))
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, store=store)
+
+    assert await cache.get("k") is None
+    assert cache.stats.misses == 1
+
+
+# ---------------------------------------------------------------------------
+# /ask integration
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_generate_response_serves_cached_answer_without_llm():
+    """A repeated question streams the stored answer and never calls the LLM."""
+
+    async def _stream():
+        yield MagicMock(delta="Because of sunlight!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        [chunk async for chunk in generate_response("Why is the sky blue?", [], 5, False)]
+        chunks = [chunk async for chunk in generate_response("why is the sky blue", [], 5, False)]
+
+    events = [
+        json.loads(line[len(b"data: ") :])
+        for chunk in chunks
+        for line in chunk.splitlines()
+        if line.startswith(b"data: ")
+    ]
+    assert [e["type"] for e in events] == ["thinking", "text", "done"]
+    assert events[1]["content"] == "Because of sunlight!"
+    assert events[1]["metadata"] == {"cached": True}
+    llm.astream_chat.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_endpoint(client):
+    cache = get_answer_cache()
+    await cache.get("missing")
+
+    response = await client.get("/cache/stats")
+
+    assert response.status_code == 200
+    assert response.json()["answers"]["misses"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Audio cache
+# ---------------------------------------------------------------------------
+
+
+def test_audio_cache_key_covers_voice_and_format():
+    key = audio_cache_key("Hello", "tts-1", "nova", "mp3")
+
+    assert audio_cache_key("Hello", "tts-1", "nova", "mp3") == key
+    assert audio_cache_key("Hello", "tts-1", "alloy", "mp3") != key
+    assert audio_cache_key("Hello", "tts-1", "nova", "opus") != key
+
+
+def test_audio_cache_round_trip(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=1024)
+
+    assert cache.get("k") is None
+    path = cache.put("k", b"mp3")
+
+    assert cache.get("k") == path
+    assert path.read_bytes() == b"mp3"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_audio_cache_evicts_least_recently_used(tmp_path):
+    """Past max_bytes, the clips touched longest ago are deleted first."""
+    import os
+
+    cache = AudioCache(tmp_path, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    os.utime(cache.path_for("a"), (1, 1))
+    os.utime(cache.path_for("b"), (2, 2))
+    cache.get("a")  # bump "a" so "b" is the oldest
+    cache.put("c", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
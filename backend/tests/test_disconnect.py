@@ -0,0 +1,54 @@
+"""Tests for cancelling upstream calls when the client disconnects."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.disconnect import cancel_on_disconnect
+
+
+def _request(disconnect: asyncio.Event) -> MagicMock:
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    request = MagicMock()
+    request.receive = receive
+    return request
+
+
+async def test_returns_result_while_client_is_connected():
+    async def work():
+        return "transcript"
+
+    assert await cancel_on_disconnect(_request(asyncio.Event()), work()) == "transcript"
+
+
+async def test_cancels_work_when_client_disconnects():
+    """The upstream call is cancelled (and has unwound) before the 499 is raised."""
+    disconnect = asyncio.Event()
+    unwound = False
+
+    async def work():
+        nonlocal unwound
+        disconnect.set()
+        try:
+            await asyncio.sleep(10)
+        finally:
+            unwound = True
+
+    with pytest.raises(HTTPException) as exc_info:
+        await cancel_on_disconnect(_request(disconnect), work())
+
+    assert exc_info.value.status_code == 499
+    assert unwound
+
+
+async def test_upstream_error_propagates():
+    async def work():
+        raise ValueError("upstream failed")
+
+    with pytest.raises(ValueError):
+        await cancel_on_disconnect(_request(asyncio.Event()), work())
@@ -0,0 +1,117 @@
+"""Tests for LLM failover and hedged requests."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import metrics
+from app.config import settings as app_settings
+from app.hedging import LatencyWindow, Upstream, first_token_window, hedge_delay, hedged_chat
+
+
+class FakeLLM:
+    """Streams ``deltas`` after ``delay`` seconds, or fails with ``error`` before the first."""
+
+    def __init__(self, deltas=(), delay=0.0, error=None):
+        self.deltas = deltas
+        self.delay = delay
+        self.error = error
+        self.closed = False
+
+    async def astream_chat(self, messages):
+        async def _stream():
+            try:
+                await asyncio.sleep(self.delay)
+                if self.error:
+                    raise self.error
+                for delta in self.deltas:
+                    yield MagicMock(delta=delta)
+            finally:
+                self.closed = True
+
+        return _stream()
+
+
+async def _answer(*args, **kwargs) -> list[tuple[str, str]]:
+    return [(provider, chunk.delta) async for provider, chunk in hedged_chat([], *args, **kwargs)]
+
+
+async def test_streams_from_primary_without_secondary():
+    primary = Upstream("openai", FakeLLM(["The sky ", "is blue."]))
+
+    assert await _answer(primary) == [("openai", "The sky "), ("openai", "is blue.")]
+
+
+async def test_fails_over_when_primary_errors_before_first_token():
+    failovers = metrics.LLM_HEDGES.value(reason="error", winner="secondary")
+    primary = Upstream("openai", FakeLLM(error=RuntimeError("overloaded")))
+    secondary = Upstream("anthropic", FakeLLM(["Because of sunlight."]))
+
+    assert await _answer(primary, secondary) == [("anthropic", "Because of sunlight.")]
+    assert metrics.LLM_HEDGES.value(reason="error", winner="secondary") == failovers + 1
+
+
+async def test_raises_when_every_provider_fails():
+    primary = Upstream("openai", FakeLLM(error=RuntimeError("overloaded")))
+    secondary = Upstream("anthropic", FakeLLM(error=ValueError("bad key")))
+
+    with pytest.raises(RuntimeError, match="overloaded"):
+        await _answer(primary, secondary)
+
+
+async def test_slow_primary_is_hedged_and_cancelled():
+    """The secondary answers first, so the primary's call is abandoned."""
+    slow = FakeLLM(["Late answer."], delay=5)
+    primary = Upstream("openai", slow)
+    secondary = Upstream("anthropic", FakeLLM(["Quick answer."]))
+
+    assert await _answer(primary, secondary, hedge_after=0.01) == [("anthropic", "Quick answer.")]
+    assert slow.closed
+
+
+async def test_primary_that_starts_first_wins_the_hedge():
+    fast_primary = Upstream("openai", FakeLLM(["Primary."], delay=0.02))
+    slow_secondary = FakeLLM(["Secondary."], delay=5)
+
+    answer = await _answer(fast_primary, Upstream("anthropic", slow_secondary), hedge_after=0.01)
+
+    assert answer == [("openai", "Primary.")]
+    assert slow_secondary.closed
+
+
+async def test_no_hedge_before_the_delay():
+    primary = Upstream("openai", FakeLLM(["Primary."], delay=0.01))
+    secondary = FakeLLM(["Secondary."])
+
+    assert await _answer(primary, Upstream("anthropic", secondary), hedge_after=5) == [
+        ("openai", "Primary.")
+    ]
+    assert not secondary.closed  # never started
+
+
+def test_latency_window_keeps_recent_samples():
+    window = LatencyWindow(size=10)
+    for seconds in range(100):
+        window.observe(float(seconds))
+
+    assert len(window) == 10
+    assert window.quantile(0.0) == 90.0
+    assert window.quantile(0.95) == 99.0
+
+
+def test_hedge_delay_follows_recent_p95_within_bounds(monkeypatch):
+    monkeypatch.setattr(app_settings, "llm_hedge_min_delay_seconds", 0.5)
+    monkeypatch.setattr(app_settings, "llm_hedge_max_delay_seconds", 3.0)
+    first_token_window.cache_clear()
+
+    assert hedge_delay("openai") == 3.0  # not enough samples yet
+
+    for _ in range(50):
+        first_token_window("openai").observe(1.2)
+    assert hedge_delay("openai") == 1.2
+
+    for _ in range(200):
+        first_token_window("openai").observe(0.1)
+    assert hedge_delay("openai") == 0.5
+    first_token_window.cache_clear()
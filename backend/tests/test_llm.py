@@ -0,0 +1,170 @@
+"""Tests for the LLM factory."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from llama_index.core.llms import ChatMessage
+from llama_index.llms.anthropic import Anthropic
+from llama_index.llms.openai import OpenAI
+
+from app import metrics
+from app.anthropic_llm import PromptCachingAnthropic
+from app.config import LLMRoute
+from app.llm import LLMConfig, get_llm, record_prompt_usage, sdk_client, with_limits
+
+
+def _settings(provider: str, model: str) -> MagicMock:
+    settings = MagicMock()
+    settings.llm_provider = provider
+    settings.llm_model = model
+    settings.llm_api_key = "test-key"
+    settings.llm_api_base = None
+    settings.llm_routes = {}
+    return settings
+
+
+def test_get_llm_openai():
+    """Test the OpenAI provider is the default."""
+    llm = get_llm(_settings("openai", "gpt-4o"))
+
+    assert isinstance(llm, OpenAI)
+    assert llm.model == "gpt-4o"
+
+
+def test_get_llm_anthropic():
+    """Test the Anthropic provider is selected by llm_provider."""
+    llm = get_llm(_settings("anthropic", "claude-3-5-haiku-latest"))
+
+    assert isinstance(llm, Anthropic)
+
+
+def test_get_llm_returns_same_instance():
+    """Test one client (and connection pool) is built per provider/model."""
+    first = get_llm(_settings("openai", "gpt-4o"))
+
+    assert get_llm(_settings("openai", "gpt-4o")) is first
+    assert get_llm(_settings("openai", "gpt-4o-mini")) is not first
+
+
+def test_llm_config_from_settings():
+    """Test LLMConfig captures the fields that identify a client."""
+    config = LLMConfig.from_settings(_settings("anthropic", "claude"))
+
+    assert config == LLMConfig(provider="anthropic", model="claude", api_key="test-key")
+
+
+def test_llm_config_from_route():
+    """Test a route overrides the model and sets output limits; unset fields use the base."""
+    settings = _settings("openai", "gpt-4o")
+    settings.llm_routes = {
+        "toddler": LLMRoute(model="gpt-4o-mini", max_tokens=200, temperature=0.7),
+        "story": LLMRoute(max_tokens=1000),
+    }
+
+    toddler = LLMConfig.from_settings(settings, "toddler")
+    story = LLMConfig.from_settings(settings, "story")
+
+    assert (toddler.model, toddler.max_tokens, toddler.temperature) == ("gpt-4o-mini", 200, 0.7)
+    assert (story.model, story.max_tokens, story.temperature) == ("gpt-4o", 1000, None)
+    assert LLMConfig.from_settings(settings, "older") == LLMConfig.from_settings(settings)
+
+
+def test_routes_share_one_llm_per_model():
+    """Test a route's output limits are sent per call, so they don't split the client."""
+    settings = _settings("anthropic", "claude-3-5-sonnet-latest")
+    settings.llm_routes = {
+        "toddler": LLMRoute(model="claude-3-5-haiku-latest", max_tokens=150),
+        "older": LLMRoute(max_tokens=800),
+    }
+
+    assert get_llm(settings, "toddler").model == "claude-3-5-haiku-latest"
+    assert get_llm(settings, "older") is get_llm(settings)
+    assert LLMConfig.from_settings(settings, "toddler").limits == {"max_tokens": 150}
+    assert LLMConfig.from_settings(settings).limits == {}
+
+
+def test_with_limits_shares_the_sdk_client():
+    llm = get_llm(_settings("openai", "gpt-4o"))
+
+    limited = with_limits(llm, {"max_tokens": 200})
+
+    assert limited.max_tokens == 200
+    assert llm.max_tokens is None
+    assert sdk_client(limited) is sdk_client(llm)
+
+
+def test_get_llm_api_base_override():
+    """Test llm_api_base points the client at another endpoint (a proxy or stand-in)."""
+    settings = _settings("openai", "gpt-4o")
+    settings.llm_api_base = "http://127.0.0.1:9999/v1"
+
+    llm = get_llm(settings)
+
+    assert llm.api_base == "http://127.0.0.1:9999/v1"
+    assert llm is not get_llm(_settings("openai", "gpt-4o"))
+
+
+async def test_anthropic_marks_system_prompt_as_cache_breakpoint():
+    """Test the first system message is sent as a cacheable block, later ones after it."""
+
+    async def _no_events():
+        return
+        yield
+
+    llm = PromptCachingAnthropic(model="claude-3-5-haiku-latest", api_key="test-key")
+    create = AsyncMock(return_value=_no_events())
+    llm._aclient = MagicMock(messages=MagicMock(create=create))
+
+    stream = await llm.astream_chat(
+        [
+            ChatMessage(role="system", content="You are Eli."),
+            ChatMessage(role="system", content="Summary of the conversation so far: cats"),
+            ChatMessage(role="user", content="Why?"),
+        ]
+    )
+    async for _ in stream:
+        pass
+
+    assert create.call_args.kwargs["extra_body"]["system"] == [
+        {"type": "text", "text": "You are Eli.", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "Summary of the conversation so far: cats"},
+    ]
+
+
+def test_openai_streams_report_usage():
+    """Test streamed OpenAI answers ask for usage, which includes cached prompt tokens."""
+    llm = get_llm(_settings("openai", "gpt-4o"))
+
+    assert llm.additional_kwargs["stream_options"] == {"include_usage": True}
+
+
+def test_record_prompt_usage_openai():
+    before = metrics.LLM_PROMPT_TOKENS.value(provider="openai", cache="read")
+    usage = SimpleNamespace(prompt_tokens=1500, prompt_tokens_details={"cached_tokens": 1024})
+
+    record_prompt_usage("openai", SimpleNamespace(usage=usage))
+
+    assert metrics.LLM_PROMPT_TOKENS.value(provider="openai", cache="read") == before + 1024
+
+
+def test_record_prompt_usage_anthropic():
+    """Test Anthropic's cache reads and writes are counted apart from uncached input."""
+
+    def tokens(cache):
+        return metrics.LLM_PROMPT_TOKENS.value(provider="anthropic", cache=cache)
+
+    before = {cache: tokens(cache) for cache in ("read", "write", "none")}
+    usage = SimpleNamespace(
+        input_tokens=40, cache_read_input_tokens=1200, cache_creation_input_tokens=0
+    )
+
+    record_prompt_usage("anthropic", {"usage": usage})
+
+    assert tokens("read") == before["read"] + 1200
+    assert tokens("write") == before["write"]
+    assert tokens("none") == before["none"] + 40
+
+
+def test_record_prompt_usage_ignores_chunks_without_usage():
+    record_prompt_usage("openai", SimpleNamespace(usage=None))
+    record_prompt_usage("openai", None)
@@ -0,0 +1,159 @@
+"""Tests for memoized token counting, the chat memory built on it and history summaries."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from llama_index.core.llms import ChatMessage
+from llama_index.core.memory import ChatMemoryBuffer
+
+from app.cache.tokens import TokenCountCache, get_token_count_cache
+from app.memory import build_memory, fold_history
+from app.messages import HistoryMessage
+
+
+def _history(turns: int) -> list[HistoryMessage]:
+    messages = []
+    for i in range(turns):
+        messages.append(HistoryMessage(role="user", content=f"question number {i} " * (i + 1)))
+        messages.append(HistoryMessage(role="assistant", content=f"answer {i}"))
+    return messages
+
+
+def test_token_count_cache_tokenizes_each_text_once():
+    calls = []
+
+    def tokenizer(text):
+        calls.append(text)
+        return text.split()
+
+    cache = TokenCountCache(tokenizer, max_entries=10)
+
+    assert cache.count("why is the sky blue") == 5
+    assert cache.count("why is the sky blue") == 5
+    assert calls == ["why is the sky blue"]
+    assert cache.stats.hits == 1
+
+
+def test_token_count_cache_is_bounded():
+    cache = TokenCountCache(str.split, max_entries=2)
+    for text in ("a", "b b", "c c c"):
+        cache.count(text)
+
+    assert len(cache) == 2
+    cache.count("a")
+    assert cache.stats.misses == 4  # "a" was evicted
+
+
+def test_token_count_cache_key_includes_tokenizer():
+    """Counts from one tokenizer are never served for another."""
+    first = TokenCountCache(str.split, max_entries=10)
+
+    assert first._name != TokenCountCache(list, max_entries=10)._name
+
+
+@pytest.mark.parametrize("token_limit", [5, 20, 60, 1000])
+async def test_memoized_memory_trims_like_chat_memory_buffer(token_limit):
+    """With a tokenizer whose counts add up exactly, trimming matches the stock buffer."""
+    history = _history(6)
+    stock = ChatMemoryBuffer.from_defaults(
+        chat_history=[ChatMessage(role=m.role, content=m.content) for m in history],
+        token_limit=token_limit,
+        tokenizer_fn=str.split,
+    )
+
+    with patch(
+        "app.cache.tokens.get_token_count_cache",
+        return_value=TokenCountCache(str.split, max_entries=100),
+    ):
+        memoized = await build_memory(history, token_limit).aget()
+
+    assert [m.content for m in memoized] == [m.content for m in await stock.aget()]
+
+
+async def test_build_memory_reuses_counts_across_turns():
+    history = _history(5)
+    await build_memory(history, 1000).aget()
+    misses = get_token_count_cache().stats.misses
+
+    await build_memory([*history, HistoryMessage(role="user", content="and then?")], 1000).aget()
+
+    assert get_token_count_cache().stats.misses == misses + 1
+
+
+@pytest.fixture
+def word_counts():
+    with patch(
+        "app.cache.tokens.get_token_count_cache",
+        return_value=TokenCountCache(str.split, max_entries=100),
+    ):
+        yield
+
+
+def _summarizer(*summaries: str) -> MagicMock:
+    llm = MagicMock()
+    llm.achat = AsyncMock(
+        side_effect=[MagicMock(message=MagicMock(content=text)) for text in summaries]
+    )
+    return llm
+
+
+async def test_short_history_is_not_summarized(word_counts):
+    history = _history(2)
+    llm = _summarizer()
+
+    with patch("app.memory.get_llm", return_value=llm):
+        folded = await fold_history(history, 1000)
+
+    assert folded.summary is None
+    assert folded.recent == history
+    llm.achat.assert_not_called()
+
+
+async def test_summary_is_reused_on_later_turns(word_counts):
+    """Older turns are summarized once; the next turns reuse the cached summary."""
+    history = _history(6)
+    llm = _summarizer("they talked about numbers")
+
+    with patch("app.memory.get_llm", return_value=llm):
+        first = await fold_history(history, 40)
+        next_turn = [*history, HistoryMessage(role="user", content="and then?")]
+        second = await fold_history(next_turn, 40)
+
+    assert llm.achat.await_count == 1
+    assert first.summary == second.summary == "they talked about numbers"
+    assert first.recent[0].role == "user"
+    assert sum(len(m.content.split()) for m in first.recent) <= 20
+    assert second.covered == first.covered
+    assert second.recent == next_turn[first.covered :]
+
+
+async def test_summary_continues_from_previous_summary(word_counts):
+    llm = _summarizer("earlier: colours")
+
+    with patch("app.memory.get_llm", return_value=llm):
+        await fold_history(_history(6), 40, summary="they talked about colours")
+
+    prompt = llm.achat.await_args.args[0][0].content
+    assert "they talked about colours" in prompt
+    assert "Child: question number 0" in prompt
+
+
+async def test_failed_summary_falls_back_to_truncation(word_counts):
+    history = _history(6)
+    llm = MagicMock()
+    llm.achat = AsyncMock(side_effect=RuntimeError("provider down"))
+
+    with patch("app.memory.get_llm", return_value=llm):
+        folded = await fold_history(history, 40)
+
+    assert folded.summary is None
+    assert folded.recent == history
+    assert len(await build_memory(folded.recent, 40).aget()) < len(history)
+
+
+async def test_build_memory_starts_with_summary():
+    memory = build_memory(_history(1), 1000, summary="they talked about cats")
+
+    messages = await memory.aget()
+    assert messages[0].role == "system"
+    assert "they talked about cats" in messages[0].content
@@ -0,0 +1,130 @@
+"""Tests for the metrics registry and the /metrics endpoint."""
+
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import openai
+import pytest
+
+from app import metrics
+from app.config import settings as app_settings
+from app.metrics import Registry
+
+
+def test_counter_renders_labelled_samples():
+    """Test counters render HELP/TYPE lines and one sample per label set."""
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests.", ("route",))
+
+    counter.inc(route="/ask")
+    counter.inc(2, route="/ask")
+    counter.inc(route='/t"ts')
+
+    assert counter.value(route="/ask") == 3
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/ask"} 3\n'
+        'requests_total{route="/t\\"ts"} 1\n'
+    )
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram buckets are cumulative and end with +Inf, _sum and _count."""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.count() == 4
+    assert histogram.sum() == pytest.approx(3.65)
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_histogram_time_skips_failed_blocks():
+    """Test only blocks that complete are observed."""
+    histogram = Registry().histogram("work_seconds", "Work.")
+
+    with histogram.time():
+        pass
+    with pytest.raises(RuntimeError), histogram.time():
+        raise RuntimeError
+
+    assert histogram.count() == 1
+
+
+def test_duplicate_metric_names_are_rejected():
+    registry = Registry()
+    registry.counter("x_total", "X.")
+
+    with pytest.raises(ValueError):
+        registry.histogram("x_total", "X again.")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_text_format(client):
+    """Test /metrics exposes the registry in the text exposition format."""
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE eli5_llm_first_token_seconds histogram" in response.text
+    assert "# TYPE eli5_upstream_errors_total counter" in response.text
+
+
+@pytest.mark.asyncio
+async def test_transcribe_records_upload_size_and_whisper_errors(client, monkeypatch):
+    """Test /transcribe records the upload size and counts the 502 path by upstream."""
+    monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
+    uploads = metrics.UPLOAD_BYTES.count()
+    errors = metrics.UPSTREAM_ERRORS.value(upstream="whisper", error="APIConnectionError")
+
+    with patch("app.routes.transcribe._get_whisper_client") as mock_get_client:
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create = AsyncMock(
+            side_effect=openai.APIConnectionError(request=MagicMock())
+        )
+        mock_get_client.return_value = mock_client
+
+        response = await client.post(
+            "/transcribe",
+            files={"audio": ("recording.webm", io.BytesIO(b"0" * 2048), "audio/webm")},
+        )
+
+    assert response.status_code == 502
+    assert metrics.UPLOAD_BYTES.count() == uploads + 1
+    assert (
+        metrics.UPSTREAM_ERRORS.value(upstream="whisper", error="APIConnectionError") == errors + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_ask_records_llm_timings_and_sse_events(client, monkeypatch):
+    """Test /ask records time to first token, generation time and events by type."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+
+    async def _stream():
+        for delta in ("The sky ", "is blue."):
+            yield MagicMock(delta=delta)
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    first_tokens = metrics.LLM_FIRST_TOKEN_SECONDS.count(engine="direct")
+    generations = metrics.LLM_GENERATION_SECONDS.count(engine="direct")
+    done_events = metrics.SSE_EVENTS.value(event_type="done")
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        response = await client.post("/ask", json={"question": "Why is the sky blue?"})
+
+    assert response.status_code == 200
+    assert metrics.LLM_FIRST_TOKEN_SECONDS.count(engine="direct") == first_tokens + 1
+    assert metrics.LLM_GENERATION_SECONDS.count(engine="direct") == generations + 1
+    assert metrics.SSE_EVENTS.value(event_type="done") == done_events + 1
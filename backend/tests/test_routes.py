@@ -1,10 +1,17 @@
 """Tests for API routes."""
 
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
+from llama_index.core.agent.workflow import AgentStream
 from pydantic import ValidationError
 
+from app import metrics
+from app.config import LLMRoute
+from app.config import settings as app_settings
 from app.messages import HistoryMessage
-from app.routes.ask import AskRequest
+from app.routes.ask import AskRequest, generate_response
 
 
 def test_ask_request_with_history():
@@ -94,3 +101,322 @@ async def test_health_endpoint(client):
     response = await client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
+
+
+class _FakeHandler:
+    """Stand-in for a workflow handler: streams events, then resolves to a response."""
+
+    def __init__(self, chunks: list[str], final: str):
+        self._chunks = chunks
+        self._final = final
+
+    async def stream_events(self):
+        response = ""
+        for chunk in self._chunks:
+            response += chunk
+            yield AgentStream(delta=chunk, response=response, current_agent_name="Agent")
+
+    def __await__(self):
+        async def _result():
+            return self._final
+
+        return _result().__await__()
+
+
+def _parse_sse(chunks: list[bytes]) -> list[dict]:
+    return [
+        json.loads(line[len(b"data: ") :])
+        for chunk in chunks
+        for line in chunk.splitlines()
+        if line.startswith(b"data: ")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_generate_response_streams_answer_deltas(monkeypatch):
+    """Test /ask emits incremental text deltas, then the assembled answer, then done."""
+    monkeypatch.setattr(app_settings, "engine_mode", "agent")
+    agent = MagicMock()
+    agent.run.return_value = _FakeHandler(
+        ["Thought: easy.\n", "Answer: The sky ", "is blue."], "The sky is blue."
+    )
+
+    with (
+        patch("app.routes.ask.create_eli_agent", return_value=agent),
+        patch("app.routes.ask.Context"),
+    ):
+        events = _parse_sse(
+            [chunk async for chunk in generate_response("Why?", [], age=5, story_mode=False)]
+        )
+
+    assert [e["type"] for e in events] == ["thinking", "text", "text", "text", "done"]
+    assert [e["content"] for e in events[1:3]] == ["The sky ", "is blue."]
+    assert all(e["metadata"]["delta"] for e in events[1:3])
+    assert events[3]["content"] == "The sky is blue."
+    assert "metadata" not in events[3]
+
+
+@pytest.mark.asyncio
+async def test_generate_response_direct_chat_skips_agent():
+    """Test the default engine streams from the LLM chat API without building an agent."""
+    chunks = [
+        MagicMock(delta="The sky "),
+        MagicMock(delta="is blue."),
+    ]
+
+    async def _stream():
+        for chunk in chunks:
+            yield chunk
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+
+    history = [
+        HistoryMessage(role="user", content="Hi"),
+        HistoryMessage(role="assistant", content="Hello!"),
+    ]
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        patch("app.routes.ask.create_eli_agent") as mock_create_agent,
+    ):
+        events = _parse_sse(
+            [chunk async for chunk in generate_response("Why?", history, age=5, story_mode=False)]
+        )
+
+    mock_create_agent.assert_not_called()
+    messages = llm.astream_chat.call_args.args[0]
+    assert [m.role for m in messages] == ["system", "user", "assistant", "user"]
+    assert "5-year-old" in messages[0].content
+    assert messages[-1].content == "Why?"
+    assert [e["type"] for e in events] == ["thinking", "text", "text", "text", "done"]
+    assert events[3]["content"] == "The sky is blue."
+
+
+@pytest.mark.asyncio
+async def test_generate_response_routes_by_age(monkeypatch):
+    """Test the answer comes from the route's LLM and the routing decision is counted."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(
+        app_settings, "llm_routes", {"toddler": LLMRoute(model="small-model", max_tokens=150)}
+    )
+    routed = metrics.LLM_ROUTES.value(route="toddler", model="small-model")
+
+    async def _stream():
+        yield MagicMock(delta="It's the sun!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+
+    with patch("app.routes.ask.get_llm", return_value=llm) as get_llm:
+        [chunk async for chunk in generate_response("Why?", [], age=3, story_mode=False)]
+
+    assert get_llm.call_args.args[1] == "toddler"
+    assert llm.astream_chat.call_args.kwargs == {"max_tokens": 150}
+    assert metrics.LLM_ROUTES.value(route="toddler", model="small-model") == routed + 1
+
+
+@pytest.mark.asyncio
+async def test_generate_response_fails_over_to_secondary_provider(monkeypatch):
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(app_settings, "llm_fallback_provider", "anthropic")
+
+    async def _stream():
+        yield MagicMock(delta="From the other provider.")
+
+    primary = MagicMock()
+    primary.astream_chat = AsyncMock(side_effect=ConnectionError("primary down"))
+    secondary = MagicMock()
+    secondary.astream_chat = AsyncMock(return_value=_stream())
+
+    with (
+        patch("app.routes.ask.get_llm", return_value=primary),
+        patch("app.routes.ask.get_fallback_llm", return_value=secondary),
+    ):
+        events = _parse_sse(
+            [chunk async for chunk in generate_response("Why?", [], age=5, story_mode=False)]
+        )
+
+    assert [e["content"] for e in events if e["type"] == "text"][-1] == "From the other provider."
+
+
+@pytest.mark.asyncio
+async def test_generate_response_interleaves_sentence_audio(monkeypatch):
+    """Test speak mode emits one audio event per sentence, in order, before done."""
+    monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
+
+    async def _stream():
+        for delta in ["Light from the sun is many colours. ", "Blue bounces around the most!"]:
+            yield MagicMock(delta=delta)
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    synthesize = AsyncMock(side_effect=lambda sentence: f"/tts/audio/{len(sentence)}")
+
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        patch("app.routes.ask.synthesize_clip_url", synthesize),
+    ):
+        events = _parse_sse(
+            [
+                chunk
+                async for chunk in generate_response(
+                    "Why is the sky blue?", [], age=5, story_mode=False, speak=True
+                )
+            ]
+        )
+
+    audio = [e for e in events if e["type"] == "audio"]
+    assert [e["metadata"]["text"] for e in audio] == [
+        "Light from the sun is many colours.",
+        "Blue bounces around the most!",
+    ]
+    assert [e["metadata"]["index"] for e in audio] == [0, 1]
+    assert events[-1]["type"] == "done"
+
+
+def test_ask_request_speak_defaults_off():
+    """Test speech interleaving is opt-in."""
+    assert AskRequest(question="Test").speak is False
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_questions_share_one_generation():
+    """Test identical /ask requests in flight together trigger a single LLM call."""
+    import asyncio
+
+    release = asyncio.Event()
+
+    async def _stream():
+        yield MagicMock(delta="Because ")
+        await release.wait()
+        yield MagicMock(delta="of sunlight!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(side_effect=lambda messages, **limits: _stream())
+
+    async def _ask():
+        return _parse_sse(
+            [chunk async for chunk in generate_response("Why is the sky blue?", [], 5, False)]
+        )
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        first = asyncio.create_task(_ask())
+        second = asyncio.create_task(_ask())
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(first, second)
+
+    llm.astream_chat.assert_called_once()
+    assert results[0] == results[1]
+    assert results[0][-2]["content"] == "Because of sunlight!"
+
+
+@pytest.mark.asyncio
+async def test_abandoned_answer_closes_the_provider_stream(monkeypatch):
+    """Test the LLM stream is cancelled and closed once the only client disconnects."""
+    import asyncio
+
+    from app import metrics
+    from app.routes import ask
+
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(ask._answer_flights, "cancel_abandoned_after", 0)
+    closed = asyncio.Event()
+
+    async def _stream():
+        try:
+            yield MagicMock(delta="Because ")
+            await asyncio.sleep(10)
+            yield MagicMock(delta="of sunlight!")
+        finally:
+            closed.set()
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    cancelled = metrics.CANCELLED_UPSTREAM_CALLS.value(upstream="llm")
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        frames = generate_response("Why is the sky blue?", [], 5, False)
+        async for frame in frames:
+            if b'"delta":true' in frame:
+                break
+        await frames.aclose()
+        await asyncio.wait_for(closed.wait(), timeout=1)
+
+    assert metrics.CANCELLED_UPSTREAM_CALLS.value(upstream="llm") == cancelled + 1
+
+
+def _event_ids(chunks: list[bytes]) -> list[str]:
+    return [
+        line[len(b"id: ") :].decode()
+        for chunk in chunks
+        for line in chunk.splitlines()
+        if line.startswith(b"id: ")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dropped_answer_resumes_after_last_event_id(client, monkeypatch):
+    """Test a reconnecting client gets only the events it missed, without a second generation."""
+    import asyncio
+
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    release = asyncio.Event()
+
+    async def _stream():
+        yield MagicMock(delta="Because ")
+        await release.wait()
+        yield MagicMock(delta="of sunlight!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    resumes = metrics.ANSWER_RESUMES.value()
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        frames = generate_response("Why is the sky blue?", [], 5, False)
+        seen = []
+        async for frame in frames:
+            seen.append(frame)
+            if b'"delta":true' in frame:
+                break
+        await frames.aclose()  # the connection drops mid-answer
+
+        last_event_id = _event_ids(seen)[-1]
+        answer_id = last_event_id.split(":")[0]
+        resumed = asyncio.create_task(
+            client.get(f"/ask/{answer_id}/events", headers={"Last-Event-ID": last_event_id})
+        )
+        await asyncio.sleep(0.01)
+        release.set()
+        response = await resumed
+
+    events = _parse_sse([response.content])
+    llm.astream_chat.assert_called_once()
+    assert response.status_code == 200
+    assert [e["content"] for e in _parse_sse(seen)][-1] == "Because "
+    assert [e["content"] for e in events[:1]] == ["of sunlight!"]
+    assert events[-2]["content"] == "Because of sunlight!"
+    assert events[-1]["type"] == "done"
+    ids = _event_ids(seen) + _event_ids([response.content])
+    assert ids == [f"{answer_id}:{i}" for i in range(len(ids))]
+    assert metrics.ANSWER_RESUMES.value() == resumes + 1
+
+
+@pytest.mark.asyncio
+async def test_resume_rejects_unknown_answers_and_foreign_event_ids(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+
+    async def _stream():
+        yield MagicMock(delta="Because of sunlight!")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        frames = [frame async for frame in generate_response("Why is the sky blue?", [], 5, False)]
+    answer_id = _event_ids(frames)[0].split(":")[0]
+
+    assert (await client.get("/ask/unknown/events")).status_code == 404
+    response = await client.get(f"/ask/{answer_id}/events", headers={"Last-Event-ID": "other:3"})
+    assert response.status_code == 400
+    replay = await client.get(f"/ask/{answer_id}/events")
+    assert _event_ids([replay.content]) == _event_ids(frames)
@@ -0,0 +1,172 @@
+"""Tests for server-side conversation sessions."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings as app_settings
+from app.sessions import Session, SessionStore, get_session_store
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+def test_session_counts_each_message_once():
+    """Test appending a turn tokenizes only the new messages, not the whole history."""
+    counted = []
+
+    def count(text):
+        counted.append(text)
+        return _word_count(text)
+
+    session = Session(token_budget=100, count=count)
+    session.append("user", "Why is the sky blue?")
+    session.append("assistant", "Because of sunlight.")
+    session.append("user", "Why is grass green?")
+
+    assert counted == ["Why is the sky blue?", "Because of sunlight.", "Why is grass green?"]
+    assert session.tokens == 5 + 3 + 4
+
+
+def test_session_trims_oldest_messages_to_budget():
+    session = Session(token_budget=7, count=_word_count)
+    session.append("user", "one two three")
+    session.append("assistant", "four five six")
+    session.append("user", "seven eight")
+
+    # Dropping the first message leaves an assistant message first, which is dropped too
+    assert [m.content for m in session.history()] == ["seven eight"]
+    assert session.tokens == 2
+
+
+def test_compact_replaces_oldest_messages_with_summary():
+    session = Session(token_budget=100, count=_word_count)
+    session.append("user", "Why is the sky blue?")
+    session.append("assistant", "Because of sunlight.")
+    session.append("user", "Why is grass green?")
+
+    session.compact(2, "they talked about the sky")
+
+    assert session.summary == "they talked about the sky"
+    assert [m.content for m in session.history()] == ["Why is grass green?"]
+    assert session.tokens == 4
+
+
+def test_store_evicts_least_recently_used_session():
+    store = SessionStore(max_sessions=2, ttl_seconds=60, token_budget=100)
+    store.get("a").append("user", "hi")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert len(store) == 2
+    assert len(store.get("a")) == 1
+    assert len(store.get("b")) == 0  # evicted, so a fresh session
+
+
+def test_store_expires_idle_sessions():
+    store = SessionStore(max_sessions=10, ttl_seconds=-1, token_budget=100)
+    store.get("a").append("user", "hi")
+
+    assert len(store.get("a")) == 0
+
+
+def _llm(*answers: str) -> MagicMock:
+    async def _stream(answer):
+        yield MagicMock(delta=answer)
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(side_effect=[_stream(answer) for answer in answers])
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_ask_with_session_keeps_history_on_the_server(client, monkeypatch):
+    """Test a session's later turns see earlier ones without the client resending them."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    llm = _llm("Because of sunlight.", "Light bounces off the air.")
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        for question in ("Why is the sky blue?", "But why?"):
+            response = await client.post(
+                "/ask", json={"question": question, "session_id": "session-1"}
+            )
+            assert response.status_code == 200
+
+    second_call = llm.astream_chat.call_args_list[1].args[0]
+    assert [m.content for m in second_call[1:]] == [
+        "Why is the sky blue?",
+        "Because of sunlight.",
+        "But why?",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_new_session_is_seeded_from_history(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    llm = _llm("Yes!")
+    history = [
+        {"role": "user", "content": "Do fish sleep?"},
+        {"role": "assistant", "content": "They rest!"},
+    ]
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        await client.post(
+            "/ask",
+            json={"question": "Really?", "session_id": "session-2", "history": history},
+        )
+
+    messages = llm.astream_chat.call_args.args[0]
+    assert [m.content for m in messages[1:]] == ["Do fish sleep?", "They rest!", "Really?"]
+
+
+@pytest.mark.asyncio
+async def test_end_session(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    with patch("app.routes.ask.get_llm", return_value=_llm("Hi!")):
+        await client.post("/ask", json={"question": "Hello", "session_id": "session-3"})
+    assert len(get_session_store()) == 1
+
+    response = await client.delete("/sessions/session-3")
+
+    assert response.status_code == 204
+    assert len(get_session_store()) == 0
+
+
+@pytest.mark.asyncio
+async def test_invalid_session_id_is_rejected(client):
+    response = await client.post("/ask", json={"question": "Hi", "session_id": "../etc"})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_summarize_mode_folds_old_turns_into_the_session(client, monkeypatch):
+    """Test a long session's older turns are replaced by a summary sent ahead of the rest."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+    monkeypatch.setattr(app_settings, "memory_mode", "summarize")
+    monkeypatch.setattr(app_settings, "max_tokens", 200)
+    monkeypatch.setattr(app_settings, "response_token_buffer", 160)
+    history = []
+    for i in range(6):
+        history.append({"role": "user", "content": f"Tell me fact number {i} about whales."})
+        history.append({"role": "assistant", "content": f"Whale fact {i}: they sing songs."})
+    llm = _llm("They are mammals.")
+    llm.achat = AsyncMock(return_value=MagicMock(message=MagicMock(content="Whale facts.")))
+
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        patch("app.memory.get_llm", return_value=llm),
+    ):
+        await client.post(
+            "/ask",
+            json={"question": "More?", "session_id": "session-4", "history": history},
+        )
+
+    session = get_session_store().get("session-4")
+    assert session.summary == "Whale facts."
+    assert len(session) < len(history) + 2
+    messages = llm.astream_chat.call_args.args[0]
+    assert messages[1].role == "system"
+    assert "Whale facts." in messages[1].content
@@ -0,0 +1,189 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from app.singleflight import FlightLog, SingleFlight
+
+
+async def _numbers(n: int, gate: asyncio.Event | None = None):
+    for i in range(n):
+        if gate is not None and i == 1:
+            await gate.wait()
+        yield i
+
+
+async def test_concurrent_joins_share_one_source():
+    """Callers with the same key get the same flight; the source runs once."""
+    flights: SingleFlight[int] = SingleFlight()
+    starts = 0
+
+    def source():
+        nonlocal starts
+        starts += 1
+        return _numbers(3)
+
+    first = flights.join("k", source)
+    second = flights.join("k", source)
+
+    results = await asyncio.gather(*[_collect(flight.subscribe()) for flight in (first, second)])
+
+    assert first is second
+    assert starts == 1
+    assert flights.coalesced == 1
+    assert results == [[0, 1, 2], [0, 1, 2]]
+
+
+async def test_late_subscriber_replays_then_follows():
+    """A subscriber joining mid-flight sees the items it missed, then live ones."""
+    flights: SingleFlight[int] = SingleFlight()
+    gate = asyncio.Event()
+    flight = flights.join("k", lambda: _numbers(3, gate))
+    await flight.ready()
+
+    late = asyncio.create_task(_collect(flight.subscribe()))
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await late == [0, 1, 2]
+
+
+async def test_key_is_released_when_flight_finishes():
+    """Once a call finishes, the next caller starts a fresh one."""
+    flights: SingleFlight[int] = SingleFlight()
+    first = flights.join("k", lambda: _numbers(1))
+    await first.wait()
+
+    assert len(flights) == 0
+    assert flights.join("k", lambda: _numbers(1)) is not first
+
+
+async def test_source_error_reaches_every_subscriber():
+    """Subscribers see the items produced before a failure, then the error."""
+
+    async def failing():
+        yield 1
+        raise RuntimeError("upstream down")
+
+    flight = SingleFlight().join("k", failing)
+    received = []
+    with pytest.raises(RuntimeError, match="upstream down"):
+        async for item in flight.subscribe():
+            received.append(item)
+
+    assert received == [1]
+    with pytest.raises(RuntimeError):
+        await flight.wait()
+
+
+async def test_ready_raises_when_source_fails_before_first_item():
+    async def failing():
+        raise RuntimeError("cannot connect")
+        yield  # pragma: no cover
+
+    flight = SingleFlight().join("k", failing)
+
+    with pytest.raises(RuntimeError, match="cannot connect"):
+        await flight.ready()
+
+
+async def test_abandoned_flight_is_cancelled():
+    """Once its last subscriber leaves, the source is cancelled after the grace period."""
+    flights: SingleFlight[int] = SingleFlight(cancel_abandoned_after=0)
+    gate = asyncio.Event()  # never set: the source stalls after its first item
+    flight = flights.join("k", lambda: _numbers(3, gate))
+
+    subscription = flight.subscribe()
+    assert await anext(subscription) == 0
+    await subscription.aclose()
+    await asyncio.sleep(0.01)
+
+    assert flight.cancelled
+    assert flight.done
+    assert len(flights) == 0
+
+
+async def test_flight_with_remaining_subscriber_is_not_cancelled():
+    flights: SingleFlight[int] = SingleFlight(cancel_abandoned_after=0)
+    gate = asyncio.Event()
+    flight = flights.join("k", lambda: _numbers(3, gate))
+
+    leaving, staying = flight.subscribe(), flight.subscribe()
+    await anext(leaving)
+    await anext(staying)
+    await leaving.aclose()
+    await asyncio.sleep(0.01)
+    gate.set()
+
+    assert not flight.cancelled
+    assert [i async for i in staying] == [1, 2]
+
+
+async def test_cancel_stops_the_source_for_every_subscriber():
+    """An explicit cancel doesn't wait out the abandonment grace period."""
+    flights: SingleFlight[int] = SingleFlight(cancel_abandoned_after=60)
+    flight = flights.join("k", lambda: _numbers(3, asyncio.Event()))
+    subscription = flight.subscribe()
+    assert await anext(subscription) == 0
+
+    flight.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await anext(subscription)
+    assert flight.cancelled
+    assert "k" not in flights
+
+
+async def test_cancelled_flight_is_not_joined():
+    """A request arriving while an abandoned flight unwinds starts a fresh one."""
+    flights: SingleFlight[int] = SingleFlight()
+    first = flights.join("k", lambda: _numbers(3, asyncio.Event()))
+    first.cancelled = True
+
+    second = flights.join("k", lambda: _numbers(1))
+
+    assert second is not first
+    assert flights.coalesced == 0
+    assert await _collect(second.subscribe()) == [0]
+
+
+async def test_flight_log_replays_a_finished_flight_from_any_point():
+    log: FlightLog[int] = FlightLog(max_flights=10, ttl_seconds=60)
+    flight = SingleFlight[int]().join("k", lambda: _numbers(3))
+    log.add(flight)
+    await flight.wait()
+
+    assert log.get(flight.id) is flight
+    assert await _collect(flight.subscribe(1)) == [1, 2]
+    assert log.get("unknown") is None
+
+
+async def test_flight_log_drops_expired_cancelled_and_oldest_flights():
+    log: FlightLog[int] = FlightLog(max_flights=2, ttl_seconds=0)
+    flights = SingleFlight[int]()
+    finished = flights.join("a", lambda: _numbers(1))
+    await finished.wait()
+    cancelled = flights.join("b", lambda: _numbers(3, asyncio.Event()))
+    cancelled.cancelled = True
+    failed = flights.join("f", lambda: _numbers(3, asyncio.Event()))
+    failed.error = RuntimeError("upstream failed")
+    for flight in (finished, cancelled, failed):
+        log.add(flight)
+    await asyncio.sleep(0.01)
+
+    assert log.get(finished.id) is None  # finished longer than ttl_seconds ago
+    assert log.get(cancelled.id) is None
+    assert log.get(failed.id) is None
+
+    live = [flights.join(key, lambda: _numbers(3, asyncio.Event())) for key in "cde"]
+    log = FlightLog(max_flights=2, ttl_seconds=0)
+    for flight in live:
+        log.add(flight)
+    assert len(log) == 2
+    assert log.get(live[0].id) is None
+    assert log.get(live[2].id) is live[2]  # still running, so never expires
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
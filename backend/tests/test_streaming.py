@@ -1,8 +1,17 @@
 """Tests for streaming events."""
 
+import asyncio
 import json
 
-from app.streaming import StreamEvent
+from app.streaming import (
+    DONE,
+    AnswerExtractor,
+    SentenceSplitter,
+    SpeechPipeline,
+    StreamEvent,
+    coalesce_deltas,
+    preencode,
+)
 
 
 def test_stream_event_to_sse_basic():
@@ -10,8 +19,8 @@ def test_stream_event_to_sse_basic():
     event = StreamEvent(event_type="text", content="Hello world")
     sse = event.to_sse()
 
-    assert sse.startswith("data: ")
-    assert sse.endswith("\n\n")
+    assert sse.startswith(b"data: ")
+    assert sse.endswith(b"\n\n")
 
     # Parse the JSON data
     data = json.loads(sse[6:-2])
@@ -41,3 +50,182 @@ def test_stream_event_done():
 
     assert data["type"] == "done"
     assert data["content"] == ""
+
+
+def test_stream_event_to_sse_is_compact_utf8():
+    sse = StreamEvent(event_type="text", content="Très bien", metadata={"delta": True}).to_sse()
+
+    assert (
+        sse == 'data: {"type":"text","content":"Très bien","metadata":{"delta":true}}\n\n'.encode()
+    )
+
+
+def test_preencoded_events_reuse_their_frame():
+    thinking = preencode(StreamEvent(event_type="thinking", content="Hmm..."))
+
+    assert thinking.to_sse() is StreamEvent(event_type="thinking", content="Hmm...").to_sse()
+    assert StreamEvent(event_type="done").to_sse() is DONE.to_sse()
+    # Metadata makes it a different event
+    assert b"metadata" in StreamEvent(event_type="done", metadata={"a": 1}).to_sse()
+
+
+def _delta(text: str) -> StreamEvent:
+    return StreamEvent(event_type="text", content=text, metadata={"delta": True})
+
+
+async def _events(*items):
+    """Yield the events, sleeping for any float in between."""
+    for item in items:
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+        else:
+            yield item
+
+
+async def _coalesced(*items, interval=0.05):
+    return [
+        (event.content, event.metadata)
+        async for event in coalesce_deltas(_events(*items), interval)
+    ]
+
+
+async def test_coalesce_sends_the_first_delta_and_merges_the_burst_after_it():
+    merged = await _coalesced(
+        _delta("The "),
+        _delta("sky "),
+        _delta("is "),
+        StreamEvent(event_type="text", content="The sky is"),
+    )
+
+    assert merged == [
+        ("The ", {"delta": True}),
+        ("sky is ", {"delta": True}),  # held, then sent ahead of the final answer
+        ("The sky is", {}),
+    ]
+
+
+async def test_coalesce_flushes_held_text_when_the_stream_stalls():
+    merged = await _coalesced(_delta("The "), _delta("sky "), 0.2, _delta("is blue."))
+
+    assert [content for content, _ in merged] == ["The ", "sky ", "is blue."]
+
+
+async def test_coalesce_with_no_interval_passes_every_delta():
+    merged = await _coalesced(_delta("The "), _delta("sky "), interval=0)
+
+    assert [content for content, _ in merged] == ["The ", "sky "]
+
+
+async def test_coalesce_cancels_the_pending_read_when_closed():
+    closed = asyncio.Event()
+
+    async def _slow():
+        try:
+            yield _delta("The ")
+            yield _delta("sky ")
+            await asyncio.sleep(10)
+            yield _delta("is blue.")
+        finally:
+            closed.set()
+
+    events = coalesce_deltas(_slow(), 0.01)
+    assert (await anext(events)).content == "The "
+    assert (await anext(events)).content == "sky "  # flushed while the next read waits
+    await events.aclose()
+
+    assert closed.is_set()
+
+
+def test_answer_extractor_holds_back_thought():
+    """Test the ReAct thought is never emitted, only the answer after it."""
+    extractor = AnswerExtractor()
+
+    assert extractor.feed("Tho") == ""
+    assert extractor.feed("Thought: I can answer.\n") == ""
+    assert extractor.feed("Thought: I can answer.\nAnswer: The sky") == "The sky"
+    assert extractor.feed("Thought: I can answer.\nAnswer: The sky is blue.") == " is blue."
+
+
+def test_answer_extractor_passes_through_unformatted_reply():
+    """Test replies without ReAct markers are treated as the answer."""
+    extractor = AnswerExtractor()
+
+    assert extractor.feed("Great") == "Great"
+    assert extractor.feed("Great question!") == " question!"
+
+
+def test_answer_extractor_ignores_tool_calls():
+    """Test an Action step produces no user-facing text."""
+    extractor = AnswerExtractor()
+
+    assert extractor.feed('Thought: look it up\nAction: search\nAction Input: {"q": "sky"}') == ""
+
+
+def test_answer_extractor_resets_on_new_llm_call():
+    """Test a restarted response (e.g. format retry) starts a fresh answer."""
+    extractor = AnswerExtractor()
+
+    assert extractor.feed("Answer: Hello") == "Hello"
+    assert extractor.feed("Answer: Hi") == "Hi"
+
+
+def test_sentence_splitter_emits_completed_sentences():
+    """Test sentences are released as soon as the next one starts."""
+    splitter = SentenceSplitter(min_chars=5)
+
+    assert splitter.feed("The sky is blue") == []
+    assert splitter.feed(". Light bounces") == ["The sky is blue."]
+    assert splitter.feed(" around! Neat") == ["Light bounces around!"]
+    assert splitter.flush() == "Neat"
+    assert splitter.flush() is None
+
+
+def test_sentence_splitter_merges_short_sentences():
+    """Test tiny sentences are held until there is enough to speak."""
+    splitter = SentenceSplitter(min_chars=25)
+
+    assert splitter.feed("Wow! Great question. ") == []
+    assert splitter.feed("Let's explore it together. ") == [
+        "Wow! Great question. Let's explore it together."
+    ]
+
+
+async def test_speech_pipeline_releases_audio_in_order():
+    """Test clips synthesized concurrently are still emitted in sentence order."""
+    import asyncio
+
+    release_first = asyncio.Event()
+
+    async def synthesize(sentence: str) -> str:
+        if sentence.startswith("First"):
+            await release_first.wait()
+        return f"/tts/audio/{sentence[:5]}"
+
+    pipeline = SpeechPipeline(synthesize)
+    pipeline.feed("First sentence is slow. Second sentence is quick. ")
+    await asyncio.sleep(0)
+
+    assert pipeline.ready() == []  # second is done, but first is not
+
+    release_first.set()
+    events = [event async for event in pipeline.drain()]
+
+    assert [e.event_type for e in events] == ["audio", "audio"]
+    assert [e.metadata["index"] for e in events] == [0, 1]
+    assert events[0].content == "/tts/audio/First"
+
+
+async def test_speech_pipeline_skips_failed_sentences():
+    """Test a failed clip is dropped without stopping the rest."""
+
+    async def synthesize(sentence: str) -> str:
+        if "broken" in sentence:
+            raise RuntimeError("tts down")
+        return "/tts/audio/ok"
+
+    pipeline = SpeechPipeline(synthesize)
+    pipeline.feed("This sentence is broken. ")
+    pipeline.feed("This one works fine.")
+    events = [event async for event in pipeline.drain()]
+
+    assert [e.metadata["index"] for e in events] == [1]
@@ -0,0 +1,86 @@
+"""Tests for per-request stage tracing."""
+
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app import tracing
+from app.config import settings as app_settings
+from app.tracing import RequestTrace
+
+
+def test_request_trace_accumulates_repeated_stages():
+    """Test a stage that runs several times adds up, and Server-Timing ends with the total."""
+    trace = RequestTrace("abc")
+    trace.add("serialize", 0.001)
+    trace.add("serialize", 0.002)
+    trace.add("llm", 0.5)
+
+    header = trace.server_timing()
+
+    assert header.startswith("serialize;dur=3.0, llm;dur=500.0, total;dur=")
+    assert trace.as_dict()["stages_ms"] == {"serialize": 3.0, "llm": 500.0}
+
+
+def test_span_outside_a_request_is_a_no_op():
+    with tracing.span("llm"):
+        pass
+
+    assert tracing.current_trace() is None
+
+
+@pytest.mark.asyncio
+async def test_transcribe_reports_server_timing(client, monkeypatch):
+    """Test responses carry Server-Timing with the upstream stage and echo the request ID."""
+    monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
+
+    with patch("app.routes.transcribe._get_whisper_client") as mock_get_client:
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create = AsyncMock(return_value=MagicMock(text="Hi"))
+        mock_get_client.return_value = mock_client
+
+        response = await client.post(
+            "/transcribe",
+            files={"audio": ("recording.webm", io.BytesIO(b"0" * 1024), "audio/webm")},
+            headers={"X-Request-ID": "req-123"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-123"
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages == ["validation", "whisper", "total"]
+
+
+@pytest.mark.asyncio
+async def test_unsafe_request_id_is_replaced(client):
+    response = await client.get("/health", headers={"X-Request-ID": "bad id\r\n"})
+
+    assert response.headers["x-request-id"] != "bad id"
+    assert len(response.headers["x-request-id"]) == 32
+
+
+@pytest.mark.asyncio
+async def test_ask_ends_with_timing_event(client, monkeypatch):
+    """Test /ask trails the answer with a timing event carrying the full stage breakdown."""
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+
+    async def _stream():
+        yield MagicMock(delta="The sky is blue.")
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+
+    with patch("app.routes.ask.get_llm", return_value=llm):
+        response = await client.post("/ask", json={"question": "Why is the sky blue?"})
+
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [e["type"] for e in events[-2:]] == ["done", "timing"]
+    timing = events[-1]["metadata"]
+    assert timing["request_id"] == response.headers["x-request-id"]
+    assert {"validation", "memory", "llm", "serialize"} <= set(timing["stages_ms"])
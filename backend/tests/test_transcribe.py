@@ -242,3 +242,108 @@ def test_get_whisper_client_returns_same_instance():
 
     assert first is second
     MockOpenAI.assert_called_once()  # constructed only once
+
+
+# ---------------------------------------------------------------------------
+# Bounded-memory uploads
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_transcribe_streams_spooled_file_to_whisper(client):
+    """Whisper receives the spooled upload as a file object, not a bytes copy."""
+    data, content_type = _audio_bytes(size=2 * 1024 * 1024)
+
+    with patch("app.routes.transcribe._get_whisper_client") as mock_get_client:
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create = AsyncMock(
+            return_value=_make_transcription_response("Hello")
+        )
+        mock_get_client.return_value = mock_client
+
+        response = await client.post(
+            "/transcribe",
+            files={"audio": ("recording.webm", io.BytesIO(data), content_type)},
+        )
+
+    assert response.status_code == 200
+    filename, file, sent_type = mock_client.audio.transcriptions.create.call_args.kwargs["file"]
+    assert not isinstance(file, bytes)
+    assert (filename, sent_type) == ("recording.webm", content_type)
+
+
+@pytest.mark.asyncio
+async def test_transcribe_aborts_undeclared_oversized_upload(client):
+    """A chunked upload with no Content-Length is cut off with 413 once it passes the limit."""
+    boundary = "eli5boundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="audio"; filename="big.webm"\r\n'
+        "Content-Type: audio/webm\r\n\r\n"
+    ).encode()
+    chunks_sent = 0
+
+    async def body():
+        nonlocal chunks_sent
+        yield head
+        for _ in range(30):  # 30 MB, never finished
+            chunks_sent += 1
+            yield b"0" * (1024 * 1024)
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = await client.post(
+        "/transcribe",
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    assert response.status_code == 413
+    assert chunks_sent < 30
+
+
+@pytest.mark.asyncio
+async def test_transcribe_releases_upload_budget(client):
+    """Budget reserved for an upload is returned once the request finishes."""
+    from app.uploads import get_upload_budget
+
+    await client.post(
+        "/transcribe",
+        files={"audio": ("photo.jpg", io.BytesIO(b"not audio"), "image/jpeg")},
+    )
+
+    assert get_upload_budget().in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_budget_rejects_when_exhausted():
+    """Uploads that can't fit in the budget within the wait time get 503 + Retry-After."""
+    from fastapi import HTTPException
+
+    from app.uploads import UploadBudget
+
+    budget = UploadBudget(max_bytes=100, wait_seconds=0.01)
+    await budget.acquire(80)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await budget.acquire(30)
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_upload_budget_queues_until_space_frees():
+    """A waiting upload proceeds as soon as an earlier one releases its bytes."""
+    import asyncio
+
+    from app.uploads import UploadBudget
+
+    budget = UploadBudget(max_bytes=100, wait_seconds=1)
+    await budget.acquire(80)
+
+    waiter = asyncio.create_task(budget.acquire(30))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    await budget.release(80)
+    await waiter
+    assert budget.in_flight == 30
@@ -1,11 +1,17 @@
 """Tests for the /tts endpoint."""
 
+import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import openai
 import pytest
 
+from app.admission import get_limiter
+from app.cache import get_audio_cache
 from app.config import settings as app_settings
+from app.main import app
 
 
 @pytest.fixture(autouse=True)
@@ -14,10 +20,36 @@ def stt_api_key_set(monkeypatch):
     monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
 
 
-def _make_speech_response(audio_bytes: bytes = b"fake-mp3-data") -> MagicMock:
-    mock = MagicMock()
-    mock.content = audio_bytes
-    return mock
+def _make_tts_client(
+    chunks: list[bytes] | None = None,
+    error: Exception | None = None,
+    stream_error: Exception | None = None,
+) -> MagicMock:
+    """Return a fake AsyncOpenAI client whose speech stream yields ``chunks``.
+
+    ``error`` is raised when the stream is opened, which is where the SDK
+    surfaces HTTP errors for streaming responses; ``stream_error`` is raised
+    after the last chunk, like a dropped connection.
+    """
+    upstream = MagicMock()
+
+    async def _iter_bytes(chunk_size=None):
+        # Chunks are relayed as they arrive; a chunk_size would hold them back until it's filled
+        assert chunk_size is None
+        for chunk in chunks or [b"fake-", b"mp3-data"]:
+            yield chunk
+        if stream_error is not None:
+            raise stream_error
+
+    upstream.iter_bytes = _iter_bytes
+
+    stream = MagicMock()
+    stream.__aenter__ = AsyncMock(return_value=upstream, side_effect=error)
+    stream.__aexit__ = AsyncMock(return_value=False)
+
+    client = MagicMock()
+    client.audio.speech.with_streaming_response.create = MagicMock(return_value=stream)
+    return client
 
 
 # ---------------------------------------------------------------------------
@@ -28,10 +60,7 @@ def _make_speech_response(audio_bytes: bytes = b"fake-mp3-data") -> MagicMock:
 async def test_tts_returns_audio(client):
     """Happy path: valid text returns audio/mpeg content."""
     with patch("app.routes.tts._get_tts_client") as mock_get_client:
-        mock_client = MagicMock()
-        mock_client.audio.speech.create = AsyncMock(
-            return_value=_make_speech_response(b"fake-mp3-data")
-        )
+        mock_client = _make_tts_client([b"fake-mp3-data"])
         mock_get_client.return_value = mock_client
 
         response = await client.post("/tts", json={"text": "Why is the sky blue?"})
@@ -45,18 +74,16 @@ async def test_tts_returns_audio(client):
 async def test_tts_passes_nova_voice(client):
     """Verify the nova voice is used."""
     with patch("app.routes.tts._get_tts_client") as mock_get_client:
-        mock_client = MagicMock()
-        mock_client.audio.speech.create = AsyncMock(
-            return_value=_make_speech_response()
-        )
+        mock_client = _make_tts_client()
         mock_get_client.return_value = mock_client
 
         await client.post("/tts", json={"text": "Hello!"})
 
-        mock_client.audio.speech.create.assert_called_once_with(
+        mock_client.audio.speech.with_streaming_response.create.assert_called_once_with(
             model="tts-1",
             voice="nova",
             input="Hello!",
+            response_format="mp3",
         )
 
 
@@ -82,10 +109,7 @@ async def test_tts_rejects_text_over_limit(client):
 async def test_tts_accepts_text_at_limit(client):
     """Text of exactly 4096 characters should be accepted."""
     with patch("app.routes.tts._get_tts_client") as mock_get_client:
-        mock_client = MagicMock()
-        mock_client.audio.speech.create = AsyncMock(
-            return_value=_make_speech_response()
-        )
+        mock_client = _make_tts_client()
         mock_get_client.return_value = mock_client
 
         response = await client.post("/tts", json={"text": "a" * 4096})
@@ -116,9 +140,8 @@ async def test_tts_returns_503_when_key_not_set(client, monkeypatch):
 async def test_tts_returns_502_on_openai_error(client):
     """An OpenAI API failure must surface as 502."""
     with patch("app.routes.tts._get_tts_client") as mock_get_client:
-        mock_client = MagicMock()
-        mock_client.audio.speech.create = AsyncMock(
-            side_effect=openai.APIStatusError(
+        mock_client = _make_tts_client(
+            error=openai.APIStatusError(
                 "rate limit",
                 response=MagicMock(status_code=429, headers={}),
                 body=None,
@@ -150,3 +173,192 @@ def test_get_tts_client_returns_same_instance():
 
     assert first is second
     MockOpenAI.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# Audio cache
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_tts_replay_served_from_cache(client):
+    """A repeated request is served from disk without calling OpenAI again."""
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_client = _make_tts_client([b"fake-mp3-data"])
+        mock_get_client.return_value = mock_client
+
+        first = await client.post("/tts", json={"text": "Read it again!"})
+        second = await client.post("/tts", json={"text": "Read it again!"})
+
+    assert second.status_code == 200
+    assert second.content == first.content == b"fake-mp3-data"
+    assert second.headers["content-location"] == first.headers["content-location"]
+    assert "etag" in second.headers
+    mock_client.audio.speech.with_streaming_response.create.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_tts_cached_audio_supports_range_and_etag(client):
+    """Cached clips are addressable by hash and honour Range and If-None-Match."""
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_client = _make_tts_client([b"0123456789"])
+        mock_get_client.return_value = mock_client
+
+        created = await client.post("/tts", json={"text": "Hello!"})
+
+    url = created.headers["content-location"]
+    etag = (await client.get(url)).headers["etag"]
+
+    partial = await client.get(url, headers={"Range": "bytes=2-5"})
+    assert partial.status_code == 206
+    assert partial.content == b"2345"
+
+    not_modified = await client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_tts_cached_audio_unknown_key_is_404(client):
+    response = await client.get("/tts/audio/" + "0" * 64)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_tts_cache_disabled_returns_bytes(client, monkeypatch):
+    """With the cache off, audio is returned directly as before."""
+    monkeypatch.setattr(app_settings, "tts_cache_max_bytes", 0)
+
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_client = _make_tts_client([b"fake-mp3-data"])
+        mock_get_client.return_value = mock_client
+
+        response = await client.post("/tts", json={"text": "Hello!"})
+
+    assert response.content == b"fake-mp3-data"
+    assert "content-location" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_tts_relay_is_closed_when_client_leaves_before_the_body(monkeypatch):
+    """The upstream stream and its limiter slot are released even if the body never starts."""
+    monkeypatch.setattr(app_settings, "tts_cache_max_bytes", 0)
+    body = json.dumps({"text": "Hello!"}).encode()
+    receives = 0
+
+    async def receive():
+        nonlocal receives
+        receives += 1
+        if receives == 1:
+            return {"type": "http.request", "body": body, "more_body": False}
+        if receives == 2:
+            await asyncio.Event().wait()  # the handler's disconnect watcher, cancelled
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        await asyncio.sleep(0)  # a real server yields here, where the disconnect lands
+        sent.append(message["type"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/tts",
+        "raw_path": b"/tts",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    client = _make_tts_client([b"fake-mp3-data"])
+    with patch("app.routes.tts._get_tts_client", return_value=client):
+        await app(scope, receive, send)
+
+    assert "http.response.body" not in sent
+    client.audio.speech.with_streaming_response.create.return_value.__aexit__.assert_awaited()
+    assert get_limiter("tts").active == 0
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_tts_streams_chunks_and_caches_on_completion(client):
+    """Audio is relayed chunk by chunk and the full clip lands in the cache."""
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_get_client.return_value = _make_tts_client([b"one-", b"two-", b"three"])
+
+        async with client.stream("POST", "/tts", json={"text": "Stream me"}) as response:
+            received = [chunk async for chunk in response.aiter_bytes()]
+
+    assert b"".join(received) == b"one-two-three"
+    cached = await client.get(response.headers["content-location"])
+    assert cached.content == b"one-two-three"
+
+
+@pytest.mark.asyncio
+async def test_tts_failed_stream_is_not_cached(client):
+    """A stream that breaks part-way must not leave a truncated clip in the cache."""
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_get_client.return_value = _make_tts_client(
+            [b"partial"], stream_error=httpx.ReadError("connection reset")
+        )
+        with pytest.raises(httpx.ReadError):
+            await client.post("/tts", json={"text": "Broken"})
+
+    assert len(get_audio_cache()) == 0
+
+
+# ---------------------------------------------------------------------------
+# Clip URLs for /ask speech
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_synthesize_clip_url_caches_and_reuses(client):
+    """A synthesized sentence is addressable by URL and only synthesized once."""
+    from app.routes.tts import synthesize_clip_url
+
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_client = _make_tts_client([b"clip"])
+        mock_get_client.return_value = mock_client
+
+        url = await synthesize_clip_url("Hello there, friend.")
+        assert await synthesize_clip_url("Hello there, friend.") == url
+
+    mock_client.audio.speech.with_streaming_response.create.assert_called_once()
+    assert (await client.get(url)).content == b"clip"
+
+
+@pytest.mark.asyncio
+async def test_synthesize_clip_url_inlines_audio_without_cache(monkeypatch):
+    """With the cache off, the clip comes back as a data: URL."""
+    from app.routes.tts import synthesize_clip_url
+
+    monkeypatch.setattr(app_settings, "tts_cache_max_bytes", 0)
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_get_client.return_value = _make_tts_client([b"clip"])
+
+        url = await synthesize_clip_url("Hello there, friend.")
+
+    assert url == "data:audio/mpeg;base64,Y2xpcA=="
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_tts_share_one_synthesis(client):
+    """Simultaneous requests for the same clip make one upstream call and all get the audio."""
+    import asyncio
+
+    with patch("app.routes.tts._get_tts_client") as mock_get_client:
+        mock_client = _make_tts_client([b"same-", b"clip"])
+        mock_get_client.return_value = mock_client
+
+        responses = await asyncio.gather(
+            *[client.post("/tts", json={"text": "Everyone at once!"}) for _ in range(3)]
+        )
+
+    assert [r.content for r in responses] == [b"same-clip"] * 3
+    mock_client.audio.speech.with_streaming_response.create.assert_called_once()
@@ -0,0 +1,259 @@
+"""Tests for the /ask/voice round trip and /ws/voice sessions."""
+
+import asyncio
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings as app_settings
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def voice_configured(monkeypatch):
+    monkeypatch.setattr(app_settings, "stt_api_key", "test-key")
+    monkeypatch.setattr(app_settings, "engine_mode", "auto")
+
+
+def _whisper(transcript: str | None = None, error: Exception | None = None) -> MagicMock:
+    client = MagicMock()
+    client.audio.transcriptions.create = AsyncMock(
+        return_value=MagicMock(text=transcript), side_effect=error
+    )
+    return client
+
+
+def _llm(*deltas: str) -> MagicMock:
+    async def _stream():
+        for delta in deltas:
+            yield MagicMock(delta=delta)
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(return_value=_stream())
+    return llm
+
+
+async def _ask_voice(client, whisper, llm, **form):
+    with (
+        patch("app.routes.transcribe._get_whisper_client", return_value=whisper),
+        patch("app.routes.ask.get_llm", return_value=llm),
+    ):
+        return await client.post(
+            "/ask/voice",
+            files={"audio": ("recording.webm", io.BytesIO(b"0" * 1024), "audio/webm")},
+            data=form,
+        )
+
+
+def _events(response) -> list[dict]:
+    return [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+async def test_voice_question_streams_transcript_then_answer(client):
+    llm = _llm("Because ", "of sunlight!")
+
+    response = await _ask_voice(client, _whisper(" Why is the sky blue? "), llm, age="6")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response)
+    assert events[0] == {"type": "transcript", "content": "Why is the sky blue?"}
+    assert [e["type"] for e in events[1:]] == ["thinking", "text", "text", "text", "done", "timing"]
+    assert events[-3]["content"] == "Because of sunlight!"
+    messages = llm.astream_chat.call_args.args[0]
+    assert messages[-1].content == "Why is the sky blue?"
+    assert "6-year-old" in messages[0].content
+
+
+async def test_voice_question_continues_the_sent_history(client):
+    llm = _llm("Grey clouds are thick.")
+    history = [
+        {"role": "user", "content": "Why is the sky blue?"},
+        {"role": "assistant", "content": "Because of sunlight!"},
+    ]
+
+    response = await _ask_voice(client, _whisper("And clouds?"), llm, history=json.dumps(history))
+
+    assert response.status_code == 200
+    contents = [message.content for message in llm.astream_chat.call_args.args[0]]
+    assert contents[-3:] == ["Why is the sky blue?", "Because of sunlight!", "And clouds?"]
+
+
+async def test_voice_question_interleaves_speech(client):
+    synthesize = AsyncMock(side_effect=lambda sentence: f"/tts/audio/{len(sentence)}")
+
+    with patch("app.routes.ask.synthesize_clip_url", synthesize):
+        response = await _ask_voice(
+            client, _whisper("Why is the sky blue?"), _llm("Sunlight scatters."), speak="true"
+        )
+
+    audio = [e for e in _events(response) if e["type"] == "audio"]
+    assert [e["metadata"]["text"] for e in audio] == ["Sunlight scatters."]
+
+
+async def test_silent_recording_is_not_answered(client):
+    llm = _llm("Hmm?")
+
+    response = await _ask_voice(client, _whisper("  "), llm)
+
+    assert response.status_code == 422
+    llm.astream_chat.assert_not_called()
+
+
+async def test_voice_rejects_malformed_history_before_transcribing(client):
+    whisper = _whisper("Why?")
+
+    response = await _ask_voice(client, whisper, _llm(), history='[{"role": "system"}]')
+
+    assert response.status_code == 422
+    whisper.audio.transcriptions.create.assert_not_called()
+
+
+async def test_voice_reports_transcription_failure(client):
+    error = openai.APIConnectionError(request=MagicMock())
+
+    response = await _ask_voice(client, _whisper(error=error), _llm())
+
+    assert response.status_code == 502
+
+
+def _answer(ws) -> list[dict]:
+    """Receive one answer's events from a voice session, up to its done (or error) event."""
+    events = [ws.receive_json()]
+    while events[-1]["type"] not in ("done", "error"):
+        events.append(ws.receive_json())
+    return events
+
+
+def _llm_answering(*answers: str) -> MagicMock:
+    """An LLM whose successive calls stream the given answers."""
+    streams = iter([_llm(answer).astream_chat.return_value for answer in answers])
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(side_effect=lambda messages, **limits: next(streams))
+    return llm
+
+
+def test_voice_session_keeps_the_conversation_between_questions():
+    llm = _llm_answering("Because of sunlight!", "Clouds are thick.")
+
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        TestClient(app).websocket_connect("/ws/voice?age=6") as ws,
+    ):
+        ws.send_json({"type": "question", "content": "Why is the sky blue?"})
+        first = _answer(ws)
+        ws.send_json({"type": "question", "content": "And clouds?"})
+        second = _answer(ws)
+
+    assert [e["type"] for e in first] == ["thinking", "text", "text", "done"]
+    assert first[-2]["content"] == "Because of sunlight!"
+    assert second[-2]["content"] == "Clouds are thick."
+    contents = [message.content for message in llm.astream_chat.call_args.args[0]]
+    assert contents[-3:] == ["Why is the sky blue?", "Because of sunlight!", "And clouds?"]
+
+
+def test_voice_session_transcribes_streamed_audio():
+    received = {}
+
+    async def _transcribe(model, file):
+        filename, audio, content_type = file
+        received["audio"], received["content_type"] = audio.read(), content_type
+        return MagicMock(text="Why is the sky blue?")
+
+    whisper = MagicMock()
+    whisper.audio.transcriptions.create = AsyncMock(side_effect=_transcribe)
+
+    with (
+        patch("app.routes.transcribe._get_whisper_client", return_value=whisper),
+        patch("app.routes.ask.get_llm", return_value=_llm("Because of sunlight!")),
+        TestClient(app).websocket_connect("/ws/voice") as ws,
+    ):
+        ws.send_bytes(b"first chunk ")
+        ws.send_bytes(b"second chunk")
+        ws.send_json({"type": "audio_end", "content_type": "audio/ogg"})
+        events = _answer(ws)
+
+    assert received == {"audio": b"first chunk second chunk", "content_type": "audio/ogg"}
+    assert events[0] == {"type": "transcript", "content": "Why is the sky blue?"}
+    assert events[-2]["content"] == "Because of sunlight!"
+
+
+def test_voice_session_reports_bad_messages_and_oversized_audio(monkeypatch):
+    monkeypatch.setattr("app.routes.voice.MAX_AUDIO_BYTES", 10)
+    whisper = _whisper("Why?")
+
+    with (
+        patch("app.routes.transcribe._get_whisper_client", return_value=whisper),
+        patch("app.routes.ask.get_llm", return_value=_llm("Because!")),
+        TestClient(app).websocket_connect("/ws/voice") as ws,
+    ):
+        ws.send_json({"type": "shout"})
+        bad_message = ws.receive_json()
+        ws.send_bytes(b"0" * 8)
+        ws.send_bytes(b"0" * 8)
+        too_long = ws.receive_json()
+        ws.send_json({"type": "audio_end"})
+        ws.send_json({"type": "question", "content": "Why?"})
+        events = _answer(ws)
+
+    assert bad_message["type"] == "error"
+    assert bad_message["metadata"] == {"status": 400}
+    assert too_long["metadata"] == {"status": 413}
+    whisper.audio.transcriptions.create.assert_not_called()  # the cut-off recording is dropped
+    assert events[-2]["content"] == "Because!"
+
+
+def test_new_question_interrupts_the_answer_in_progress():
+    """The interrupted answer stops generating at once and never joins the conversation."""
+    stopped = []
+
+    async def _rambling():
+        try:
+            yield MagicMock(delta="Once upon a time ")
+            await asyncio.sleep(10)
+            yield MagicMock(delta="the end.")
+        finally:
+            stopped.append("story")
+
+    streams = iter(
+        [
+            _rambling(),
+            _llm("Goodnight!").astream_chat.return_value,
+            _llm("Sleep tight.").astream_chat.return_value,
+        ]
+    )
+    calls = []
+
+    def _next_stream(messages, **limits):
+        calls.append(([message.content for message in messages], list(stopped)))
+        return next(streams)
+
+    llm = MagicMock()
+    llm.astream_chat = AsyncMock(side_effect=_next_stream)
+
+    with (
+        patch("app.routes.ask.get_llm", return_value=llm),
+        TestClient(app).websocket_connect("/ws/voice") as ws,
+    ):
+        ws.send_json({"type": "question", "content": "Tell me a story"})
+        assert ws.receive_json()["type"] == "thinking"
+        assert ws.receive_json()["content"] == "Once upon a time "
+        ws.send_json({"type": "question", "content": "Actually, say goodnight"})
+        events = _answer(ws)
+        ws.send_json({"type": "question", "content": "Third"})
+        _answer(ws)
+
+    assert events[0]["type"] == "thinking"
+    assert events[-2]["content"] == "Goodnight!"
+    history, stopped_by_then = calls[2]
+    assert stopped_by_then == ["story"]
+    assert "Tell me a story" not in history
+    assert history[-3:] == ["Actually, say goodnight", "Goodnight!", "Third"]
@@ -0,0 +1,89 @@
+"""Tests for cold start: lazy provider imports and the startup warm-up."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from openai.resources.models import AsyncModels
+
+from app.config import LLMRoute
+from app.config import settings as app_settings
+from app.warmup import warm_up
+
+# Generous: importing the app takes a few seconds, and twice that with every provider loaded
+IMPORT_BUDGET_SECONDS = 10.0
+
+_IMPORT_APP = """
+import sys, time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+print(*sorted(sys.modules))
+"""
+
+
+def _import_app(provider: str) -> tuple[float, set[str]]:
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_APP],
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "LLM_PROVIDER": provider},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds, modules = result.stdout.splitlines()
+    return float(seconds), set(modules.split())
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_app_import_loads_no_provider_integration(provider):
+    """Importing the app loads no provider integration; load_llm imports the one it needs."""
+    seconds, modules = _import_app(provider)
+
+    assert "llama_index.llms.anthropic" not in modules
+    assert "llama_index.llms.openai" not in modules
+    assert "anthropic" not in modules
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+@pytest.fixture
+def openai_routes(monkeypatch):
+    monkeypatch.setattr(app_settings, "llm_provider", "openai")
+    monkeypatch.setattr(app_settings, "llm_model", "gpt-4o")
+    monkeypatch.setattr(app_settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(app_settings, "llm_api_base", None)
+    monkeypatch.setattr(app_settings, "llm_fallback_provider", None)
+    monkeypatch.setattr(app_settings, "stt_api_key", None)
+    monkeypatch.setattr(
+        app_settings,
+        "llm_routes",
+        # older only changes the output cap, so it shares default's client
+        {"toddler": LLMRoute(model="gpt-4o-mini"), "older": LLMRoute(max_tokens=800)},
+    )
+
+
+async def test_warm_up_opens_one_connection_per_client(openai_routes, monkeypatch):
+    models_list = AsyncMock()
+    monkeypatch.setattr(AsyncModels, "list", models_list)
+
+    await warm_up()
+
+    assert models_list.await_count == 2
+
+
+async def test_warm_up_failures_only_log(openai_routes, monkeypatch, caplog):
+    monkeypatch.setattr(AsyncModels, "list", AsyncMock(side_effect=ConnectionError("refused")))
+    monkeypatch.setattr(app_settings, "llm_fallback_provider", "anthropic")
+
+    def _no_key(*args):
+        raise ValueError("no key")
+
+    monkeypatch.setattr("app.warmup.get_fallback_llm", _no_key)
+
+    await warm_up()
+
+    assert "Could not open a connection to openai (default)" in caplog.text
+    assert "Could not build the anthropic (default, fallback) client" in caplog.text
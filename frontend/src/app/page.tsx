@@ -49,7 +49,10 @@ export default function Home() {
           { id: assistantId, role: 'assistant', content: '🤔 ' + event.content, isThinking: true },
         ]);
       } else if (event.type === 'text') {
-        assistantContent = event.content;
+        // Deltas extend the answer as it streams; the final event replaces it
+        assistantContent = event.metadata?.delta
+          ? assistantContent + event.content
+          : event.content;
         setMessages((prev) => [
           ...prev.filter((m) => m.id !== assistantId),
           { id: assistantId, role: 'assistant', content: assistantContent, isThinking: false },
@@ -20,7 +20,7 @@ export async function synthesizeSpeech(text: string): Promise<Blob> {
 }
 
 export interface StreamEvent {
-  type: 'thinking' | 'text' | 'image' | 'done';
+  type: 'transcript' | 'thinking' | 'text' | 'image' | 'audio' | 'timing' | 'done' | 'error';
   content: string;
   metadata?: Record<string, unknown>;
 }
@@ -35,8 +35,14 @@ export interface AskRequest {
   age?: number;
   story_mode?: boolean;
   history?: Message[];
+  speak?: boolean;
+  // Server-side conversation: send only the new question (history seeds a new session)
+  session_id?: string;
 }
 
+// Reconnects to a dropped /ask stream before giving up
+const MAX_RESUMES = 3;
+
 export async function askEli(
   request: AskRequest,
   onEvent: (event: StreamEvent) => void
@@ -48,11 +54,103 @@ export async function askEli(
     },
     body: JSON.stringify(request),
   });
+  await followAnswer(response, onEvent);
+}
 
-  if (!response.ok) {
-    throw new Error(`API error: ${response.status}`);
+// One request for a spoken question: a "transcript" event, then the same events as askEli
+export async function askEliByVoice(
+  blob: Blob,
+  request: Omit<AskRequest, 'question'>,
+  onEvent: (event: StreamEvent) => void
+): Promise<void> {
+  const formData = new FormData();
+  formData.append('audio', blob, 'recording.webm');
+  if (request.age !== undefined) formData.append('age', String(request.age));
+  if (request.story_mode !== undefined) formData.append('story_mode', String(request.story_mode));
+  if (request.speak !== undefined) formData.append('speak', String(request.speak));
+  if (request.session_id) formData.append('session_id', request.session_id);
+  if (request.history) formData.append('history', JSON.stringify(request.history));
+  const response = await fetch(`${API_URL}/ask/voice`, { method: 'POST', body: formData });
+  await followAnswer(response, onEvent);
+}
+
+export interface VoiceSession {
+  ask: (question: string) => Promise<void>;
+  sendAudio: (chunk: Blob) => Promise<void>;
+  endAudio: (contentType?: string) => Promise<void>;
+  cancel: () => Promise<void>;
+  close: () => void;
+}
+
+// A whole conversation over one WebSocket: each answer arrives as the same events as
+// askEli (a "transcript" first for recordings), and the server keeps the history
+export function openVoiceSession(
+  options: Omit<AskRequest, 'question' | 'history'>,
+  onEvent: (event: StreamEvent) => void
+): VoiceSession {
+  const params = new URLSearchParams();
+  if (options.age !== undefined) params.set('age', String(options.age));
+  if (options.story_mode !== undefined) params.set('story_mode', String(options.story_mode));
+  if (options.speak !== undefined) params.set('speak', String(options.speak));
+  if (options.session_id) params.set('session_id', options.session_id);
+
+  const socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/ws/voice?${params}`);
+  const opened = new Promise<void>((resolve) =>
+    socket.addEventListener('open', () => resolve(), { once: true })
+  );
+  socket.addEventListener('message', (message) => {
+    onEvent(JSON.parse(message.data) as StreamEvent);
+  });
+  const send = async (data: string | Blob) => {
+    await opened;
+    socket.send(data);
+  };
+
+  return {
+    ask: (question) => send(JSON.stringify({ type: 'question', content: question })),
+    sendAudio: (chunk) => send(chunk),
+    endAudio: (contentType = 'audio/webm') =>
+      send(JSON.stringify({ type: 'audio_end', content_type: contentType })),
+    cancel: () => send(JSON.stringify({ type: 'cancel' })),
+    close: () => socket.close(),
+  };
+}
+
+async function followAnswer(
+  response: Response,
+  onEvent: (event: StreamEvent) => void
+): Promise<void> {
+  let lastEventId: string | null = null;
+
+  for (let resumes = 0; ; resumes++) {
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    let finished = false;
+    try {
+      finished = await readEvents(response, (id) => (lastEventId = id), onEvent);
+    } catch (err) {
+      if (!lastEventId || resumes >= MAX_RESUMES) throw err;
+    }
+    if (finished) return;
+    if (!lastEventId || resumes >= MAX_RESUMES) {
+      throw new Error('The answer stream ended early');
+    }
+
+    // Event IDs are "<answer id>:<index>": pick up after the last one received
+    const answerId = lastEventId.slice(0, lastEventId.lastIndexOf(':'));
+    response = await fetch(`${API_URL}/ask/${answerId}/events`, {
+      headers: { 'Last-Event-ID': lastEventId },
+    });
   }
+}
 
+// Returns whether the stream reached its final "done" event
+async function readEvents(
+  response: Response,
+  onId: (id: string) => void,
+  onEvent: (event: StreamEvent) => void
+): Promise<boolean> {
   const reader = response.body?.getReader();
   if (!reader) {
     throw new Error('No response body');
@@ -60,6 +158,7 @@ export async function askEli(
 
   const decoder = new TextDecoder();
   let buffer = '';
+  let finished = false;
 
   while (true) {
     const { done, value } = await reader.read();
@@ -72,10 +171,13 @@ export async function askEli(
     buffer = lines.pop() || '';
 
     for (const line of lines) {
-      if (line.startsWith('data: ')) {
+      if (line.startsWith('id: ')) {
+        onId(line.slice(4));
+      } else if (line.startsWith('data: ')) {
         const data = line.slice(6);
         try {
           const event = JSON.parse(data) as StreamEvent;
+          finished ||= event.type === 'done';
           onEvent(event);
         } catch {
           // Ignore parse errors
@@ -83,4 +185,5 @@ export async function askEli(
       }
     }
   }
+  return finished;
 }